@@ -0,0 +1,271 @@
+"""
+Scrapes a list of job URLs from the command line, without the Streamlit UI.
+
+    python -m batch urls.txt [more.txt ...] [--output output/batch_results.jsonl]
+    cat urls.txt | python -m batch - --processes 4 --recrawl --dedup
+
+URLs are read one per line from the files given, or from stdin with `-` or
+no files; blank lines, `#` comments and repeated URLs are skipped. Every
+finished URL is appended to the JSONL output and recorded in a SQLite
+checkpoint next to it, so an interrupted run started again with the same
+arguments skips what is already done (URLs that failed are retried unless
+`--skip-failed`). Cleaning, reduction and segmentation run in a process
+pool while threads fetch pages and wait on the API. `--budget` stops the
+run once it has spent that many dollars on the API; the URLs it did not get
+to are left for the next run. `--export parquet csv` writes the postings the
+run stored as flat tables. A summary of URLs/min,
+tokens and cost is printed at the end, or when the run is interrupted.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Set, TextIO
+
+from browser_profiles import DEFAULT_PROFILE, PROFILES
+from export import FORMATS, export_postings
+from job_store import job_store
+from near_duplicates import near_duplicate_index
+from pipeline import BUDGET_EXCEEDED, ScrapeResult, scrape_many
+from recrawl import GONE, recrawl_state
+from usage import pricing, usage_ledger
+
+DEFAULT_OUTPUT = os.path.join('output', 'batch_results.jsonl')
+
+
+# Finished URLs of a batch, with the totals the summary reports
+class BatchCheckpoint:
+    """
+    One row per URL that reached the output, written after its JSONL line
+    is flushed. A crash between the two writes only means the URL is
+    scraped again on resume and appears twice in the output.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "url TEXT PRIMARY KEY, error TEXT, postings INTEGER NOT NULL, "
+                "input_tokens INTEGER NOT NULL, output_tokens INTEGER NOT NULL, "
+                "total_cost REAL NOT NULL, finished REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    # URLs that need no further work: those that succeeded, and with `include_failed` the rest too
+    def finished(self, include_failed: bool = False) -> Set[str]:
+        query = "SELECT url FROM urls" if include_failed else "SELECT url FROM urls WHERE error IS NULL"
+        with self._lock:
+            return {row[0] for row in self._db().execute(query)}
+
+    def record(self, result: ScrapeResult, postings: int) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (result.url, result.error, postings, result.input_tokens, result.output_tokens,
+                 result.total_cost, time.time()),
+            )
+            db.commit()
+
+    # Totals over every run that wrote to this checkpoint
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT COUNT(*), COUNT(error), COALESCE(SUM(postings), 0), COALESCE(SUM(input_tokens), 0), "
+                "COALESCE(SUM(output_tokens), 0), COALESCE(SUM(total_cost), 0) FROM urls"
+            ).fetchone()
+        return dict(zip(("urls", "failed", "postings", "input_tokens", "output_tokens", "total_cost"), row))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Non-blank, non-comment lines of each source, first occurrence only
+def read_urls(sources: Iterable[TextIO]) -> Iterator[str]:
+    seen = set()
+    for source in sources:
+        for line in source:
+            url = line.strip()
+            if url and not url.startswith("#") and url not in seen:
+                seen.add(url)
+                yield url
+
+
+def _open_sources(paths) -> Iterator[TextIO]:
+    for path in paths or ["-"]:
+        if path == "-":
+            yield sys.stdin
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield f
+
+
+# Appends to the JSONL output, dropping a last line cut short by an earlier interruption
+def open_output(path: str) -> TextIO:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(path):
+        with open(path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    return open(path, 'a', encoding='utf-8')
+
+
+def result_record(result: ScrapeResult) -> dict:
+    formatted_data = result.formatted_data
+    metadata = formatted_data.metadata if formatted_data is not None else {}
+    return {
+        "url": result.url,
+        "error": result.error,
+        "status": result.status,
+        "extraction_path": metadata.get("extraction_path"),
+        "postings": len(formatted_data.job_postings) if formatted_data is not None else 0,
+        "html_tokens": result.html_tokens,
+        "input_tokens": result.input_tokens,
+        "output_tokens": result.output_tokens,
+        "total_cost": result.total_cost,
+        "data": formatted_data.model_dump(mode="json") if formatted_data is not None else None,
+    }
+
+
+# Worker processes leave Ctrl+C to the parent, which shuts the pool down
+def _ignore_interrupt() -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def cpu_pool(processes: int) -> ProcessPoolExecutor:
+    executor = ProcessPoolExecutor(max_workers=processes, initializer=_ignore_interrupt)
+    if multiprocessing.get_start_method() == "fork":
+        # Fork every worker now, before the pipeline starts its threads
+        executor.submit(int).result()
+    return executor
+
+
+def print_summary(run: Dict[str, float], elapsed: float, totals: Dict[str, float], paths: Counter) -> None:
+    minutes = max(elapsed, 1e-9) / 60
+    print(f"Scraped {run['urls']} URL(s) in {elapsed:.1f}s ({run['urls'] / minutes:.1f} URLs/min), "
+          f"{run['failed']} failed, {run['postings']} posting(s)")
+    print(f"Tokens: {run['input_tokens']} input, {run['output_tokens']} output; estimated cost ${run['total_cost']:.4f}")
+    if paths:
+        print(f"Extraction paths: {dict(paths)}")
+    print(f"Checkpoint total: {totals['urls']} URL(s), {totals['failed']} failed, "
+          f"{totals['input_tokens'] + totals['output_tokens']} tokens, ${totals['total_cost']:.4f}")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("sources", nargs="*", help="files of URLs, one per line; '-' or none reads stdin")
+    arg_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file the results are appended to")
+    arg_parser.add_argument("--checkpoint", help="checkpoint database (default: the output path + .checkpoint.sqlite3)")
+    arg_parser.add_argument("--skip-failed", action="store_true", help="do not retry URLs that failed in earlier runs")
+    arg_parser.add_argument("--summary", dest="summary_path", help="also write the run summary to this JSON file")
+    arg_parser.add_argument("--model", default="gpt-4o-mini", choices=list(pricing))
+    arg_parser.add_argument("--fetch-workers", type=int, default=4)
+    arg_parser.add_argument("--processes", type=int, default=os.cpu_count() or 2,
+                            help="worker processes for cleaning, reduction and segmentation; 0 cleans in threads")
+    arg_parser.add_argument("--llm-workers", type=int, default=8)
+    arg_parser.add_argument("--budget", type=float, default=usage_ledger.budget,
+                            help="dollars this run may spend on the API (default: SCRAPER_BUDGET_USD, no limit)")
+    arg_parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(PROFILES))
+    arg_parser.add_argument("--recrawl", action="store_true", help="skip pages unchanged since they were last scraped")
+    arg_parser.add_argument("--dedup", action="store_true", help="reuse extractions of near-duplicate pages")
+    arg_parser.add_argument("--no-segment", dest="segment", action="store_false",
+                            help="extract multi-posting pages whole")
+    arg_parser.add_argument("--export", nargs="+", default=[], choices=list(FORMATS),
+                            help="also export the postings stored by this run as flat tables")
+    args = arg_parser.parse_args(argv)
+    usage_ledger.budget = args.budget
+
+    checkpoint = BatchCheckpoint(args.checkpoint or args.output + ".checkpoint.sqlite3")
+    done = checkpoint.finished(include_failed=args.skip_failed)
+    if done:
+        print(f"Resuming: {len(done)} URL(s) already done in {checkpoint.path}")
+    urls = (url for url in read_urls(_open_sources(args.sources)) if url not in done)
+
+    executor = cpu_pool(args.processes) if args.processes > 0 else None
+    run = dict.fromkeys(("urls", "failed", "postings", "input_tokens", "output_tokens", "total_cost"), 0)
+    paths: Counter = Counter()
+    interrupted = False
+    over_budget = 0
+    scraped = []  # pages whose postings this run stored or found unchanged, for --export
+    start = time.perf_counter()
+    results = scrape_many(urls, model=args.model, fetch_workers=args.fetch_workers,
+                          cpu_workers=max(2, args.processes), llm_workers=args.llm_workers,
+                          state=recrawl_state if args.recrawl else None, profile=args.profile,
+                          segment=args.segment, duplicates=near_duplicate_index if args.dedup else None,
+                          cpu_executor=executor)
+    try:
+        with open_output(args.output) as output, job_store:
+            for result in results:
+                if result.error and result.error.startswith(BUDGET_EXCEEDED):
+                    # Not scraped: neither written nor checkpointed, so the next run picks it up
+                    over_budget += 1
+                    continue
+                record = result_record(result)
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                checkpoint.record(result, record["postings"])
+
+                run["urls"] += 1
+                run["failed"] += result.error is not None
+                run["postings"] += record["postings"]
+                run["input_tokens"] += result.input_tokens
+                run["output_tokens"] += result.output_tokens
+                run["total_cost"] += result.total_cost
+                if record["extraction_path"]:
+                    paths[record["extraction_path"]] += 1
+                if result.error:
+                    print(f"Failed {result.url}: {result.error}")
+                elif result.status != GONE:
+                    scraped.append(result.url)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted; run again with the same arguments to resume.")
+    finally:
+        results.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    totals = checkpoint.totals()
+    checkpoint.close()
+    print_summary(run, elapsed, totals, paths)
+    if over_budget:
+        print(f"Stopped at the ${args.budget:.4f} budget; {over_budget} queued URL(s) and any not yet read "
+              f"are left for the next run")
+    for file_format in args.export:
+        artifact = export_postings(file_format, scraped_from=scraped)
+        print(f"Exported {artifact.rows} posting(s) to {artifact.path}")
+    if args.summary_path:
+        summary = dict(run, elapsed_s=elapsed, urls_per_min=run["urls"] / max(elapsed, 1e-9) * 60,
+                       extraction_paths=dict(paths), interrupted=interrupted, checkpoint=totals)
+        with open(args.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Loads a job page dressed up like a real site (stylesheet, web fonts, images,
+a video and third-party tag-manager and analytics scripts) with each browser
+fetch profile, and reports bytes transferred, requests served, page-ready
+time and browser memory per profile.
+
+    python -m benchmarks.bench_browser_profiles [--profiles full lean minimal] [--loads 5]
+                                                [--asset-latency 0.05] [--json out.json]
+
+Needs Chrome and chromedriver (see browser_profiles.driver_path). Everything
+is served from a local server; third-party hostnames are pointed at it with
+Chrome's host resolver rules, so blocking is exercised on the real names.
+Memory is the resident set of chromedriver's process tree, read from /proc
+(Linux only).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from browser_profiles import PROFILES, get_profile, navigate
+from page_wait import wait_for_page
+from scraper import setup_selenium
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'job_detail.html')
+THIRD_PARTY_HOSTS = ["www.googletagmanager.com", "www.google-analytics.com", "fonts.gstatic.com", "static.hotjar.com"]
+
+# Path suffix -> (content type, size in bytes)
+ASSETS = {
+    ".css": ("text/css", 60_000),
+    ".woff2": ("font/woff2", 45_000),
+    ".jpg": ("image/jpeg", 180_000),
+    ".png": ("image/png", 40_000),
+    ".mp4": ("video/mp4", 900_000),
+    ".js": ("application/javascript", 90_000),
+}
+
+
+def page_html(port: int, images: int = 12) -> str:
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        html = f.read()
+    head = (
+        '<link rel="stylesheet" href="/static/site.css">'
+        f'<style>@font-face {{font-family: Brand; src: url(http://fonts.gstatic.com:{port}/brand.woff2)}}'
+        ' body {font-family: Brand}</style>'
+        f'<script async src="http://www.googletagmanager.com:{port}/gtm.js"></script>'
+    )
+    body = (
+        "".join(f'<img src="/media/photo-{i}.jpg" alt=""><img src="/media/icon-{i}.png?v=2" alt="">'
+                for i in range(images))
+        + '<video src="/media/intro.mp4" autoplay muted></video>'
+        + f'<script src="http://www.google-analytics.com:{port}/analytics.js"></script>'
+        + f'<script src="http://static.hotjar.com:{port}/hotjar.js"></script>'
+    )
+    return html.replace("</head>", head + "</head>").replace("</body>", body + "</body>")
+
+
+class AssetServer:
+    def __init__(self, asset_latency: float = 0.05):
+        self.asset_latency = asset_latency
+        self.bytes_sent = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.port = self._server.server_port
+        self.page = page_html(self.port).encode('utf-8')
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/job.html":
+                    body, content_type = server.page, "text/html; charset=utf-8"
+                else:
+                    suffix = os.path.splitext(path)[1]
+                    if suffix not in ASSETS:
+                        self.send_error(404)
+                        return
+                    content_type, size = ASSETS[suffix]
+                    body = b"\0" * size
+                    time.sleep(server.asset_latency)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.requests += 1
+                    server.bytes_sent += len(body)
+
+        return Handler
+
+    def take_counts(self):
+        with self._lock:
+            counts = (self.requests, self.bytes_sent)
+            self.requests = self.bytes_sent = 0
+        return counts
+
+    def close(self) -> None:
+        self._server.shutdown()
+
+
+# Resident memory of a process and all its descendants, in bytes
+def tree_rss(pid: int) -> int:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat", 'r') as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/statm", 'r') as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            pass
+        stack.extend(children.get(current, []))
+    return total
+
+
+def run(profile_name: str, server: AssetServer, loads: int) -> dict:
+    rules = ", ".join(f"MAP {host} 127.0.0.1" for host in THIRD_PARTY_HOSTS)
+    profile = get_profile(profile_name)
+    profile = profile._replace(extra_arguments=profile.extra_arguments + (f"--host-resolver-rules={rules}",))
+    url = f"http://127.0.0.1:{server.port}/job.html"
+
+    driver = setup_selenium(profile)
+    try:
+        ready, requests, transferred = [], [], []
+        for _ in range(loads):
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            server.take_counts()
+            start = time.perf_counter()
+            eager = navigate(driver, url).page_load_strategy == "eager"
+            wait_for_page(driver, url, stats=None, eager=eager, quiet_ms=300)
+            ready.append(time.perf_counter() - start)
+            served, sent = server.take_counts()
+            requests.append(served)
+            transferred.append(sent)
+        rss = tree_rss(driver.service.process.pid) if os.path.isdir("/proc") else 0
+    finally:
+        driver.quit()
+    return {
+        "profile": profile_name,
+        "ready_median_s": statistics.median(ready),
+        "requests_per_page": statistics.median(requests),
+        "bytes_per_page": statistics.median(transferred),
+        "browser_rss_mb": rss / 1e6,
+    }
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    arg_parser.add_argument("--loads", type=int, default=5)
+    arg_parser.add_argument("--asset-latency", type=float, default=0.05, help="seconds before each asset is served")
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+
+    server = AssetServer(args.asset_latency)
+    results = []
+    try:
+        for name in args.profiles:
+            result = run(name, server, args.loads)
+            results.append(result)
+            print(f"{name:<8} ready {result['ready_median_s']:6.2f}s  {result['requests_per_page']:4} requests  "
+                  f"{result['bytes_per_page'] / 1e3:8.1f} kB/page  browser RSS {result['browser_rss_mb']:7.1f} MB")
+    finally:
+        server.close()
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Checks clean_html against the reference implementation on the fixture pages
+and reports pages/sec and peak memory for each cleaner.
+
+    python -m benchmarks.bench_clean_html [--sizes 100000 1000000 3000000] [--json out.json]
+
+Peak memory is measured with tracemalloc, so it covers the Python heap only;
+memory libxml2 allocates for the lxml tree is not included.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+import lxml.html
+
+from benchmarks.synthetic import job_board_page
+from html_cleaner import clean_html_fast
+from scraper import clean_html_reference
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+CLEANERS = {
+    "reference (bs4 + html.parser)": clean_html_reference,
+    "single-pass (lxml)": clean_html_fast,
+}
+
+
+def _norm(text) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+# Tag, attributes and whitespace-normalised text of every node, in document order
+def canonical_dom(html: str) -> list:
+    nodes = []
+    for el in lxml.html.document_fromstring(html).iter():
+        tag = el.tag if isinstance(el.tag, str) else "#comment"
+        attrs = tuple(sorted((k, " ".join(v.split()) if k == "class" else v) for k, v in el.attrib.items()))
+        nodes.append((tag, attrs, _norm(el.text), _norm(el.tail)))
+    return nodes
+
+
+def fixture_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    pages["synthetic_50k"] = job_board_page(50_000, seed=1)
+    return pages
+
+
+# The cleaned DOM must match the reference once both are parsed the same way
+def check_equivalence() -> bool:
+    ok = True
+    for name, html in fixture_pages().items():
+        if canonical_dom(clean_html_fast(html)) != canonical_dom(clean_html_reference(html)):
+            print(f"MISMATCH: {name}")
+            ok = False
+    print("Equivalence:", "ok" if ok else "FAILED")
+    return ok
+
+
+def measure(clean, html: str, min_seconds: float = 2.0) -> dict:
+    tracemalloc.start()
+    clean(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        clean(html)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    return {"pages_per_sec": runs / elapsed, "peak_mb": peak / 1_000_000}
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 3_000_000])
+    arg_parser.add_argument("--min-seconds", type=float, default=2.0)
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+
+    if not check_equivalence():
+        return 1
+
+    results = []
+    for size in args.sizes:
+        html = job_board_page(size)
+        for name, clean in CLEANERS.items():
+            result = {"cleaner": name, "bytes": len(html), **measure(clean, html, args.min_seconds)}
+            results.append(result)
+            print(f"{len(html) / 1e6:5.2f} MB  {name:<28} {result['pages_per_sec']:8.2f} pages/sec  "
+                  f"peak {result['peak_mb']:7.1f} MB")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+Runs the whole pipeline (fetch, clean, reduce, segment, extract, save)
+over a corpus of recorded and synthetic job pages served from a
+local HTTP server, with extraction answered by the mock OpenAI server.
+
+    python -m benchmarks.bench_end_to_end [--copies 5] [--ttft 0.6] [--tokens-per-second 80] [--speed 10]
+                                          [--recording PATH] [--processes 0] [--json out.json]
+                                          [--compare baseline.json]
+
+The corpus is every fixture page that plain HTTP fetching accepts (JSON-LD
+detail pages, the same detail page with its JSON-LD removed, a multi-posting
+careers page) and synthetic job boards of several sizes. Each page is served
+`--copies` times under its own URL, with the copy number written into the
+title and body so no copy hits the extraction cache. The mock answers with
+one posting per "Apply" link in the prompt (see bench_segmentation), or
+replays `--recording` for every request. Rate limits are lifted so the
+mock's latency, not the scheduler, bounds extraction.
+
+Reports URLs/sec, p50/p95 wall time per stage, peak RSS of this process
+(worker processes are not included) and token counts. `--json` writes them
+with the commit they were measured on, and `--compare` prints the change
+against an earlier `--json` file. Nothing is written to the repository's
+output/; the run works in a temporary directory, entered before the
+pipeline is imported since some of its state is read at import time. The
+run fails if the mock API received no requests, which is what happens with
+openai>=1 (it ignores `openai.api_base`).
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import openai
+
+from benchmarks.mock_openai import MockOpenAIServer, load_recording
+from benchmarks.synthetic import job_board_page
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures')
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+SYNTHETIC_SIZES = (20_000, 50_000, 120_000)
+_JSON_LD_RE = re.compile(r'<script type="application/ld\+json">.*?</script>', re.DOTALL)
+_BODY_RE = re.compile(r"<body[^>]*>")
+
+# Headline numbers shown by --compare; for each, whether higher is better
+COMPARED = {
+    "urls_per_s": True,
+    "peak_rss_mb": False,
+    "html_tokens": False,
+    "input_tokens": False,
+    "output_tokens": False,
+}
+
+
+def _read(*parts: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, *parts), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# Page name -> HTML, covering detail pages, a careers page and job boards of different sizes
+def corpus() -> Dict[str, str]:
+    pages = {"job_detail": _read("job_detail.html")}
+    pages["job_detail_no_jsonld"] = _JSON_LD_RE.sub("", pages["job_detail"])
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'board', 'job', '*.html'))):
+        pages["board_job_" + os.path.splitext(os.path.basename(path))[0]] = _read('board', 'job', os.path.basename(path))
+    pages["careers_page"] = _read("careers_page.html")
+    for size in SYNTHETIC_SIZES:
+        pages[f"job_board_{size // 1000}kb"] = job_board_page(size, seed=size)
+    return pages
+
+
+# The page with its copy number in the title and at the top of the body
+def page_copy(html: str, name: str, copy: int) -> str:
+    html = html.replace("<title>", f"<title>[{copy}] ", 1)
+    return _BODY_RE.sub(lambda m: m.group(0) + f"<p>Listing reference {name}-{copy}</p>", html, count=1)
+
+
+class PageServer:
+    def __init__(self, pages: Dict[str, str], copies: int, latency: float = 0.0):
+        self.latency = latency
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.pages = {
+            f"/{name}/{copy}.html": page_copy(html, name, copy).encode('utf-8')
+            for name, html in pages.items() for copy in range(copies)
+        }
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        return Handler
+
+    def urls(self):
+        return [self.base + path for path in self.pages]
+
+    def close(self) -> None:
+        self._server.shutdown()
+
+
+def current_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def run(args, server: PageServer) -> dict:
+    from instrumentation import _peak_rss_mb, recorder
+    from job_store import JobStore
+    from pipeline import scrape_many
+
+    executor = None
+    if args.processes:
+        from batch import cpu_pool
+        executor = cpu_pool(args.processes)
+
+    store = JobStore(os.path.join('output', 'jobs.sqlite3'))
+    first_record = recorder.mark()
+    by_page: Dict[str, Counter] = {}
+    totals = Counter()
+    start = time.perf_counter()
+    try:
+        for result in scrape_many(server.urls(), model=args.model, fetch_workers=args.fetch_workers,
+                                  cpu_workers=args.cpu_workers, llm_workers=args.llm_workers, store=store,
+                                  segment=args.segment, cpu_executor=executor):
+            name = result.url[len(server.base) + 1:].split("/", 1)[0]
+            page = by_page.setdefault(name, Counter())
+            postings = len(result.formatted_data.job_postings) if result.formatted_data is not None else 0
+            for counts in (page, totals):
+                counts["urls"] += 1
+                counts["errors"] += result.error is not None
+                counts["postings"] += postings
+                counts["html_tokens"] += result.html_tokens
+                counts["input_tokens"] += result.input_tokens
+                counts["output_tokens"] += result.output_tokens
+            if result.error:
+                print(f"Failed {result.url}: {result.error}")
+    finally:
+        elapsed = time.perf_counter() - start
+        store.close()
+        if executor is not None:
+            executor.shutdown()
+
+    return {
+        "elapsed_s": elapsed,
+        "urls_per_s": totals["urls"] / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "bytes_served": server.bytes_sent,
+        **{key: totals[key] for key in ("urls", "errors", "postings", "html_tokens", "input_tokens", "output_tokens")},
+        "stages": recorder.summary(recorder.since(first_record)),
+        "pages": {name: dict(counts) for name, counts in sorted(by_page.items())},
+    }
+
+
+def compare(result: dict, baseline: dict) -> None:
+    print(f"Compared with {baseline.get('commit') or 'baseline'}:")
+    for key, higher_is_better in COMPARED.items():
+        before, after = baseline["results"].get(key), result["results"].get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {key:<20} {before:12,.2f} -> {after:12,.2f}  {change:+7.1%}{'  better' if better and change else ''}")
+    stages = baseline["results"].get("stages", {})
+    for stage, summary in result["results"]["stages"].items():
+        if stage in stages and stages[stage]["wall_p50_s"]:
+            before, after = stages[stage]["wall_p50_s"], summary["wall_p50_s"]
+            print(f"  {stage + ' p50':<20} {before * 1000:10,.1f}ms -> {after * 1000:10,.1f}ms  {(after - before) / before:+7.1%}")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--copies", type=int, default=5, help="URLs served per corpus page")
+    arg_parser.add_argument("--page-latency", type=float, default=0.0, help="seconds before each page is served")
+    arg_parser.add_argument("--ttft", type=float, default=0.6, help="seconds to the first token")
+    arg_parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    arg_parser.add_argument("--speed", type=float, default=10.0, help="divide every mock delay by this factor")
+    arg_parser.add_argument("--recording", help="replay this recorded completion for every request")
+    arg_parser.add_argument("--model", default="gpt-4o-mini")
+    arg_parser.add_argument("--fetch-workers", type=int, default=4)
+    arg_parser.add_argument("--cpu-workers", type=int, default=2)
+    arg_parser.add_argument("--llm-workers", type=int, default=8)
+    arg_parser.add_argument("--processes", type=int, default=0, help="clean and price in this many processes")
+    arg_parser.add_argument("--no-segment", dest="segment", action="store_false")
+    arg_parser.add_argument("--json", dest="json_path")
+    arg_parser.add_argument("--compare", dest="baseline_path", help="an earlier --json file to compare against")
+    args = arg_parser.parse_args(argv)
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    baseline_path = os.path.abspath(args.baseline_path) if args.baseline_path else None
+
+    # Caches, the job store and metrics all live under output/ of the working directory, and fetch
+    # decisions and page-wait stats are loaded on import, so nothing from the pipeline is imported before this
+    os.chdir(tempfile.mkdtemp(prefix="bench-end-to-end-"))
+    from benchmarks.bench_segmentation import responder
+    from rate_limiter import completion_scheduler
+
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    completion_scheduler.limits = {args.model: {"rpm": 1_000_000, "tpm": 1_000_000_000}}
+    if args.recording:
+        mock = MockOpenAIServer(load_recording(args.recording), speed=args.speed)
+    else:
+        mock = MockOpenAIServer(responder=responder(args.tokens_per_second, args.ttft), speed=args.speed)
+    server = PageServer(corpus(), args.copies, args.page_latency)
+    try:
+        with mock:
+            openai.api_base = mock.url
+            results = run(args, server)
+            results["api_requests"] = sum(mock.requests.values())
+    finally:
+        server.close()
+    if not results["api_requests"]:
+        print("The mock API received no requests, so extraction did not go through it; "
+              "the openai package must be <1 for openai.api_base to be used", file=sys.stderr)
+        return 1
+
+    print(f"{results['urls']} URLs in {results['elapsed_s']:.2f}s ({results['urls_per_s']:.1f} URLs/s), "
+          f"{results['errors']} errors, {results['postings']} postings, {results['api_requests']} API calls")
+    print(f"Tokens: {results['html_tokens']:,} page, {results['input_tokens']:,} prompt, "
+          f"{results['output_tokens']:,} completion; peak RSS {results['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'cpu p50 ms':>12}")
+    for stage, summary in results["stages"].items():
+        print(f"{stage:<16}{summary['count']:>7}{summary['wall_p50_s'] * 1000:>10.1f}"
+              f"{summary['wall_p95_s'] * 1000:>10.1f}{summary['cpu_p50_s'] * 1000:>12.1f}")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("json_path", "baseline_path")}
+    output = {
+        "benchmark": "end_to_end",
+        "commit": current_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            compare(output, json.load(f))
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+    return 0 if results["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Builds the near-duplicate index over synthetic postings and measures insert
+and lookup throughput, memory, and how well reposts are told apart from
+other postings of the same company.
+
+    python -m benchmarks.bench_near_duplicates [--postings 100000] [--threshold 0.9] [--json out.json]
+
+Reposts keep the posting but change the date, add tracking parameters to
+the links, reorder the company boilerplate and add the board's own header.
+Distinct postings of the same company share that boilerplate, which makes
+them the hardest non-duplicates. Memory is what the index's numpy arrays
+hold (NearDuplicateIndex.memory_bytes).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import _WORDS
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex
+
+BATCH = 5_000
+VOCABULARY = [f"{word}{n}" for word in _WORDS for n in range(50)]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, k=words)).capitalize() + "."
+
+
+def company_boilerplate(company: int) -> list:
+    rng = random.Random(f"company-{company}")
+    return [_paragraph(rng, 45) for _ in range(3)]
+
+
+def posting_text(posting: int, companies: int, repost: bool = False) -> str:
+    rng = random.Random(f"posting-{posting}")
+    company = posting % companies
+    boilerplate = company_boilerplate(company)
+    title = f"# Senior {rng.choice(_WORDS).capitalize()} Engineer at Company {company}"
+    posted = f"Posted {rng.randrange(1, 30)} days ago"
+    apply = f"[Apply](https://jobs.company{company}.example/apply/{posting})"
+    body = [_paragraph(rng, 120), _paragraph(rng, 90), "- " + _paragraph(rng, 20), "- " + _paragraph(rng, 20)]
+    if repost:
+        variant = random.Random(f"repost-{posting}")
+        variant.shuffle(boilerplate)
+        posted = f"Posted {variant.randrange(1, 30)} days ago"
+        apply = apply[:-1] + f"?utm_source=board{variant.randrange(9)}&utm_medium=feed&ref={variant.randrange(10**6)})"
+        title = f"## Found on Job Board {variant.randrange(9)}\n" + title
+    return "\n".join([title, posted] + body + boilerplate + [apply])
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--postings", type=int, default=100_000)
+    arg_parser.add_argument("--queries", type=int, default=2_000, help="reposts and fresh postings each")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+    companies = max(1, args.postings // 20)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="near-duplicates-"), "index.sqlite3")
+    index = NearDuplicateIndex(path, threshold=args.threshold)
+    start = time.perf_counter()
+    for batch_start in range(0, args.postings, BATCH):
+        batch = range(batch_start, min(args.postings, batch_start + BATCH))
+        index.add_many((f"posting/{i}", index.signature(posting_text(i, companies)), None) for i in batch)
+    build_s = time.perf_counter() - start
+    index_mb = index.memory_bytes() / 1e6
+
+    rng = random.Random(0)
+    reposts = rng.sample(range(args.postings), min(args.queries, args.postings))
+    fresh = range(args.postings, args.postings + args.queries)
+    start = time.perf_counter()
+    found = 0
+    for i in reposts:
+        match = index.match(index.signature(posting_text(i, companies, repost=True)))
+        found += match is not None and match.url == f"posting/{i}"
+    false_matches = sum(1 for i in fresh if index.match(index.signature(posting_text(i, companies))))
+    query_s = time.perf_counter() - start
+
+    index.close()
+    reloaded = NearDuplicateIndex(path, threshold=args.threshold)
+    start = time.perf_counter()
+    loaded = len(reloaded)
+    load_s = time.perf_counter() - start
+
+    result = {
+        "postings": args.postings,
+        "threshold": args.threshold,
+        "bands": index.bands,
+        "rows": index.rows,
+        "build_postings_per_s": args.postings / build_s,
+        "index_mb": index_mb,
+        "bytes_per_posting": index_mb * 1e6 / args.postings,
+        "queries_per_s": (len(reposts) + len(fresh)) / query_s,
+        "repost_recall": found / len(reposts),
+        "false_match_rate": false_matches / len(fresh),
+        "reload_s": load_s,
+    }
+    print(f"Indexed {args.postings} postings at {result['build_postings_per_s']:,.0f}/s "
+          f"({index.bands} bands x {index.rows} rows, threshold {args.threshold})")
+    print(f"Index memory: {index_mb:.1f} MB ({result['bytes_per_posting']:.0f} bytes per posting); "
+          f"reloaded {loaded} postings from SQLite in {load_s:.2f}s")
+    print(f"Lookups: {result['queries_per_s']:,.0f}/s; reposts found {result['repost_recall']:.1%}, "
+          f"other postings of the same companies matched {result['false_match_rate']:.1%}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
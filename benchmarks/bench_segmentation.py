@@ -0,0 +1,127 @@
+"""
+Compares whole-page extraction with per-posting segmented extraction on the
+fixture pages, against the mock OpenAI server.
+
+    python -m benchmarks.bench_segmentation [--speed 10] [--tokens-per-second 80] [--ttft 0.6] [--json out.json]
+
+The mock answers every prompt with one posting per "Apply" link it contains,
+generated at `--tokens-per-second` after `--ttft` seconds, so latency grows
+with the length of the completion as it does with the real API. `--speed`
+divides every delay; the ratio between the two paths does not depend on it.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import openai
+
+from benchmarks.mock_openai import MockOpenAIServer, record_completion
+from benchmarks.synthetic import job_board_page
+from rate_limiter import CompletionScheduler
+from scraper import clean_html, format_data, format_segments
+from html_reducer import reduce_html
+from segmenter import segment_texts
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+_APPLY_RE = re.compile(r"\[Apply")
+
+
+def pages() -> dict:
+    pages = {}
+    for name in ("careers_page.html", "job_detail.html"):
+        with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+            pages[name] = f.read()
+    pages["synthetic board (20 kB)"] = job_board_page(20_000)
+    return pages
+
+
+def _posting(k: int) -> dict:
+    return {
+        "job_title": f"Posting {k}",
+        "company_name": "Northwind Analytics",
+        "locations": [{"city": "Berlin", "country": "Germany"}],
+        "job_tags": ["python", "sql", "spark"],
+        "employment_type": "Full-Time",
+        "salary": {"currency": "EUR", "min_salary": 80000, "max_salary": 100000, "frequency": "yearly"},
+        "job_description": "Own the pipelines that feed our pricing models, from ingestion to the feature store. " * 4,
+        "responsibilities": ["Build and operate batch and streaming jobs", "Define data contracts", "Keep latency low"],
+        "requirements": ["5+ years building data pipelines", "Strong Python and SQL", "Airflow or Dagster"],
+        "skills": ["Python", "SQL", "Spark"],
+        "educational_qualifications": [{"degree": "BSc", "field_of_study": "Computer Science"}],
+        "date_posted": "2 days ago",
+        "application_deadline": None,
+        "application_link": f"https://jobs.example.com/apply/{k}",
+    }
+
+
+def responder(tokens_per_second: float, ttft: float):
+    def respond(request: dict) -> list:
+        prompt = request["messages"][-1]["content"]
+        count = max(1, len(_APPLY_RE.findall(prompt)))
+        content = json.dumps({
+            "job_postings": [_posting(k) for k in range(count)],
+            "metadata": {"source_type": "job board", "total_job_postings": count},
+        })
+        # record_completion's chunks are about one token each
+        return record_completion(content, chunk_chars=4, first_delay=ttft, delay=1 / tokens_per_second)
+    return respond
+
+
+def run(name: str, html: str) -> dict:
+    cleaned = clean_html(html)
+    page_text = reduce_html(cleaned).text
+    segments = segment_texts(cleaned)
+
+    start = time.perf_counter()
+    whole = format_data(page_text, cache=None, scheduler=CompletionScheduler())
+    whole_s = time.perf_counter() - start
+
+    result = {"page": name, "segments": len(segments), "whole_page_s": whole_s,
+              "whole_page_postings": len(whole.job_postings) if whole else 0}
+    if segments:
+        start = time.perf_counter()
+        segmented = format_segments(segments, cache=None, scheduler=CompletionScheduler())
+        result["segmented_s"] = time.perf_counter() - start
+        result["segmented_postings"] = len(segmented.job_postings) if segmented else 0
+        result["total_job_postings"] = segmented.metadata["total_job_postings"] if segmented else 0
+    return result
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--speed", type=float, default=10.0, help="divide every mock delay by this factor")
+    arg_parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    arg_parser.add_argument("--ttft", type=float, default=0.6, help="seconds to the first token")
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    results = []
+    ok = True
+    with MockOpenAIServer(responder=responder(args.tokens_per_second, args.ttft), speed=args.speed) as server:
+        openai.api_base = server.url
+        for name, html in pages().items():
+            result = run(name, html)
+            results.append(result)
+            line = f"{name:<26} whole page {result['whole_page_s']:6.2f}s ({result['whole_page_postings']} postings)"
+            if result["segments"]:
+                line += (f"  segmented {result['segmented_s']:6.2f}s ({result['segmented_postings']} postings"
+                         f" from {result['segments']} segments)  {result['whole_page_s'] / result['segmented_s']:.1f}x faster")
+                ok = ok and result["segmented_postings"] == result["whole_page_postings"] == result["total_job_postings"]
+            else:
+                line += "  not segmented: whole-page extraction"
+            print(line)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if not ok:
+        print("FAILED: segmented and whole-page extraction found different numbers of postings")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
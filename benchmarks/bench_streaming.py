@@ -0,0 +1,70 @@
+"""
+Measures time-to-first-posting and time-to-all-postings for blocking and
+streaming extraction against the mock OpenAI server replaying a recording.
+
+    python -m benchmarks.bench_streaming [--recording PATH] [--speed 1.0] [--json out.json]
+
+Uses the legacy openai.ChatCompletion client pointed at the mock server, so
+no API key or network access is needed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import openai
+
+from benchmarks.mock_openai import MockOpenAIServer, load_recording
+from rate_limiter import CompletionScheduler
+from scraper import format_data
+
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'streams', 'board_page.jsonl')
+PAGE_TEXT = "# Job board\n- Placeholder page text; the mock server replays the same completion for any prompt."
+
+
+def run(stream: bool) -> dict:
+    arrivals = []
+    start = time.perf_counter()
+    on_posting = (lambda posting: arrivals.append(time.perf_counter() - start)) if stream else None
+    result = format_data(PAGE_TEXT, cache=None, scheduler=CompletionScheduler(), on_posting=on_posting)
+    done = time.perf_counter() - start
+    if result is None:
+        raise RuntimeError("extraction failed; see the error printed above")
+    return {
+        "mode": "streaming" if stream else "blocking",
+        "postings": len(result.job_postings),
+        "first_posting_s": arrivals[0] if arrivals else done,
+        "all_postings_s": done,
+        "arrivals_s": arrivals or [done] * len(result.job_postings),
+    }
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--recording", default=RECORDING)
+    arg_parser.add_argument("--speed", type=float, default=1.0, help="divide recorded delays by this factor")
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+
+    os.environ.setdefault("OPENAI_API_KEY", "mock-key")
+    results = []
+    with MockOpenAIServer(load_recording(args.recording), speed=args.speed) as server:
+        openai.api_base = server.url
+        for stream in (False, True):
+            result = run(stream)
+            results.append(result)
+            print(f"{result['mode']:<10} {result['postings']} postings  first after {result['first_posting_s']:6.2f}s  "
+                  f"all after {result['all_postings_s']:6.2f}s")
+
+    blocking, streaming = results
+    print(f"Time to first posting: {blocking['first_posting_s'] / streaming['first_posting_s']:.1f}x sooner when streaming")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Reports postings validated per second for the original parse_raw path
+(uncached dateutil for every date) and the pydantic v2 fast paths.
+
+    python -m benchmarks.bench_validation [--postings 2000] [--json out.json]
+
+Dates are drawn from a small pool, as on a real board, so the memoised
+normaliser mostly hits its cache; it is cleared before every timed run.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import warnings
+
+import scraper
+from date_normalizer import _normalize, cache_info
+from scraper import JobPostingsContainer, parse_container, parse_date, parse_postings
+
+DATE_POOL = [
+    "2024-09-12", "2024-09-30T00:00:00Z", "September 12, 2024", "12 Sep 2024", "09/12/2024",
+    "3 days ago", "1 week ago", "30+ days ago", "Posted today", "Ongoing",
+]
+
+
+def synthetic_postings(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [{
+        "job_title": f"Software Engineer {i % 50}",
+        "company_name": f"Company {i % 20}",
+        "locations": [{"city": "Berlin", "state": None, "country": "Germany"}],
+        "job_tags": ["python", "ml"],
+        "employment_type": "Full-Time",
+        "salary": {"min": 90_000, "max": 120_000, "currency": "EUR", "period": None},
+        "job_description": "Build and run data pipelines. " * 20,
+        "responsibilities": ["Design services", "Review code"],
+        "requirements": ["5 years of Python"],
+        "skills": ["Python", "SQL"],
+        "educational_qualifications": [{"degree": "Bachelor's", "field_of_study": None}],
+        "date_posted": rng.choice(DATE_POOL),
+        "application_deadline": rng.choice(DATE_POOL),
+        "application_link": f"https://example.com/jobs/{i}",
+    } for i in range(count)]
+
+
+# The original path: parse_raw, and dateutil on every date string
+def reference(container_json: str, postings_json: str):
+    normalize_date = scraper.normalize_date
+    scraper.normalize_date = lambda value, anchor=None: parse_date(value)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return JobPostingsContainer.parse_raw(container_json)
+    finally:
+        scraper.normalize_date = normalize_date
+
+
+PATHS = {
+    "reference (parse_raw + dateutil)": reference,
+    "model_validate_json (container)": lambda container_json, postings_json: parse_container(container_json),
+    "TypeAdapter batch (postings)": lambda container_json, postings_json: parse_postings(postings_json),
+}
+
+
+def measure(validate, container_json: str, postings_json: str, count: int, min_seconds: float) -> float:
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        _normalize.cache_clear()
+        validate(container_json, postings_json)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * count / elapsed
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--postings", type=int, default=2_000)
+    arg_parser.add_argument("--min-seconds", type=float, default=2.0)
+    arg_parser.add_argument("--json", dest="json_path")
+    args = arg_parser.parse_args(argv)
+
+    postings = synthetic_postings(args.postings)
+    postings_json = json.dumps(postings)
+    container_json = json.dumps({"job_postings": postings, "metadata": {"total_job_postings": len(postings)}})
+
+    results = []
+    for name, validate in PATHS.items():
+        rate = measure(validate, container_json, postings_json, len(postings), args.min_seconds)
+        results.append({"path": name, "postings": len(postings), "postings_per_sec": rate})
+        print(f"{name:<36} {rate:10.0f} postings/sec")
+    print(f"Date cache after the last run: {cache_info()}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Crawls the fixture job board in benchmarks/fixtures/board from a local HTTP
+server and checks discovery, dedup, resume and per-host politeness.
+
+    python -m benchmarks.check_crawler [--delay 0.2] [--scrape]
+
+--scrape also runs every discovered posting through crawl_and_scrape; the
+fixture postings carry complete JSON-LD, so no API call is made.
+"""
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from crawler import DONE, LISTING, POSTING, Frontier, crawl, crawl_and_scrape, normalize_url
+from http_fetch import HostLimiter
+from job_store import JobStore
+
+BOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'board')
+POSTINGS = ["backend-engineer", "data-scientist", "frontend-engineer", "ml-engineer", "platform-engineer"]
+LISTING_PAGES = 3
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append((time.monotonic(), self.path))
+        super().do_GET()
+
+
+def serve_board() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=BOARD_DIR))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--delay", type=float, default=0.2, help="seconds between requests to the board")
+    arg_parser.add_argument("--scrape", action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    server = serve_board()
+    base = f"http://127.0.0.1:{server.server_port}"
+    expected = {normalize_url(f"{base}/job/{slug}.html") for slug in POSTINGS}
+    work_dir = tempfile.mkdtemp(prefix="crawler-check-")
+    frontier = Frontier(os.path.join(work_dir, "frontier.sqlite3"))
+    limiter = HostLimiter(max_concurrent=1, delay=args.delay)
+    ok = True
+
+    found = list(crawl([f"{base}/index.html?utm_source=check"], frontier, limiter))
+    listings = frontier.stats().get(LISTING, {}).get(DONE, 0)
+    print(f"Discovered {len(found)} postings from {listings} listing pages")
+    if sorted(found) != sorted(expected) or listings != LISTING_PAGES:
+        print(f"FAILED: expected {len(expected)} unique postings from {LISTING_PAGES} pages, got {sorted(found)}")
+        ok = False
+
+    starts = [t for t, _ in _QuietHandler.requests]
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    if gaps and min(gaps) < args.delay * 0.9:
+        print(f"FAILED: requests {min(gaps):.3f}s apart, limit is {args.delay}s")
+        ok = False
+    else:
+        print(f"Politeness: {len(starts)} requests, smallest gap {min(gaps, default=0):.3f}s")
+
+    # Postings handed out but not finished come back when the crawl resumes
+    finished = sorted(found)[:2]
+    for url in finished:
+        frontier.mark(url, DONE)
+    frontier.close()
+    frontier = Frontier(frontier.path)
+    resumed = list(crawl([f"{base}/index.html"], frontier, limiter))
+    print(f"Resumed crawl: {len(resumed)} unfinished postings handed out again")
+    if sorted(resumed) != sorted(set(expected) - set(finished)):
+        ok = False
+    for url in resumed:
+        frontier.mark(url, DONE)
+    if list(crawl([f"{base}/index.html"], frontier, limiter)):
+        print("FAILED: a finished crawl handed out postings again")
+        ok = False
+
+    if args.scrape:
+        frontier = Frontier(os.path.join(work_dir, "scrape-frontier.sqlite3"))
+        store = JobStore(os.path.join(work_dir, "jobs.sqlite3"))
+        results = list(crawl_and_scrape([f"{base}/index.html"], frontier=frontier, limiter=limiter, store=store))
+        failed = [r for r in results if r.error]
+        print(f"Scraped {len(results)} postings ({len(failed)} failed); {store.count()} in the job store")
+        ok = ok and not failed and frontier.stats().get(POSTING, {}).get(DONE) == len(expected)
+
+    server.shutdown()
+    print("Crawler check:", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
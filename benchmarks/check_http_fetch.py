@@ -0,0 +1,122 @@
+"""
+Serves fixture pages from a local HTTP server and checks the plain-HTTP
+fast path in front of the browser: a server-rendered page is accepted over
+HTTP, a JavaScript shell escalates to the browser, and each domain's
+decision is remembered, in memory and across restarts.
+
+    python -m benchmarks.check_http_fetch
+
+The server answers on 127.0.0.1 and on localhost, which count as two
+domains: one serves job_detail.html, the other js_shell.html. No browser is
+launched; escalations are answered by a stand-in that records them.
+"""
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import scraper
+from http_fetch import BROWSER, HTTP, FetchDecisions, HttpFetcher
+from page_wait import domain_of
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RENDERED = "<html><body><div class='job-description'>Rendered by the browser</div></body></html>"
+
+
+class _RecordingHandler(SimpleHTTPRequestHandler):
+    # Keep-alive, so the fetcher's pooled connections are reused
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append({
+            "path": self.path,
+            "host": self.headers.get("Host", "").split(":")[0],
+            "port": self.client_address[1],
+            "accept_encoding": self.headers.get("Accept-Encoding", ""),
+        })
+        super().do_GET()
+
+
+def serve_fixtures() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_RecordingHandler, directory=FIXTURES_DIR))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.parse_args(argv)
+
+    server = serve_fixtures()
+    port = server.server_port
+    rendered_url = f"http://127.0.0.1:{port}/job_detail.html"
+    shell_url = f"http://localhost:{port}/js_shell.html"
+    decisions_path = os.path.join(tempfile.mkdtemp(prefix="http-fetch-check-"), "fetch_decisions.json")
+
+    browser_fetches = []
+
+    def browser(url, pool=None, selector=None, infinite_scroll=None):
+        browser_fetches.append(url)
+        return RENDERED
+
+    checks = []
+
+    def check(name: str, passed: bool, detail: str = "") -> None:
+        checks.append(passed)
+        print(f"{'ok' if passed else 'FAILED'}: {name}{' (' + detail + ')' if detail else ''}")
+
+    fetch_html_selenium = scraper.fetch_html_selenium
+    scraper.fetch_html_selenium = browser
+    try:
+        with HttpFetcher(decisions=FetchDecisions(decisions_path)) as http:
+            html = scraper.fetch_html(rendered_url, http=http)
+            check("server-rendered page is accepted over HTTP",
+                  "job-description" in html and not browser_fetches
+                  and http.decisions.mode_for(domain_of(rendered_url)) == HTTP)
+
+            html = scraper.fetch_html(shell_url, http=http)
+            check("JavaScript shell escalates to the browser",
+                  html == RENDERED and browser_fetches == [shell_url]
+                  and http.decisions.mode_for(domain_of(shell_url)) == BROWSER)
+
+            probes = len(_RecordingHandler.requests)
+            scraper.fetch_html(shell_url, http=http)
+            scraper.fetch_html(rendered_url, http=http)
+            shell_probes = [r for r in _RecordingHandler.requests[probes:] if r["host"] == "localhost"]
+            check("browser domain skips the HTTP probe",
+                  not shell_probes and browser_fetches == [shell_url, shell_url],
+                  f"{len(shell_probes)} probe(s)")
+            check("HTTP domain stays on HTTP", len(browser_fetches) == 2)
+
+        # A new process starts from the saved decisions
+        with HttpFetcher(decisions=FetchDecisions(decisions_path)) as http:
+            probes = len(_RecordingHandler.requests)
+            scraper.fetch_html(shell_url, http=http)
+            check("decisions survive a restart",
+                  http.decisions.mode_for(domain_of(rendered_url)) == HTTP
+                  and http.decisions.mode_for(domain_of(shell_url)) == BROWSER
+                  and len(_RecordingHandler.requests) == probes and len(browser_fetches) == 3)
+    finally:
+        scraper.fetch_html_selenium = fetch_html_selenium
+        server.shutdown()
+
+    requests = [r for r in _RecordingHandler.requests if r["host"] == "127.0.0.1"]
+    connections = len({r["port"] for r in requests})
+    check("connections are reused and compression is offered",
+          connections < len(requests) and all("gzip" in r["accept_encoding"] for r in requests),
+          f"{len(requests)} requests over {connections} connection(s)")
+
+    ok = all(checks)
+    print("HTTP fetch check:", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Runs the completion scheduler against the mock OpenAI endpoint answering
+429s, and checks the retry path: the retry-after and retry-after-ms hints
+are obeyed, one caller's 429 pauses every caller of that model, retries end
+in RetriesExhausted, and unused tokens are given back to the TPM bucket.
+
+    python -m benchmarks.check_rate_limiter
+
+Requests are plain HTTP posts, so the check reads status and headers the
+way the scheduler sees them on any client's errors.
+"""
+import argparse
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.mock_openai import MockOpenAIServer, record_completion
+from rate_limiter import CompletionScheduler, RetriesExhausted
+
+MODEL = "gpt-4o-mini"
+COMPLETION = record_completion('{"job_postings": []}', first_delay=0.0, delay=0.0)
+
+
+def post(mock: MockOpenAIServer) -> dict:
+    response = requests.post(mock.url + "/chat/completions", timeout=10,
+                             json={"model": MODEL, "messages": [{"role": "user", "content": "ping"}]})
+    response.raise_for_status()
+    return response.json()
+
+
+def total_tokens(response: dict) -> int:
+    return response["usage"]["total_tokens"]
+
+
+def scheduler(**kwargs) -> CompletionScheduler:
+    kwargs.setdefault("limits", {MODEL: {"rpm": 10_000, "tpm": 10_000_000}})
+    return CompletionScheduler(base_delay=0.01, **kwargs)
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.parse_args(argv)
+    checks = []
+
+    def check(name: str, passed: bool, detail: str = "") -> None:
+        checks.append(passed)
+        print(f"{'ok' if passed else 'FAILED'}: {name}{' (' + detail + ')' if detail else ''}")
+
+    # The hint is jittered by up to 25%, never shortened
+    for headers, hint in (({"retry-after-ms": "300"}, 0.3), ({"retry-after": "1"}, 1.0)):
+        with MockOpenAIServer(COMPLETION, rate_limits=[headers]) as mock:
+            limiter = scheduler()
+            limiter.call(MODEL, 100, lambda: post(mock))
+            gap = mock.log[1][0] - mock.log[0][0]
+            check(f"{next(iter(headers))} is obeyed",
+                  [status for _, status in mock.log] == [429, 200] and limiter.retries == 1
+                  and limiter.rate_limited == 1 and hint <= gap <= hint * 1.25 + 0.2,
+                  f"retried after {gap:.2f}s for a {hint}s hint")
+
+    # A second caller arriving during the first one's backoff waits for the pause too
+    with MockOpenAIServer(COMPLETION, rate_limits=[{"retry-after-ms": "500"}]) as mock:
+        limiter = scheduler()
+        first = threading.Thread(target=limiter.call, args=(MODEL, 100, lambda: post(mock)))
+        first.start()
+        while not mock.log:
+            time.sleep(0.005)
+        time.sleep(0.1)
+        limiter.call(MODEL, 100, lambda: post(mock))
+        first.join()
+        rejected_at = mock.log[0][0]
+        waits = [at - rejected_at for at, _ in mock.log[1:]]
+        check("a 429 pauses every caller of the model",
+              len(waits) == 2 and min(waits) >= 0.5 and limiter.retries == 1 and limiter.throttle_seconds >= 0.35,
+              f"next requests {', '.join(f'{wait:.2f}s' for wait in waits)} after the 429")
+
+    with MockOpenAIServer(COMPLETION, rate_limits=[{"retry-after-ms": "20"}] * 3) as mock:
+        limiter = scheduler(max_retries=2)
+        try:
+            limiter.call(MODEL, 100, lambda: post(mock))
+            exhausted = False
+        except RetriesExhausted:
+            exhausted = True
+        check("retries end in RetriesExhausted", exhausted and len(mock.log) == 3 and limiter.retries == 2,
+              f"{len(mock.log)} attempts")
+
+    # 8,000 of a 10,000 TPM budget are reserved per call; without give-back the second waits ~36s
+    with MockOpenAIServer(COMPLETION, rate_limits=[{"retry-after-ms": "20"}]) as mock:
+        limiter = scheduler(limits={MODEL: {"rpm": 10_000, "tpm": 10_000}})
+        tokens_bucket = limiter._buckets_for(MODEL)[1]
+        response = limiter.call(MODEL, 8_000, lambda: post(mock), usage_tokens=total_tokens)
+        used = total_tokens(response)
+        available = tokens_bucket.available
+        start = time.monotonic()
+        limiter.call(MODEL, 8_000, lambda: post(mock), usage_tokens=total_tokens)
+        waited = time.monotonic() - start
+        check("unused and rejected tokens are given back",
+              available >= 10_000 - used - 50 and waited < 1.0,
+              f"{available:,.0f} tokens available after using {used}, next call waited {waited:.2f}s")
+
+    ok = all(checks)
+    print("Rate limiter check:", "ok" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint that replays a
+recorded completion, streamed or in one piece, with the recorded timing.
+
+    python -m benchmarks.mock_openai benchmarks/fixtures/streams/board_page.jsonl [--port 8765]
+
+A recording is a JSON-lines file of {"delay": seconds, "content": text}
+chunks, one per streamed delta, where `delay` is the time since the previous
+chunk (for the first chunk, since the request was received). Non-streaming
+requests get the concatenated content after the total recorded time. A
+`responder` can build the recording from each request instead.
+
+    python -m benchmarks.mock_openai RECORDING --rate-limited 3 --retry-after-ms 500
+
+answers the first three requests with 429 and a retry hint, as the API does
+when a rate limit is hit.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def load_recording(path: str) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Split a completion into token-sized chunks, `delay` seconds apart after `first_delay`
+def record_completion(content: str, chunk_chars: int = 4, first_delay: float = 0.5,
+                      delay: float = 0.005) -> List[Dict]:
+    return [
+        {"delay": first_delay if i == 0 else delay, "content": content[i:i + chunk_chars]}
+        for i in range(0, len(content), chunk_chars)
+    ]
+
+
+class MockOpenAIServer:
+    """
+    Serves POST /v1/chat/completions from a recording, or from whatever
+    `responder(request)` returns for each request. `speed` divides every
+    recorded delay. Requests are counted per mode in `requests`.
+
+    Each entry of `rate_limits` answers one request, in arrival order, with a
+    429 carrying that entry as headers (e.g. {"retry-after-ms": "500"}), before
+    any request gets a completion; add more with `rate_limit`. Every request's
+    arrival time and status are kept in `log`.
+    """
+
+    def __init__(self, recording: Optional[List[Dict]] = None, port: int = 0, speed: float = 1.0,
+                 responder: Optional[Callable[[Dict], List[Dict]]] = None,
+                 rate_limits: Optional[List[Dict[str, str]]] = None):
+        if recording is None and responder is None:
+            raise ValueError("Give a recording or a responder")
+        self.recording = recording
+        self.responder = responder
+        self.speed = speed
+        self.requests = {"stream": 0, "blocking": 0, "rate_limited": 0}
+        self.log: List[Tuple[float, int]] = []
+        self._rate_limits = list(rate_limits or [])
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    # Answer the next `count` requests with 429 and these retry headers
+    def rate_limit(self, headers: Dict[str, str], count: int = 1) -> None:
+        with self._lock:
+            self._rate_limits.extend(dict(headers) for _ in range(count))
+
+    def _next_rate_limit(self) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return self._rate_limits.pop(0) if self._rate_limits else None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def _recording_for(self, request: Dict) -> List[Dict]:
+        return self.responder(request) if self.responder is not None else self.recording
+
+    @staticmethod
+    def _usage(request: Dict, recording: List[Dict]) -> Dict[str, int]:
+        prompt = sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4
+        completion = sum(len(chunk["content"]) for chunk in recording) // 4
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                model = request.get("model", "gpt-4o-mini")
+                retry_headers = mock._next_rate_limit()
+                with mock._lock:
+                    mock.log.append((time.monotonic(), 429 if retry_headers is not None else 200))
+                if retry_headers is not None:
+                    mock.requests["rate_limited"] += 1
+                    self._rate_limited(model, retry_headers)
+                    return
+                recording = mock._recording_for(request)
+                if request.get("stream"):
+                    mock.requests["stream"] += 1
+                    self._stream(request, model, recording)
+                else:
+                    mock.requests["blocking"] += 1
+                    self._blocking(request, model, recording)
+
+            def _rate_limited(self, model: str, headers: Dict[str, str]) -> None:
+                body = json.dumps({"error": {
+                    "message": f"Rate limit reached for {model}. Please try again later.",
+                    "type": "requests", "param": None, "code": "rate_limit_exceeded",
+                }}).encode('utf-8')
+                self.send_response(429)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _blocking(self, request: Dict, model: str, recording: List[Dict]) -> None:
+                time.sleep(sum(chunk["delay"] for chunk in recording) / mock.speed)
+                body = json.dumps({
+                    "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                        "role": "assistant", "content": "".join(chunk["content"] for chunk in recording)}}],
+                    "usage": mock._usage(request, recording),
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request: Dict, model: str, recording: List[Dict]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def event(delta: Dict, finish_reason: Optional[str] = None, usage: Optional[Dict] = None) -> None:
+                    chunk = {
+                        "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    if usage is not None:
+                        chunk["choices"] = []
+                        chunk["usage"] = usage
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+
+                event({"role": "assistant", "content": ""})
+                # Sleep to absolute deadlines so per-chunk sleep overshoot does not add up
+                due = time.monotonic()
+                for recorded in recording:
+                    due += recorded["delay"] / mock.speed
+                    remaining = due - time.monotonic()
+                    if remaining > 0:
+                        time.sleep(remaining)
+                    event({"content": recorded["content"]})
+                event({}, finish_reason="stop")
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    event({}, usage=mock._usage(request, recording))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("recording")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--speed", type=float, default=1.0)
+    arg_parser.add_argument("--rate-limited", type=int, default=0, help="answer this many requests with 429 first")
+    arg_parser.add_argument("--retry-after-ms", type=int, default=1000, help="retry hint sent with each 429")
+    args = arg_parser.parse_args(argv)
+
+    server = MockOpenAIServer(load_recording(args.recording), port=args.port, speed=args.speed)
+    server.rate_limit({"retry-after-ms": str(args.retry_after_ms)}, args.rate_limited)
+    print(f"Serving {args.recording} at {server.url}; set openai.api_base to this URL")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import random
+
+_WORDS = (
+    "data platform model pipeline python sql spark kubernetes latency feature store team "
+    "mentor design build ship customers reliability scale cloud analytics research product"
+).split()
+
+_TITLES = [
+    "Senior Software Engineer", "Machine Learning Engineer", "Data Scientist",
+    "Staff Backend Engineer", "AI Platform Engineer", "Applied Scientist",
+]
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _posting_card(rng: random.Random, i: int) -> str:
+    title = rng.choice(_TITLES)
+    tags = "".join(f'<a class="tag chip-{j}" href="/tags/{w}">{w}</a>' for j, w in enumerate(rng.sample(_WORDS, 4)))
+    return (
+        f'<section class="card job-card card-{i} shadow rounded">'
+        f'<section class="card-header flex"><h2 class="title">{title}</h2>'
+        f'<span class="company">Company {i}</span><span class="location">Remote</span></section>'
+        f'<div class="job-description text-sm">'
+        + "".join(f"<p>{_sentence(rng)}</p>" for _ in range(3))
+        + "<ul>" + "".join(f"<li>{_sentence(rng, 8)}</li>" for _ in range(4)) + "</ul>"
+        + f'</div><div class="tags">{tags}</div>'
+        f'<a class="apply btn" href="https://example.com/apply/{i}">Apply</a>'
+        f'<script>track({i});</script></section>'
+    )
+
+
+# Build a job-board style page of roughly `target_bytes` with nested sections
+def job_board_page(target_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    head = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Jobs</title>"
+        "<style>" + ".x{color:red}" * 200 + "</style><script>var config = {};</script></head>"
+        "<body class='board'><header class='top'><nav><a href='/'>Home</a></nav></header><main class='main'>"
+    )
+    tail = (
+        "<section class='related'><h2>Related Jobs</h2>"
+        + "".join(f"<section class='mini'><a href='/job/{i}'>Job {i}</a></section>" for i in range(20))
+        + "</section></main><footer class='bottom'><p>Footer</p></footer></body></html>"
+    )
+    cards = []
+    size = len(head) + len(tail)
+    i = 0
+    while size < target_bytes:
+        card = _posting_card(rng, i)
+        cards.append(card)
+        size += len(card)
+        i += 1
+    return head + "".join(cards) + tail
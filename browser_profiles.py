@@ -0,0 +1,145 @@
+import os
+import shutil
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from selenium.webdriver.chrome.options import Options
+
+from page_wait import domain_of, site_config_for
+
+# URL patterns for each blockable request type, in Chrome DevTools wildcard syntax
+RESOURCE_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "ogg", "mp3", "m4a", "wav", "mov", "m3u8"),
+    "stylesheet": ("css",),
+}
+
+# Analytics, ads, tag managers, chat widgets and font CDNs that never carry posting content
+THIRD_PARTY_DOMAINS: List[str] = [
+    "googletagmanager.com", "google-analytics.com", "analytics.google.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+    "fonts.googleapis.com", "fonts.gstatic.com", "use.typekit.net",
+    "connect.facebook.net", "facebook.com/tr", "snap.licdn.com", "px.ads.linkedin.com",
+    "static.ads-twitter.com", "analytics.tiktok.com", "bat.bing.com", "clarity.ms",
+    "hotjar.com", "segment.com", "segment.io", "mixpanel.com", "amplitude.com", "heap.io",
+    "fullstory.com", "intercom.io", "intercomcdn.com", "js.driftt.com", "widget.intercom.io",
+    "hs-scripts.com", "hs-analytics.net", "js-agent.newrelic.com", "nr-data.net",
+    "cdn.optimizely.com", "cookielaw.org", "onetrust.com", "youtube.com/embed", "player.vimeo.com",
+]
+
+DESKTOP_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                      "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+
+
+# How a browser loads pages: launch settings plus what to block on each navigation
+class FetchProfile(NamedTuple):
+    name: str
+    headless: bool = True
+    page_load_strategy: str = "eager"
+    window_size: Tuple[int, int] = (1366, 768)
+    disable_images: bool = True
+    blocked_types: Tuple[str, ...] = ("image", "font", "media")
+    block_third_party: bool = True
+    blocked_domains: Tuple[str, ...] = ()
+    user_agent: str = DESKTOP_USER_AGENT
+    extra_arguments: Tuple[str, ...] = ()
+
+
+PROFILES: Dict[str, FetchProfile] = {
+    # What setup_selenium used to do: a visible browser that loads everything
+    "full": FetchProfile("full", headless=False, page_load_strategy="normal", window_size=(1920, 1080),
+                         disable_images=False, blocked_types=(), block_third_party=False),
+    # Headless, no images, fonts, media or trackers; stylesheets still load
+    "lean": FetchProfile("lean"),
+    # Markup and scripts only
+    "minimal": FetchProfile("minimal", window_size=(1024, 768),
+                            blocked_types=("image", "font", "media", "stylesheet"),
+                            extra_arguments=("--disable-extensions", "--mute-audio",
+                                             "--disable-background-networking")),
+}
+
+DEFAULT_PROFILE = os.getenv("SCRAPER_BROWSER_PROFILE", "lean")
+
+# Per-site profiles, matched on the domain suffix. Launch settings (headless,
+# page-load strategy, image setting) belong to the browser, so a site's
+# profile only changes what is blocked while its pages load.
+DOMAIN_PROFILES: Dict[str, str] = {}
+
+
+def get_profile(profile: Union[str, FetchProfile, None] = None) -> FetchProfile:
+    if isinstance(profile, FetchProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown browser profile {name!r}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+# chromedriver from CHROMEDRIVER_PATH or PATH; None lets Selenium Manager find or download one
+def driver_path() -> Optional[str]:
+    path = os.getenv("CHROMEDRIVER_PATH")
+    if path:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"CHROMEDRIVER_PATH points to {path}, which does not exist")
+        return path
+    return shutil.which("chromedriver")
+
+
+def chrome_options(profile: FetchProfile) -> Options:
+    options = Options()
+    if profile.headless:
+        options.add_argument("--headless=new")
+    options.page_load_strategy = profile.page_load_strategy
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size={},{}".format(*profile.window_size))
+    options.add_argument(f"user-agent={profile.user_agent}")
+    for argument in profile.extra_arguments:
+        options.add_argument(argument)
+    if profile.disable_images:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+# DevTools URL patterns that block the profile's request types and third-party hosts for a page
+def blocked_url_patterns(profile: FetchProfile, url: str) -> List[str]:
+    patterns = []
+    for resource_type in profile.blocked_types:
+        for extension in RESOURCE_PATTERNS[resource_type]:
+            patterns += [f"*.{extension}", f"*.{extension}?*"]
+
+    domains = list(profile.blocked_domains)
+    if profile.block_third_party:
+        domains += THIRD_PARTY_DOMAINS
+    page_domain = domain_of(url)
+    for domain in domains:
+        host = domain.split("/", 1)[0]
+        # Never block the site being scraped, even when it is on the list
+        if page_domain == host or page_domain.endswith("." + host):
+            continue
+        patterns += [f"*://{domain}*", f"*.{domain}*"]
+    return patterns
+
+
+# Profile in effect while loading `url` in a browser launched with `base`
+def profile_for(url: str, base: Optional[FetchProfile] = None) -> FetchProfile:
+    base = base or get_profile()
+    name = site_config_for(DOMAIN_PROFILES, url)
+    if not name:
+        return base
+    site = get_profile(name)
+    return base._replace(name=site.name, blocked_types=site.blocked_types,
+                         block_third_party=site.block_third_party, blocked_domains=site.blocked_domains)
+
+
+# Apply the page's request blocking, then navigate; returns the profile in effect
+def navigate(driver, url: str) -> FetchProfile:
+    profile = profile_for(url, getattr(driver, "fetch_profile", None))
+    patterns = blocked_url_patterns(profile, url)
+    # Only Chromium drivers speak DevTools; skip the round trip when nothing changed
+    if hasattr(driver, "execute_cdp_cmd") and patterns != getattr(driver, "blocked_patterns", []):
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        driver.blocked_patterns = patterns
+    driver.get(url)
+    return profile
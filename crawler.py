@@ -0,0 +1,373 @@
+import functools
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import lxml.html
+from selenium.webdriver.common.by import By
+
+from driver_pool import DriverPool
+from browser_profiles import navigate
+from http_fetch import HostLimiter, HttpFetcher, http_fetcher
+from page_wait import domain_of, site_config_for, wait_for_page
+from pipeline import BUDGET_EXCEEDED, ScrapeResult, scrape_many
+from scraper import setup_selenium
+
+# Frontier entry kinds and states
+LISTING = "listing"
+POSTING = "posting"
+PENDING = "pending"
+QUEUED = "queued"
+DONE = "done"
+FAILED = "failed"
+
+# Per-site crawl rules, matched on the domain suffix:
+#   posting    regex on the URL path of a job posting
+#   load_more  XPath of the control that appends more results
+CRAWL_RULES: Dict[str, Dict[str, str]] = {
+    "aijobs.ai": {"posting": r"^/job/[^/]+/?$"},
+}
+DEFAULT_POSTING_PATTERN = r"/(?:jobs?|careers?|positions?|vacanc(?:y|ies)|openings?)/[^/]+/?$"
+DEFAULT_LOAD_MORE = (
+    "//*[self::button or self::a][contains(translate(normalize-space(.), 'LOADMRESHOW', 'loadmreshow'), 'load more')"
+    " or contains(translate(normalize-space(.), 'LOADMRESHOW', 'loadmreshow'), 'show more')]"
+)
+
+_NEXT_TEXTS = {"next", "next page", "next ›", "next »", "›", "»", ">", "older"}
+_PAGINATION = re.compile(r"paginat|pager|paging|page-numbers", re.IGNORECASE)
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_[ce]id|ref|referrer|source|_ga)$", re.IGNORECASE)
+_SKIPPED_SCHEMES = ("#", "javascript:", "mailto:", "tel:")
+
+
+# Canonical form used for dedup: lowercase host, no default port, fragment or tracking parameters
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    url = url.strip()
+    if not url or url.startswith(_SKIPPED_SCHEMES):
+        return None
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != {"http": 80, "https": 443}[parts.scheme]:
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit((parts.scheme, host, path, query, ""))
+
+
+# Fixed-size set membership with no false negatives and `error_rate` false positives
+class BloomFilter:
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# Persistent queue of listing and posting URLs, deduplicated on the normalised URL
+class Frontier:
+    """
+    Every URL ever added is kept in SQLite with its kind, depth and state, so
+    a crawl can stop and resume. An in-memory Bloom filter in front of the
+    table lets brand-new URLs skip the existence lookup; URLs the filter may
+    have seen are checked against the table, so dedup stays exact. URLs that
+    were handed out but never finished are handed out again on restart, and
+    so are failed ones until they have failed `max_attempts` times;
+    `retry_failed` queues those again as well.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'frontier.sqlite3'),
+                 capacity: int = 1_000_000, error_rate: float = 0.001, max_attempts: int = 3):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_attempts = max_attempts
+        self._conn: Optional[sqlite3.Connection] = None
+        self._seen: Optional[BloomFilter] = None
+        self._lock = threading.RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                "url TEXT PRIMARY KEY, kind TEXT NOT NULL, depth INTEGER NOT NULL, status TEXT NOT NULL, "
+                "host TEXT NOT NULL, added_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            if "attempts" not in [row[1] for row in self._conn.execute("PRAGMA table_info(urls)")]:
+                self._conn.execute("ALTER TABLE urls ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS urls_next ON urls (status, kind, depth)")
+            self._conn.execute("UPDATE urls SET status = ? WHERE status = ?", (PENDING, QUEUED))
+            self._conn.execute("UPDATE urls SET status = ? WHERE status = ? AND attempts < ?",
+                               (PENDING, FAILED, self.max_attempts))
+            self._conn.commit()
+            self._seen = BloomFilter(self.capacity, self.error_rate)
+            for (url,) in self._conn.execute("SELECT url FROM urls"):
+                self._seen.add(url)
+        return self._conn
+
+    # Add URLs not seen before; returns the normalised URLs that were new
+    def add_many(self, urls: Iterable[str], kind: str, depth: int = 0) -> List[str]:
+        normalized = list(dict.fromkeys(u for u in (normalize_url(url) for url in urls) if u))
+        with self._lock:
+            db = self._db()
+            maybe_seen = [url for url in normalized if url in self._seen]
+            known = set()
+            for i in range(0, len(maybe_seen), 500):
+                chunk = maybe_seen[i:i + 500]
+                rows = db.execute(f"SELECT url FROM urls WHERE url IN ({','.join('?' * len(chunk))})", chunk)
+                known.update(url for (url,) in rows)
+            new = [url for url in normalized if url not in known]
+            now = time.time()
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO urls (url, kind, depth, status, host, added_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(url, kind, depth, PENDING, domain_of(url), now, now) for url in new],
+                )
+            for url in new:
+                self._seen.add(url)
+        return new
+
+    def add(self, url: str, kind: str, depth: int = 0) -> bool:
+        return bool(self.add_many([url], kind, depth))
+
+    # Queue known URLs again, e.g. seed pages on a new crawl
+    def requeue(self, urls: Iterable[str]) -> None:
+        normalized = [u for u in (normalize_url(url) for url in urls) if u]
+        with self._lock:
+            with self._db() as db:
+                db.executemany("UPDATE urls SET status = ?, updated_at = ? WHERE url = ?",
+                               [(PENDING, time.time(), url) for url in normalized])
+
+    # Hand out up to `limit` pending URLs of one kind, shallowest first
+    def take(self, kind: str, limit: int = 1) -> List[Tuple[str, int]]:
+        with self._lock:
+            db = self._db()
+            rows = db.execute(
+                "SELECT url, depth FROM urls WHERE status = ? AND kind = ? ORDER BY depth, added_at LIMIT ?",
+                (PENDING, kind, limit),
+            ).fetchall()
+            with db:
+                db.executemany("UPDATE urls SET status = ?, updated_at = ? WHERE url = ?",
+                               [(QUEUED, time.time(), url) for url, _ in rows])
+        return rows
+
+    def mark(self, url: str, status: str) -> None:
+        url = normalize_url(url) or url
+        with self._lock:
+            with self._db() as db:
+                db.execute("UPDATE urls SET status = ?, updated_at = ? WHERE url = ?", (status, time.time(), url))
+
+    # Record a failed attempt; the URL is tried again on the next crawl until max_attempts is reached
+    def fail(self, url: str) -> None:
+        url = normalize_url(url) or url
+        with self._lock:
+            with self._db() as db:
+                db.execute("UPDATE urls SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                           (FAILED, time.time(), url))
+
+    # Queue every failed URL again with its attempts reset; returns how many were queued
+    def retry_failed(self, kind: Optional[str] = None) -> int:
+        query = "UPDATE urls SET status = ?, attempts = 0, updated_at = ? WHERE status = ?"
+        params = [PENDING, time.time(), FAILED]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            with self._db() as db:
+                return db.execute(query, params).rowcount
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._db().execute("SELECT kind, status, COUNT(*) FROM urls GROUP BY kind, status").fetchall()
+        stats: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._seen = None
+
+
+def _rules_for(url: str) -> Dict[str, str]:
+    return site_config_for(CRAWL_RULES, url) or {}
+
+
+# Inside a pagination block, going by its class, id, role or label
+def _in_pagination(link) -> bool:
+    for element in link.iterancestors():
+        names = " ".join(element.get(attr) or "" for attr in ("class", "id", "role", "aria-label"))
+        if _PAGINATION.search(names):
+            return True
+    return False
+
+
+def _is_next_link(link, text: str) -> bool:
+    if "next" in (link.get("rel") or "").lower().split():
+        return True
+    if text.lower() in _NEXT_TEXTS or "next" in (link.get("aria-label") or "").lower():
+        return True
+    # Numbered pagination; a bare number elsewhere is as likely a salary, count or article link
+    return text.isdigit() and _in_pagination(link)
+
+
+# Posting links and further listing pages (pagination) on one listing page
+def parse_listing(html: str, page_url: str) -> Tuple[List[str], List[str]]:
+    rules = _rules_for(page_url)
+    posting_re = re.compile(rules.get("posting", DEFAULT_POSTING_PATTERN), re.IGNORECASE)
+    host = domain_of(page_url)
+    postings, pages = [], []
+    for link in lxml.html.fromstring(html).iter("a"):
+        url = normalize_url(link.get("href") or "", page_url)
+        if url is None or domain_of(url) != host:
+            continue
+        if posting_re.search(urlsplit(url).path):
+            postings.append(url)
+        elif _is_next_link(link, " ".join(link.text_content().split())):
+            pages.append(url)
+    return list(dict.fromkeys(postings)), list(dict.fromkeys(pages))
+
+
+def has_load_more(html: str, page_url: str) -> bool:
+    xpath = _rules_for(page_url).get("load_more", DEFAULT_LOAD_MORE)
+    return bool(lxml.html.fromstring(html).xpath(xpath))
+
+
+# Load a listing in the browser and click "load more" until no new links appear
+def fetch_listing_with_browser(url: str, pool: DriverPool, max_clicks: int = 20, timeout: float = 10.0) -> str:
+    xpath = _rules_for(url).get("load_more", DEFAULT_LOAD_MORE)
+    with pool.driver() as driver:
+        eager = navigate(driver, url).page_load_strategy == "eager"
+        wait_for_page(driver, url, selector="a[href]", stats=None, eager=eager)
+        for _ in range(max_clicks):
+            buttons = [b for b in driver.find_elements(By.XPATH, xpath) if b.is_displayed()]
+            if not buttons:
+                break
+            links = len(driver.find_elements(By.TAG_NAME, "a"))
+            driver.execute_script("arguments[0].scrollIntoView(); arguments[0].click();", buttons[0])
+            deadline = time.monotonic() + timeout
+            while len(driver.find_elements(By.TAG_NAME, "a")) <= links and time.monotonic() < deadline:
+                time.sleep(0.2)
+            if len(driver.find_elements(By.TAG_NAME, "a")) <= links:
+                break
+            wait_for_page(driver, url, selector=None, stats=None, eager=eager)
+        return driver.page_source
+
+
+# Posting and pagination links on a listing page, using the browser only when plain HTTP finds none
+def fetch_listing(url: str, limiter: HostLimiter, pool: Optional[DriverPool] = None,
+                  http: Optional[HttpFetcher] = None) -> Tuple[List[str], List[str]]:
+    http = http if http is not None else http_fetcher
+    with limiter.slot(url):
+        html = http.fetch(url)
+    postings, pages = parse_listing(html, url) if html else ([], [])
+    if pool is not None and (not postings or has_load_more(html, url)):
+        with limiter.slot(url):
+            html = fetch_listing_with_browser(url, pool)
+        postings, pages = parse_listing(html, url)
+    if html is None:
+        raise ValueError("no HTML over plain HTTP and no browser pool to fall back to")
+    return postings, pages
+
+
+# Walk listing pages from `seeds`, yielding each newly discovered posting URL
+def crawl(seeds: Iterable[str], frontier: Optional[Frontier] = None, limiter: Optional[HostLimiter] = None,
+          pool: Optional[DriverPool] = None, http: Optional[HttpFetcher] = None,
+          max_listing_pages: int = 50, max_depth: int = 20) -> Iterator[str]:
+    """
+    Listing pages are fetched over plain HTTP and, when that finds no posting
+    links or the page has a "load more" control, reloaded in the browser
+    with the control clicked until the list stops growing. Seeds are always
+    crawled again; other pages and postings are visited once per frontier.
+    Pending postings, including ones left over from an interrupted crawl,
+    are yielded before the next listing page is fetched.
+    """
+    frontier = frontier if frontier is not None else Frontier()
+    limiter = limiter if limiter is not None else HostLimiter()
+    seeds = list(seeds)
+    frontier.add_many(seeds, LISTING, depth=0)
+    frontier.requeue(seeds)
+
+    listing_pages = 0
+    while True:
+        postings = frontier.take(POSTING, limit=100)
+        for url, _ in postings:
+            yield url
+        if postings:
+            continue
+        listing = frontier.take(LISTING, limit=1) if listing_pages < max_listing_pages else []
+        if not listing:
+            return
+        url, depth = listing[0]
+        listing_pages += 1
+        try:
+            postings, pages = fetch_listing(url, limiter, pool, http)
+        except Exception as e:
+            print(f"Failed to crawl listing page {url}: {e}")
+            frontier.fail(url)
+            continue
+        new_postings = frontier.add_many(postings, POSTING, depth + 1)
+        if depth < max_depth:
+            frontier.add_many(pages, LISTING, depth + 1)
+        frontier.mark(url, DONE)
+        print(f"Crawled {url}: {len(postings)} posting links ({len(new_postings)} new), {len(pages)} listing links")
+
+
+# Crawl listing pages and scrape every discovered posting through the staged pipeline
+def crawl_and_scrape(seeds: Iterable[str], model: str = "gpt-4o-mini", frontier: Optional[Frontier] = None,
+                     limiter: Optional[HostLimiter] = None, pool: Optional[DriverPool] = None,
+                     max_listing_pages: int = 50, profile: Optional[str] = None,
+                     **scrape_options) -> Iterator[ScrapeResult]:
+    frontier = frontier if frontier is not None else Frontier()
+    limiter = limiter if limiter is not None else HostLimiter()
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(functools.partial(setup_selenium, profile), size=scrape_options.get("fetch_workers", 2))
+    try:
+        urls = crawl(seeds, frontier, limiter, pool, max_listing_pages=max_listing_pages)
+        for result in scrape_many(urls, model=model, pool=pool, limiter=limiter, **scrape_options):
+            if result.error and result.error.startswith(BUDGET_EXCEEDED):
+                # Never scraped; scrape_many reads no more URLs, and the next crawl picks this one up
+                frontier.mark(result.url, PENDING)
+            elif result.error:
+                frontier.fail(result.url)
+            else:
+                frontier.mark(result.url, DONE)
+            yield result
+    finally:
+        if own_pool:
+            pool.close()
@@ -0,0 +1,73 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from dateutil import parser
+
+_ISO_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})(?:$|[T ])")
+_RELATIVE_RE = re.compile(
+    r"^(?:posted|updated|active)?\s*(?:about|over|more than)?\s*(\d+|an?|one)\+?\s*"
+    r"(minute|min|hour|hr|day|week|wk|month|mo|year|yr)s?\.?(?:\s+ago)?$",
+    re.IGNORECASE,
+)
+_TODAY = {"today", "just now", "just posted", "posted today", "new", "now"}
+_YESTERDAY = {"yesterday", "posted yesterday"}
+_NO_DATE = ("ongoing", "asap", "immediately", "rolling", "open until filled")
+_UNIT_DAYS = {
+    "minute": 0, "min": 0, "hour": 0, "hr": 0, "day": 1, "week": 7, "wk": 7,
+    "month": 30, "mo": 30, "year": 365, "yr": 365,
+}
+
+# Distinct (date string, anchor) pairs remembered; boards repeat the same few strings
+CACHE_SIZE = 4096
+
+
+def relative_to_absolute(value: str, anchor: date) -> Optional[str]:
+    text = " ".join(value.lower().split())
+    if text in _TODAY:
+        return anchor.isoformat()
+    if text in _YESTERDAY:
+        return (anchor - timedelta(days=1)).isoformat()
+    match = _RELATIVE_RE.match(text)
+    if not match:
+        return None
+    amount = 1 if match.group(1) in ("a", "an", "one") else int(match.group(1))
+    try:
+        return (anchor - timedelta(days=amount * _UNIT_DAYS[match.group(2).lower()])).isoformat()
+    except (OverflowError, ValueError):
+        return None  # e.g. "3000 years ago", before date.min
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize(value: str, anchor: date) -> Optional[str]:
+    iso = _ISO_RE.match(value)
+    if iso:
+        try:
+            return date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3))).isoformat()
+        except ValueError:
+            return None
+
+    relative = relative_to_absolute(value, anchor)
+    if relative is not None:
+        return relative
+    if any(word in value.lower() for word in _NO_DATE):
+        return None
+    try:
+        # Missing parts (e.g. the year in "May 3") come from the scrape date, not today
+        return parser.parse(value, default=datetime.combine(anchor, time())).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError):
+        return None
+
+
+# 'YYYY-MM-DD' for an absolute or relative date string, None if it is not a date
+def normalize_date(value: str, anchor: Optional[date] = None) -> Optional[str]:
+    if anchor is None:
+        anchor = date.today()
+    elif isinstance(anchor, datetime):
+        anchor = anchor.date()
+    return _normalize(value.strip(), anchor)
+
+
+def cache_info():
+    return _normalize.cache_info()
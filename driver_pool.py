@@ -0,0 +1,163 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.created_at = time.monotonic()
+
+
+# Bounded pool of Selenium WebDrivers shared across a batch of URLs
+class DriverPool:
+    """
+    Keeps up to `size` browsers alive and hands them out one at a time.
+    Drivers are created lazily with `factory`, health-checked on checkout,
+    wiped of cookies and storage on return and recycled after `max_pages`
+    pages or `max_age` seconds, or as soon as they stop responding.
+    """
+
+    def __init__(self, factory: Callable, size: int = 1, max_pages: int = 50,
+                 max_age: Optional[float] = None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self._idle: List[_PooledDriver] = []
+        self._in_use: Dict[int, _PooledDriver] = {}
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # Check out a driver, creating one if the pool is not yet full
+    def acquire(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif self._created < self.size:
+                    self._created += 1
+                    pooled = None
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a free WebDriver")
+                    self._cond.wait(remaining)
+                    continue
+
+            if pooled is None:
+                try:
+                    pooled = _PooledDriver(self.factory())
+                except Exception:
+                    self._forget()
+                    raise
+            elif not self._is_healthy(pooled):
+                self._destroy(pooled)
+                continue
+
+            with self._cond:
+                self._in_use[id(pooled.driver)] = pooled
+            return pooled.driver
+
+    # Return a driver to the pool, recycling it when it is worn out or broken
+    def release(self, driver, discard: bool = False) -> None:
+        with self._cond:
+            pooled = self._in_use.pop(id(driver), None)
+        if pooled is None:
+            return
+        pooled.pages_served += 1
+
+        if discard or self._closed or self._is_expired(pooled) or not self._reset(pooled):
+            self._destroy(pooled)
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except Exception:
+            # A failed page load is not necessarily a dead browser; only drop
+            # the driver if it no longer answers.
+            self.release(driver, discard=not self._ping(driver))
+            raise
+        else:
+            self.release(driver)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _is_expired(self, pooled: _PooledDriver) -> bool:
+        if self.max_pages and pooled.pages_served >= self.max_pages:
+            return True
+        if self.max_age is not None and time.monotonic() - pooled.created_at >= self.max_age:
+            return True
+        return False
+
+    def _is_healthy(self, pooled: _PooledDriver) -> bool:
+        return not self._is_expired(pooled) and self._ping(pooled.driver)
+
+    @staticmethod
+    def _ping(driver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    # Clear cookies and web storage so one site cannot leak into the next
+    @staticmethod
+    def _reset(pooled: _PooledDriver) -> bool:
+        driver = pooled.driver
+        try:
+            if hasattr(driver, "execute_cdp_cmd"):
+                # Chrome: every domain's cookies, not just the current document's,
+                # and all storage (local, session, IndexedDB, cache) of the page's origin
+                origin = driver.execute_script("return window.location.origin")
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                if origin and origin != "null":
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            else:
+                driver.execute_script(
+                    "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+                )
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def _destroy(self, pooled: _PooledDriver) -> None:
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self) -> None:
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
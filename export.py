@@ -0,0 +1,241 @@
+import csv
+import glob
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from job_store import JobStore, job_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV export still works
+    pa = pq = None
+
+# Postings read from the store and written per chunk (one Parquet row group each)
+CHUNK_SIZE = 5_000
+# Separator for list fields in CSV; Parquet and Arrow keep them as lists
+LIST_SEPARATOR = "; "
+EXPORT_DIR = os.path.join('output', 'exports')
+# Artifacts kept in an export directory; the least recently used beyond this are removed
+KEEP_EXPORTS = 12
+
+# Flattened posting columns, in order: (name, Arrow type name)
+EXPORT_COLUMNS = [
+    ("id", "int64"),
+    ("job_title", "string"),
+    ("company_name", "string"),
+    ("employment_type", "string"),
+    ("location_city", "string"),
+    ("location_state", "string"),
+    ("location_country", "string"),
+    ("locations", "list"),
+    ("salary_min", "int64"),
+    ("salary_max", "int64"),
+    ("salary_currency", "string"),
+    ("salary_period", "string"),
+    ("date_posted", "string"),
+    ("application_deadline", "string"),
+    ("application_link", "string"),
+    ("job_tags", "list"),
+    ("skills", "list"),
+    ("requirements", "list"),
+    ("responsibilities", "list"),
+    ("educational_qualifications", "list"),
+    ("job_description", "string"),
+    ("scraped_from", "string"),
+    ("first_seen", "timestamp"),
+    ("last_seen", "timestamp"),
+]
+_LIST_COLUMNS = [name for name, kind in EXPORT_COLUMNS if kind == "list"]
+
+
+class Artifact(NamedTuple):
+    path: str
+    file_format: str
+    rows: int
+    cached: bool  # reused from an earlier export of the same postings
+
+
+def _location_text(location: Dict[str, Any]) -> str:
+    return ", ".join(part for part in (location.get("city"), location.get("state"), location.get("country")) if part)
+
+
+def _qualification_text(qualification: Dict[str, Any]) -> str:
+    degree, field = qualification.get("degree"), qualification.get("field_of_study")
+    return f"{degree} in {field}" if degree and field else degree or field or ""
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, timezone.utc) if value else None
+
+
+# One flat row per posting: the first location and the salary get their own columns, lists stay lists
+def flatten_posting(posting: Dict[str, Any]) -> Dict[str, Any]:
+    locations = [location for location in posting.get("locations") or [] if location]
+    first = locations[0] if locations else {}
+    salary = posting.get("salary") or {}
+    return {
+        "id": posting.get("id"),
+        "job_title": posting.get("job_title"),
+        "company_name": posting.get("company_name"),
+        "employment_type": posting.get("employment_type"),
+        "location_city": first.get("city"),
+        "location_state": first.get("state"),
+        "location_country": first.get("country"),
+        "locations": [_location_text(location) for location in locations],
+        "salary_min": salary.get("min"),
+        "salary_max": salary.get("max"),
+        "salary_currency": salary.get("currency"),
+        "salary_period": salary.get("period"),
+        "date_posted": posting.get("date_posted"),
+        "application_deadline": posting.get("application_deadline"),
+        "application_link": posting.get("application_link"),
+        "job_tags": list(posting.get("job_tags") or []),
+        "skills": list(posting.get("skills") or []),
+        "requirements": list(posting.get("requirements") or []),
+        "responsibilities": list(posting.get("responsibilities") or []),
+        "educational_qualifications": [
+            _qualification_text(qualification) for qualification in posting.get("educational_qualifications") or []
+            if qualification
+        ],
+        "job_description": posting.get("job_description"),
+        "scraped_from": posting.get("scraped_from"),
+        "first_seen": _timestamp(posting.get("first_seen")),
+        "last_seen": _timestamp(posting.get("last_seen")),
+    }
+
+
+# Flattened postings from `store`, `chunk_size` at a time; only one chunk is held in memory
+def iter_chunks(store: JobStore = job_store, chunk_size: int = CHUNK_SIZE, **filters) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for posting in store.iter_postings(chunk_size=chunk_size, **filters):
+        chunk.append(flatten_posting(posting))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def arrow_schema():
+    if pa is None:
+        raise RuntimeError("Parquet and Arrow export need pyarrow (pip install pyarrow)")
+    types = {
+        "int64": pa.int64(),
+        "string": pa.string(),
+        "list": pa.list_(pa.string()),
+        "timestamp": pa.timestamp("s", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+
+
+def write_csv(path: str, chunks: Iterable[List[Dict[str, Any]]]) -> int:
+    rows = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[name for name, _ in EXPORT_COLUMNS])
+        writer.writeheader()
+        for chunk in chunks:
+            for row in chunk:
+                for name in _LIST_COLUMNS:
+                    row[name] = LIST_SEPARATOR.join(row[name])
+                for name in ("first_seen", "last_seen"):
+                    row[name] = row[name].isoformat(timespec='seconds') if row[name] else None
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def write_parquet(path: str, chunks: Iterable[List[Dict[str, Any]]]) -> int:
+    schema = arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def write_arrow(path: str, chunks: Iterable[List[Dict[str, Any]]]) -> int:
+    schema = arrow_schema()
+    rows = 0
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+# Format -> (file extension, writer)
+FORMATS: Dict[str, tuple] = {
+    "parquet": ("parquet", write_parquet),
+    "arrow": ("arrow", write_arrow),
+    "csv": ("csv", write_csv),
+}
+
+_export_lock = threading.Lock()
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+# Remove all but the `keep` most recently used artifacts; every batch export has its own name
+def prune_exports(directory: str = EXPORT_DIR, keep: int = KEEP_EXPORTS) -> int:
+    artifacts = []
+    for path in glob.glob(os.path.join(directory, "postings-*")):
+        if path.endswith(".partial"):
+            continue
+        try:
+            artifacts.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    removed = 0
+    for _, path in sorted(artifacts, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# Write the matching postings of `store` to a file, or reuse the file from an earlier identical export
+def export_postings(file_format: str = "parquet", store: JobStore = job_store, directory: str = EXPORT_DIR,
+                    chunk_size: int = CHUNK_SIZE, **filters) -> Artifact:
+    """
+    Artifacts are named after the format, store, filters and columns, plus
+    the store's version(), so an export is reused until a posting is added
+    or seen again; the stale file is then replaced. Files are written under
+    a temporary name and renamed, so an interrupted export never leaves a
+    partial artifact behind to be reused. Only the KEEP_EXPORTS most
+    recently used artifacts are kept in `directory`.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}; use one of {', '.join(FORMATS)}")
+    if filters.get("scraped_from") is not None:
+        # The same pages in any order are the same export
+        filters["scraped_from"] = sorted(set(filters["scraped_from"]))
+    extension, writer = FORMATS[file_format]
+    query = _digest([os.path.abspath(store.path), filters, EXPORT_COLUMNS])
+    path = os.path.join(directory, f"postings-{query}-{_digest(store.version())}.{extension}")
+    with _export_lock:
+        if os.path.exists(path):
+            os.utime(path)  # recently used, so pruning keeps it
+            return Artifact(path, file_format, store.count(**filters), cached=True)
+        os.makedirs(directory, exist_ok=True)
+        partial = path + ".partial"
+        try:
+            rows = writer(partial, iter_chunks(store, chunk_size, **filters))
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        for stale in glob.glob(os.path.join(directory, f"postings-{query}-*.{extension}")):
+            if stale != path:
+                os.remove(stale)
+        prune_exports(directory)
+    return Artifact(path, file_format, rows, cached=False)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+# Build a content address from the cleaned HTML, the model and the prompt fingerprint
+def cache_key(cleaned_html: str, model: str, prompt_fingerprint: str) -> str:
+    digest = hashlib.sha256()
+    for part in (prompt_fingerprint, model, cleaned_html):
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def fingerprint(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        text = part if isinstance(part, str) else json.dumps(part, sort_keys=True)
+        digest.update(text.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+# Two-tier cache of LLM extraction results: in-memory LRU over a SQLite file
+class ExtractionCache:
+    """
+    Each entry holds the validated JobPostingsContainer JSON and the token
+    usage of the call that produced it. Entries older than `max_age`
+    seconds are dropped from both tiers, and the least recently used ones are evicted once
+    the store grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'extraction_cache.sqlite3'),
+                 memory_entries: int = 256, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: Optional[float] = 30 * 24 * 3600):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()  # key -> (created_at, entry)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    # Returns {"data": <container JSON>, "usage": {...}} or None on a miss
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            now = time.time()
+            remembered = self._memory.get(key)
+            if remembered is not None:
+                created_at, entry = remembered
+                if self.max_age is None or now - created_at <= self.max_age:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self._count_saved(entry)
+                    return entry
+                del self._memory[key]
+
+            row = self._db().execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age is not None and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+
+            self._db().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db().commit()
+            entry = json.loads(row[0])
+            self._remember(key, entry, row[1])
+            self.disk_hits += 1
+            self._count_saved(entry)
+            return entry
+
+    def put(self, key: str, data: str, usage: Optional[Dict[str, int]] = None) -> None:
+        entry = {"data": data, "usage": usage or {}}
+        value = json.dumps(entry)
+        now = time.time()
+        with self._lock:
+            self._remember(key, entry, now)
+            self._db().execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(now)
+            self._db().commit()
+
+    def _remember(self, key: str, entry: Dict, created_at: float) -> None:
+        self._memory[key] = (created_at, entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _count_saved(self, entry: Dict) -> None:
+        usage = entry.get("usage") or {}
+        self.tokens_saved += usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+    def _evict(self, now: float) -> None:
+        db = self._db()
+        if self.max_age is not None:
+            db.execute("DELETE FROM entries WHERE created_at < ?", (now - self.max_age,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "tokens_saved": self.tokens_saved,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+extraction_cache = ExtractionCache()
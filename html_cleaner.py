@@ -0,0 +1,115 @@
+from bisect import bisect_left
+from typing import List, Optional
+
+import lxml.html
+from lxml import etree
+
+# Same rules as scraper.clean_html_reference
+REMOVED_TAGS = frozenset(['style', 'footer', 'header', 'script', 'meta'])
+RELATED_JOBS_KEYWORDS = ["Related Jobs", "Recommended Jobs", "Similar Jobs"]
+
+# BeautifulSoup stores text under these tags as special string types that
+# get_text() skips, so they never count towards a section's text either
+_HIDDEN_TEXT_TAGS = frozenset(['template', 'rt', 'rp'])
+
+
+# Clean a parsed lxml document in place with a single walk over the tree
+def clean_tree(root: etree._Element) -> etree._Element:
+    """
+    Drops the removed tags, filters class attributes and records each
+    <section>'s span in the lower-cased document text, all in one pass. The
+    "Related Jobs" section is then located by searching that text once per
+    keyword instead of calling get_text() on every section.
+    """
+    removed: List[etree._Element] = []
+    sections: List[list] = []  # [text start, text end, element] in document order
+    parts: List[str] = []
+    offset = 0
+    hidden = 0
+
+    # Entries are (element, None) on the way down and (element, record) on the way up
+    stack = [(root, None)]
+    while stack:
+        el, record = stack.pop()
+        tag = el.tag
+        if record is not None:
+            if tag in _HIDDEN_TEXT_TAGS:
+                hidden -= 1
+            if record is not True:
+                record[1] = offset
+        elif not isinstance(tag, str):
+            pass  # comments and processing instructions: only their tail is text
+        elif tag in REMOVED_TAGS:
+            removed.append(el)
+        else:
+            classes = el.get('class')
+            if classes is not None:
+                kept = [cls for cls in classes.split() if 'description' in cls]
+                if kept:
+                    el.set('class', ' '.join(kept))
+                else:
+                    del el.attrib['class']
+
+            if tag == 'section':
+                record = [offset, None, el]
+                sections.append(record)
+            else:
+                record = True
+            if tag in _HIDDEN_TEXT_TAGS:
+                hidden += 1
+            stack.append((el, record))
+
+            if el.text and not hidden:
+                text = el.text.lower()
+                parts.append(text)
+                offset += len(text)
+            for child in reversed(el):
+                stack.append((child, None))
+            continue
+
+        # Closing an element (or skipping one): its tail belongs to the parent
+        if el.tail and not hidden and el is not root:
+            text = el.tail.lower()
+            parts.append(text)
+            offset += len(text)
+
+    for el in removed:
+        el.drop_tree()
+
+    related = _find_related_section(''.join(parts), sections)
+    if related is not None:
+        related.drop_tree()
+    return root
+
+
+def _find_related_section(text: str, sections: List[list]) -> Optional[etree._Element]:
+    if not sections:
+        return None
+    for keyword in RELATED_JOBS_KEYWORDS:
+        needle = keyword.lower()
+        positions = []
+        position = text.find(needle)
+        while position != -1:
+            positions.append(position)
+            position = text.find(needle, position + 1)
+        if not positions:
+            continue
+        for start, end, el in sections:
+            i = bisect_left(positions, start)
+            if i < len(positions) and positions[i] + len(needle) <= end:
+                return el
+    return None
+
+
+def parse_html(html_content: str) -> etree._Element:
+    return lxml.html.document_fromstring(html_content)
+
+
+# Single-pass, lxml-backed replacement for scraper.clean_html_reference
+def clean_html_fast(html_content: str) -> str:
+    if not html_content or not html_content.strip():
+        return ""
+    root = clean_tree(parse_html(html_content))
+    # libxml2 invents a DOCTYPE for documents without one; only keep a real one
+    node = root.getroottree() if '<!doctype' in html_content[:1024].lower() else root
+    return etree.tostring(node, method='html', encoding='unicode')
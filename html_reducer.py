@@ -0,0 +1,164 @@
+import re
+from typing import Callable, List, NamedTuple, Optional
+
+import lxml.html
+
+from usage import encoder, token_counter
+
+DEFAULT_TOKEN_BUDGET = 12_000
+
+# Section priorities: lower numbers survive longest when a page is over budget
+DESCRIPTION = 0
+STRUCTURE = 1
+OTHER = 2
+
+_HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_BLOCK_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'body', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'form', 'html', 'li', 'main', 'nav', 'ol',
+    'p', 'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title',
+    'tr', 'ul',
+] + list(_HEADINGS))
+_SKIPPED_TAGS = frozenset(['head', 'noscript', 'svg', 'iframe', 'template', 'button', 'select', 'option'])
+_APPLY_RE = re.compile(r"apply", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+class Block(NamedTuple):
+    priority: int
+    text: str
+
+
+class ReducedPage(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+
+# Walks the cleaned DOM and emits one prioritised line per block element
+class _Renderer:
+    def __init__(self):
+        self.blocks: List[Block] = []
+        self.line: List[str] = []
+        self.line_priority = OTHER
+        self.contexts = [("", OTHER)]
+        self.list_depth = 0
+        self.in_description = 0
+
+    def flush(self) -> None:
+        text = _SPACE_RE.sub(" ", "".join(self.line)).strip()
+        prefix, priority = self.contexts[-1]
+        if text:
+            self.blocks.append(Block(min(priority, self.line_priority), prefix + text))
+        self.line = []
+        self.line_priority = OTHER
+
+    def render(self, el) -> None:
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag is None or tag in _SKIPPED_TAGS:
+            return
+        if tag == 'title':
+            title = _SPACE_RE.sub(" ", el.text_content()).strip()
+            if title:
+                self.blocks.append(Block(STRUCTURE, f"Title: {title}"))
+            return
+        if tag == 'br':
+            self.flush()
+            return
+
+        is_description = 'description' in (el.get('class') or '')
+        is_block = tag in _BLOCK_TAGS or is_description
+        if is_block:
+            self.flush()
+            self.contexts.append(self._context_for(tag))
+        if is_description:
+            self.blocks.append(Block(DESCRIPTION, '<div class="description">'))
+            self.in_description += 1
+            self.contexts[-1] = (self.contexts[-1][0], DESCRIPTION)
+        if tag in ('ul', 'ol'):
+            self.list_depth += 1
+
+        if tag == 'a':
+            self._render_link(el)
+        else:
+            if el.text:
+                self.line.append(el.text)
+            for child in el:
+                self.render(child)
+                if child.tail:
+                    self.line.append(child.tail)
+
+        if tag in ('ul', 'ol'):
+            self.list_depth -= 1
+        if is_block:
+            self.flush()
+            self.contexts.pop()
+        if is_description:
+            self.in_description -= 1
+            self.blocks.append(Block(DESCRIPTION, '</div>'))
+
+    def _context_for(self, tag: str):
+        base = DESCRIPTION if self.in_description else OTHER
+        if tag in _HEADINGS:
+            return "#" * _HEADINGS[tag] + " ", min(base, STRUCTURE)
+        if tag == 'li':
+            return "  " * max(self.list_depth - 1, 0) + "- ", min(base, STRUCTURE)
+        return "", base
+
+    # Links keep their target so application_link and job tags survive
+    def _render_link(self, el) -> None:
+        text = _SPACE_RE.sub(" ", el.text_content()).strip()
+        href = (el.get('href') or '').strip()
+        if href and not href.startswith(('#', 'javascript:')):
+            self.line.append(f"[{text}]({href})" if text else f"<{href}>")
+            important = _APPLY_RE.search(text) or _APPLY_RE.search(href)
+            self.line_priority = min(self.line_priority, DESCRIPTION if important else STRUCTURE)
+        elif text:
+            self.line.append(text)
+
+
+def html_to_blocks(cleaned_html: str) -> List[Block]:
+    if not cleaned_html or not cleaned_html.strip():
+        return []
+    root = lxml.html.document_fromstring(cleaned_html)
+    renderer = _Renderer()
+    head = root.find('head')
+    title = head.find('title') if head is not None else None
+    if title is not None:
+        renderer.render(title)
+    renderer.render(root)
+    renderer.flush()
+    return renderer.blocks
+
+
+# Drop the lowest-priority, latest blocks first until the page fits the budget
+def fit_to_budget(blocks: List[Block], budget: int, count: Callable[[str], int]) -> List[Block]:
+    tokens = [count(block.text) + 1 for block in blocks]  # +1 for the joining newline
+    total = sum(tokens)
+    if total <= budget:
+        return blocks
+
+    keep = [True] * len(blocks)
+    for i in sorted(range(len(blocks)), key=lambda i: (-blocks[i].priority, -i)):
+        if total <= budget or blocks[i].priority == DESCRIPTION:
+            break
+        keep[i] = False
+        total -= tokens[i]
+    return [block for block, kept in zip(blocks, keep) if kept]
+
+
+# Turn cleaned HTML into compact, structure-preserving text within a token budget
+def reduce_html(cleaned_html: str, model: str = "gpt-4o-mini",
+                token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> ReducedPage:
+    count = token_counter(model)
+    blocks = html_to_blocks(cleaned_html)
+    if token_budget is not None:
+        blocks = fit_to_budget(blocks, token_budget, count)
+    text = "\n".join(block.text for block in blocks)
+
+    if token_budget is not None:
+        encoded = encoder(model).encode(text, disallowed_special=())
+        if len(encoded) > token_budget:
+            # Even the description alone is too long: keep its beginning
+            text = encoder(model).decode(encoded[:token_budget])
+    return ReducedPage(text, count(cleaned_html), count(text))
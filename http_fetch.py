@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+HTTP = "http"
+BROWSER = "browser"
+
+_DESCRIPTION_RE = re.compile(r"""<[a-zA-Z][^>]*\sclass\s*=\s*["'][^"']*description[^"']*["']""", re.IGNORECASE)
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+# A response's status and cache validators; `html` is set only for a 200 HTML page
+class HttpPage(NamedTuple):
+    status: int
+    html: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def visible_text_length(html: str) -> int:
+    text = _TAG_RE.sub(" ", _SCRIPT_STYLE_RE.sub(" ", html))
+    return len(_SPACE_RE.sub(" ", text).strip())
+
+
+# Decide whether a plain HTTP response already contains the rendered posting
+def looks_complete(html: str, min_text_chars: int = 400, min_density: float = 0.02) -> bool:
+    if not html or not _DESCRIPTION_RE.search(html):
+        return False
+    text_chars = visible_text_length(html)
+    return text_chars >= min_text_chars and text_chars / len(html) >= min_density
+
+
+# Remembers per domain whether plain HTTP is enough or the browser is needed
+class FetchDecisions:
+    def __init__(self, path: Optional[str] = None, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._decisions: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._decisions = json.load(f)
+
+    # Returns None when the domain has not been probed recently
+    def mode_for(self, domain: str) -> Optional[str]:
+        decision = self._decisions.get(domain)
+        if not decision or time.time() - decision["decided_at"] > self.ttl:
+            return None
+        return decision["mode"]
+
+    def record(self, domain: str, mode: str) -> None:
+        with self._lock:
+            current = self._decisions.get(domain)
+            if current and current["mode"] == mode:
+                current["decided_at"] = time.time()
+                return
+            self._decisions[domain] = {"mode": mode, "decided_at": time.time()}
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps(self._decisions)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # Written aside and renamed, so an interrupted save never leaves a file that fails to load
+            partial = self.path + ".partial"
+            with open(partial, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(partial, self.path)
+
+
+# Per-host politeness: at most `max_concurrent` requests in flight and `delay` seconds between starts
+class HostLimiter:
+    def __init__(self, max_concurrent: int = 2, delay: float = 1.0,
+                 overrides: Optional[Dict[str, Dict[str, float]]] = None):
+        self.max_concurrent = max_concurrent
+        self.delay = delay
+        self.overrides = overrides or {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _limits(self, host: str):
+        limits = self.overrides.get(host, {})
+        return int(limits.get("max_concurrent", self.max_concurrent)), limits.get("delay", self.delay)
+
+    # Hold a slot on the URL's host for the duration of one request
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = (urlparse(url).hostname or "").lower()
+        max_concurrent, delay = self._limits(host)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(max_concurrent))
+        semaphore.acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            semaphore.release()
+
+
+# Keep-alive HTTP client with connection pooling and compressed transfers
+class HttpFetcher:
+    def __init__(self, pool_size: int = 10, timeout: float = 10.0,
+                 decisions: Optional[FetchDecisions] = None):
+        self.timeout = timeout
+        self.decisions = decisions if decisions is not None else FetchDecisions()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    # Returns the page HTML, or None if the response is not a usable HTML page
+    def fetch(self, url: str) -> Optional[str]:
+        page = self.get(url)
+        return page.html if page is not None else None
+
+    # Conditional GET: with validators from an earlier response an unchanged page answers 304
+    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[HttpPage]:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+            return None
+        html = None
+        if response.status_code == 200 and "html" in response.headers.get("Content-Type", "html"):
+            html = response.text
+        return HttpPage(response.status_code, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+    # Status of a HEAD request after redirects, or None when it fails or the server does not allow HEAD
+    def status(self, url: str) -> Optional[int]:
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            print(f"HTTP HEAD failed for {url}: {e}")
+            return None
+        return None if response.status_code in (405, 501) else response.status_code
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+http_fetcher = HttpFetcher(decisions=FetchDecisions(os.path.join('output', 'fetch_decisions.json')))
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, TextIO
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ["fetch", "clean", "save_raw", "reduce", "segment", "structured_data", "dedup", "extract", "validate", "save"]
+
+_current_url: ContextVar[Optional[str]] = ContextVar("current_url", default=None)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1_000_000 if peak > 1 << 32 else 1_000), 1)
+
+
+class Span:
+    def __init__(self, stage: str, url: Optional[str]):
+        self.stage = stage
+        self.url = url
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# Records wall time, CPU time, bytes and peak memory per URL and stage
+class Recorder:
+    """
+    Each finished stage becomes one record, appended as a JSON line to `path`
+    through one open handle, and the last `keep` records stay in memory for
+    summaries; `mark()` and `since()` pick out the records of one run. CPU time
+    is the stage's own thread
+    time; peak memory is the process-wide RSS high-water mark when the stage
+    ended, since concurrent stages share one heap. Bytes are counted in
+    characters of the text passed into and out of the stage.
+    """
+
+    def __init__(self, path: Optional[str] = os.path.join('output', 'metrics.jsonl'), keep: int = 20_000):
+        self.path = path
+        self.records: Deque[Dict] = deque(maxlen=keep)
+        self.written = 0
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, url: Optional[str] = None) -> Iterator[Span]:
+        span = Span(name, url or _current_url.get())
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {
+                "timestamp": time.time(),
+                "url": span.url,
+                "stage": name,
+                "wall_s": round(time.perf_counter() - wall_start, 6),
+                "cpu_s": round(time.thread_time() - cpu_start, 6),
+                "bytes_in": span.bytes_in,
+                "bytes_out": span.bytes_out,
+                "peak_rss_mb": _peak_rss_mb(),
+                "error": error,
+            }
+            self._write(record)
+
+    def _write(self, record: Dict) -> None:
+        with self._lock:
+            self.records.append(record)
+            self.written += 1
+            if self.path:
+                if self._file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    # Line-buffered, so every record reaches the file as soon as its stage ends
+                    self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+                self._file.write(json.dumps(record) + "\n")
+
+    # Records made by another recorder, e.g. in a worker process, attributed to `url`
+    def add(self, records: Iterable[Dict], url: Optional[str] = None) -> None:
+        for record in records:
+            self._write({**record, "url": url or record.get("url") or _current_url.get()})
+
+    # Position to pass to since() at the start of a run
+    def mark(self) -> int:
+        return self.written
+
+    # Records made after `mark`, as far as they are still kept in memory
+    def since(self, mark: int) -> List[Dict]:
+        with self._lock:
+            count = min(self.written - mark, len(self.records))
+            return list(islice(self.records, len(self.records) - count, None))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # p50/p95 of wall and CPU time per stage, over `records` or everything kept in memory
+    def summary(self, records: Optional[Iterable[Dict]] = None) -> Dict[str, Dict[str, float]]:
+        records = self.records if records is None else records
+        by_stage: Dict[str, List[Dict]] = {}
+        for record in records:
+            by_stage.setdefault(record["stage"], []).append(record)
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        summary = {}
+        for stage in sorted(by_stage, key=lambda s: order.get(s, len(order))):
+            stage_records = by_stage[stage]
+            walls = [r["wall_s"] for r in stage_records]
+            cpus = [r["cpu_s"] for r in stage_records]
+            summary[stage] = {
+                "count": len(stage_records),
+                "wall_p50_s": percentile(walls, 50),
+                "wall_p95_s": percentile(walls, 95),
+                "cpu_p50_s": percentile(cpus, 50),
+                "cpu_p95_s": percentile(cpus, 95),
+                "bytes_in": sum(r["bytes_in"] for r in stage_records),
+                "bytes_out": sum(r["bytes_out"] for r in stage_records),
+                "errors": sum(1 for r in stage_records if r["error"]),
+            }
+        return summary
+
+
+recorder = Recorder()
+
+
+# Attribute every stage recorded in this context to `url`
+@contextmanager
+def tracking(url: str) -> Iterator[None]:
+    token = _current_url.set(url)
+    try:
+        yield
+    finally:
+        _current_url.reset(token)
+
+
+# The URL set by the innermost tracking() block, if any
+def current_url() -> Optional[str]:
+    return _current_url.get()
+
+
+def stage(name: str, url: Optional[str] = None):
+    return recorder.stage(name, url)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS postings ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, posting_key TEXT NOT NULL UNIQUE, "
+    "application_link TEXT, company_name TEXT, job_title TEXT, date_posted TEXT, "
+    "scraped_from TEXT, data TEXT NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS postings_application_link ON postings (application_link)",
+    "CREATE INDEX IF NOT EXISTS postings_company_name ON postings (company_name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS postings_date_posted ON postings (date_posted)",
+    "CREATE INDEX IF NOT EXISTS postings_scraped_from ON postings (scraped_from)",
+    # Every page a posting was stored from; postings.scraped_from is only the latest
+    "CREATE TABLE IF NOT EXISTS posting_pages ("
+    "posting_id INTEGER NOT NULL, url TEXT NOT NULL, PRIMARY KEY (posting_id, url))",
+    "CREATE INDEX IF NOT EXISTS posting_pages_url ON posting_pages (url)",
+    "CREATE TABLE IF NOT EXISTS pages ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, content_hash TEXT NOT NULL, "
+    "html BLOB NOT NULL, size INTEGER NOT NULL, scraped_at REAL NOT NULL, UNIQUE (url, content_hash))",
+]
+
+# Columns returned by query(), besides the posting's own fields
+COLUMNS = ["id", "application_link", "company_name", "job_title", "date_posted", "scraped_from",
+           "first_seen", "last_seen"]
+
+
+# Bumped whenever stored rows need migrating on open: 1 re-keys postings, 2 fills posting_pages
+SCHEMA_VERSION = 2
+
+
+# One posting per application link, company, title and cities. A link alone is not enough: boards
+# share one apply URL across openings, and JSON-LD without a `url` falls back to the page URL.
+# Postings without a link are told apart by the page they came from instead
+def posting_key(posting: Dict[str, Any], scraped_from: Optional[str] = None) -> str:
+    link = (posting.get("application_link") or "").strip()
+    cities = sorted({(location.get("city") or "").strip().casefold()
+                     for location in posting.get("locations") or [] if isinstance(location, dict)})
+    parts = [link or scraped_from or "", (posting.get("company_name") or "").strip().casefold(),
+             (posting.get("job_title") or "").strip().casefold(), ",".join(cities)]
+    return "sha256:" + hashlib.sha256("\0".join(parts).encode('utf-8')).hexdigest()
+
+
+def compress_html(html: str) -> bytes:
+    return zlib.compress(html.encode('utf-8'), 6)
+
+
+def decompress_html(blob: bytes) -> str:
+    return zlib.decompress(blob).decode('utf-8')
+
+
+# Append-only SQLite store of scraped postings and compressed page HTML
+class JobStore:
+    """
+    Writes are buffered and committed in one transaction once `batch_size`
+    rows are pending or `flush_interval` seconds have passed. A posting seen
+    again (same application link, company, title and cities; see posting_key)
+    is updated in place rather than added twice; pages are kept once per
+    distinct cleaned HTML. Reads flush first, so a query always sees
+    everything written before it.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'jobs.sqlite3'), batch_size: int = 100,
+                 flush_interval: float = 5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._postings: List[Tuple] = []
+        self._pages: List[Tuple] = []
+        self._last_flush = time.monotonic()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+            self._migrate(self._conn)
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with conn:
+            if version < 1:
+                rows = conn.execute("SELECT id, scraped_from, data FROM postings ORDER BY last_seen").fetchall()
+                # Rows that now share a key differed only in letter case; the one seen last is kept
+                conn.executemany("UPDATE OR REPLACE postings SET posting_key = ? WHERE id = ?",
+                                 [(posting_key(json.loads(data), scraped_from), row_id)
+                                  for row_id, scraped_from, data in rows])
+            if version < 2:
+                conn.execute("INSERT OR IGNORE INTO posting_pages (posting_id, url) "
+                             "SELECT id, scraped_from FROM postings WHERE scraped_from IS NOT NULL")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def add_page(self, url: str, cleaned_html: str) -> None:
+        digest = hashlib.sha256(cleaned_html.encode('utf-8')).hexdigest()
+        blob = compress_html(cleaned_html)
+        with self._lock:
+            self._pages.append((url, digest, blob, len(cleaned_html), time.time()))
+            self._maybe_flush()
+
+    # Queue every posting in a JobPostingsContainer-shaped dict for upsert
+    def add_postings(self, container: Dict[str, Any], scraped_from: Optional[str] = None) -> int:
+        scraped_from = scraped_from or (container.get("metadata") or {}).get("scraped_from")
+        now = time.time()
+        with self._lock:
+            for posting in container.get("job_postings") or []:
+                self._postings.append((
+                    posting_key(posting, scraped_from), posting.get("application_link"),
+                    posting.get("company_name"), posting.get("job_title"), posting.get("date_posted"),
+                    scraped_from, json.dumps(posting), now, now,
+                ))
+            self._maybe_flush()
+        return len(container.get("job_postings") or [])
+
+    def _maybe_flush(self) -> None:
+        pending = len(self._postings) + len(self._pages)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._postings and not self._pages:
+                return
+            db = self._db()
+            with db:
+                db.executemany(
+                    "INSERT INTO postings (posting_key, application_link, company_name, job_title, date_posted, "
+                    "scraped_from, data, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (posting_key) DO UPDATE SET application_link = excluded.application_link, "
+                    "company_name = excluded.company_name, job_title = excluded.job_title, "
+                    "date_posted = excluded.date_posted, scraped_from = excluded.scraped_from, "
+                    "data = excluded.data, last_seen = excluded.last_seen",
+                    self._postings,
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO posting_pages (posting_id, url) SELECT id, ? FROM postings WHERE posting_key = ?",
+                    [(row[5], row[0]) for row in self._postings if row[5]],
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO pages (url, content_hash, html, size, scraped_at) VALUES (?, ?, ?, ?, ?)",
+                    self._pages,
+                )
+            self._postings = []
+            self._pages = []
+
+    @staticmethod
+    def _where(company_name: Optional[str], application_link: Optional[str], posted_from: Optional[str],
+               posted_to: Optional[str], seen_since: Optional[float] = None,
+               scraped_from: Optional[Iterable[str]] = None, before_id: Optional[int] = None) -> Tuple[str, List]:
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if company_name:
+            clauses.append("company_name = ? COLLATE NOCASE")
+            params.append(company_name)
+        if application_link:
+            clauses.append("application_link = ?")
+            params.append(application_link)
+        if posted_from:
+            clauses.append("date_posted >= ?")
+            params.append(posted_from)
+        if posted_to:
+            clauses.append("date_posted <= ?")
+            params.append(posted_to)
+        if seen_since is not None:
+            clauses.append("last_seen >= ?")
+            params.append(seen_since)
+        if scraped_from is not None:
+            # One JSON parameter, so any number of pages fits in the statement
+            clauses.append("id IN (SELECT posting_id FROM posting_pages WHERE url IN (SELECT value FROM json_each(?)))")
+            params.append(json.dumps(list(scraped_from)))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    # One page of postings, newest first; each row is the posting plus its COLUMNS.
+    # `scraped_from` keeps the postings stored from any of the given page URLs, at any time
+    def query(self, company_name: Optional[str] = None, application_link: Optional[str] = None,
+              posted_from: Optional[str] = None, posted_to: Optional[str] = None,
+              seen_since: Optional[float] = None, scraped_from: Optional[Iterable[str]] = None,
+              limit: int = 50, offset: int = 0, before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        self.flush()
+        where, params = self._where(company_name, application_link, posted_from, posted_to, seen_since,
+                                    scraped_from, before_id)
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT {', '.join(COLUMNS)}, data FROM postings{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [{**json.loads(row[-1]), **dict(zip(COLUMNS, row))} for row in rows]
+
+    def count(self, company_name: Optional[str] = None, application_link: Optional[str] = None,
+              posted_from: Optional[str] = None, posted_to: Optional[str] = None,
+              seen_since: Optional[float] = None, scraped_from: Optional[Iterable[str]] = None) -> int:
+        self.flush()
+        where, params = self._where(company_name, application_link, posted_from, posted_to, seen_since, scraped_from)
+        with self._lock:
+            return self._db().execute(f"SELECT COUNT(*) FROM postings{where}", params).fetchone()[0]
+
+    # Every matching posting, read `chunk_size` rows at a time by id so concurrent writes do not shift pages
+    def iter_postings(self, chunk_size: int = 500, **filters) -> Iterator[Dict[str, Any]]:
+        before_id = None
+        while True:
+            rows = self.query(limit=chunk_size, before_id=before_id, **filters)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            before_id = rows[-1]["id"]
+
+    # Changes whenever a posting is added or seen again; identifies the store's contents for caching
+    def version(self) -> Tuple[int, float, int]:
+        self.flush()
+        with self._lock:
+            count, last_seen, max_id = self._db().execute(
+                "SELECT COUNT(*), COALESCE(MAX(last_seen), 0), COALESCE(MAX(id), 0) FROM postings"
+            ).fetchone()
+        return count, last_seen, max_id
+
+    # The most recently stored cleaned HTML for `url`
+    def page_html(self, url: str) -> Optional[str]:
+        self.flush()
+        with self._lock:
+            row = self._db().execute(
+                "SELECT html FROM pages WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+            ).fetchone()
+        return decompress_html(row[0]) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+job_store = JobStore()
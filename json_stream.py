@@ -0,0 +1,89 @@
+import json
+import re
+from typing import List, Optional
+
+_SPECIAL_RE = re.compile(r'["{}\[\]:,]')
+_STRING_END_RE = re.compile(r'["\\]')
+
+
+# Pulls the complete items of one top-level array out of a JSON document that arrives in pieces
+class ArrayItemStream:
+    """
+    `feed(chunk)` returns the raw JSON text of every object in the root
+    object's `key` array that closed within the chunk, so callers can parse
+    each one while the rest of the document is still arriving. Text before
+    the root object (such as a ```json fence) is ignored. Every character is
+    scanned once; `text` holds everything fed so far.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        text = self.text
+        items = []
+        i = self._pos
+        while True:
+            if self._in_string:
+                match = _STRING_END_RE.search(text, i)
+                if match is None:
+                    i = len(text)
+                    break
+                i = match.start()
+                if text[i] == "\\":
+                    if i + 1 >= len(text):
+                        break  # the escaped character has not arrived yet
+                    i += 2
+                    continue
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_string = text[self._string_start:i + 1]
+                i += 1
+                continue
+
+            match = _SPECIAL_RE.search(text, i)
+            if match is None:
+                i = len(text)
+                break
+            i = match.start()
+            char = text[i]
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._current_key == self.key:
+                    self._in_array = True
+                elif char == "{" and self._in_array and self._depth == 3:
+                    self._item_start = i
+            elif char in "}]":
+                if char == "}" and self._in_array and self._depth == 3 and self._item_start is not None:
+                    items.append(text[self._item_start:i + 1])
+                    self._item_start = None
+                elif char == "]" and self._in_array and self._depth == 2:
+                    self._in_array = False
+                self._depth -= 1
+            elif self._depth == 1:
+                if char == ":":
+                    self._current_key = self._decode_key()
+                else:
+                    self._current_key = None
+            i += 1
+        self._pos = i
+        return items
+
+    def _decode_key(self) -> Optional[str]:
+        try:
+            return json.loads(self._last_string) if self._last_string else None
+        except ValueError:
+            return None
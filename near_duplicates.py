@@ -0,0 +1,267 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Pages at least this similar (estimated Jaccard over word shingles) count as the same posting
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 64
+SHINGLE_SIZE = 5
+# Banding is tuned this far below the threshold, so true duplicates are rarely missed;
+# the extra candidates are then checked against the full signature
+RECALL_MARGIN = 0.1
+# Rows added since the last merge are looked up in a dict; beyond this they join the sorted arrays
+MERGE_EVERY = 4096
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_GRAM_MULTIPLIER = np.uint64(0x100000001B3)
+_URL_QUERY_RE = re.compile(r"(https?://[^\s?#)\]]+)[?#][^\s)\]]*")
+_WORD_RE = re.compile(r"\w+")
+
+
+class Match(NamedTuple):
+    url: str
+    similarity: float
+    extraction: Optional[str]  # JobPostingsContainer JSON stored with the earlier page
+
+
+# Words of the page with URL query strings and fragments (tracking parameters) dropped
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(_URL_QUERY_RE.sub(r"\1", text).lower())
+
+
+# Hashes of the text's word `size`-grams, built from per-word hashes without joining strings
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    words = _words(text)
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in words), dtype=np.uint64, count=len(words))
+    width = min(size, len(hashes))
+    count = len(hashes) - width + 1
+    grams = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        grams = grams * _GRAM_MULTIPLIER + hashes[offset:offset + count]
+    return np.unique((grams ^ (grams >> np.uint64(32))) & _MAX_HASH)
+
+
+# Bands and rows per band that put the LSH candidate curve just under `threshold`
+def choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    target = threshold - RECALL_MARGIN
+    below = [option for option in options if (1 / option[0]) ** (1 / option[1]) <= target]
+    if not below:
+        return max(options)
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1]))
+
+
+# MinHash/LSH index of extracted pages, persisted in SQLite and searched in memory
+class NearDuplicateIndex:
+    """
+    Each page's reduced text is turned into a MinHash signature over word
+    shingles (URL query strings are dropped first, so tracking parameters do
+    not count). Signatures are split into bands, and a page whose signature
+    shares a band with a stored one is compared against it in full; the
+    closest page at or above `threshold` is the match. Band keys live in
+    sorted numpy arrays, so memory stays around 0.5 kB per page at the
+    default 64 permutations. Only signatures and extractions are stored,
+    so the threshold can change between runs; the permutation count and
+    shingle size cannot.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'near_duplicates.sqlite3'),
+                 threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                 shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        # Multiply-shift hash functions: odd 64-bit multipliers, keeping the top 32 bits
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False)
+        self._band_weights = self._weights(self.rows)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._ids = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+        self._sorted_keys: List[np.ndarray] = []
+        self._sorted_positions: List[np.ndarray] = []
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._pending_count = 0
+        self.counts = {"queries": 0, "matches": 0, "added": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "id INTEGER PRIMARY KEY, url TEXT NOT NULL, signature BLOB NOT NULL, "
+                "extraction TEXT, added REAL NOT NULL)"
+            )
+            settings = {"num_perm": str(self.num_perm), "shingle_size": str(self.shingle_size), "seed": str(self.seed)}
+            stored = dict(self._conn.execute("SELECT name, value FROM settings"))
+            if stored and stored != settings:
+                raise ValueError(f"{self.path} was built with {stored}, not {settings}; use a new path")
+            self._conn.executemany("INSERT OR IGNORE INTO settings VALUES (?, ?)", settings.items())
+            self._conn.commit()
+        return self._conn
+
+    # Change the match threshold, re-banding the stored signatures to suit it
+    def set_threshold(self, threshold: float) -> None:
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        with self._lock:
+            self.threshold = threshold
+            bands, rows = choose_bands(threshold, self.num_perm)
+            if (bands, rows) != (self.bands, self.rows):
+                self.bands, self.rows = bands, rows
+                self._band_weights = self._weights(rows)
+                if self._loaded:
+                    self._rebuild()
+                else:
+                    self._pending = [{} for _ in range(bands)]
+
+    @staticmethod
+    def _weights(rows: int) -> np.ndarray:
+        # Odd 64-bit multipliers that mix each band's rows into one key
+        return np.array([(0x9E3779B97F4A7C15 * (2 * i + 1)) % (1 << 64) for i in range(rows)], dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashes = shingles(text, self.shingle_size)
+        if not len(hashes):
+            return None
+        permuted = (np.outer(hashes, self._a) + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (rows * self._band_weights).sum(axis=2)
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        rows = self._db().execute("SELECT id, signature FROM pages ORDER BY id").fetchall()
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        blob = b"".join(row[1] for row in rows)
+        self._signatures = np.frombuffer(blob, dtype=np.uint32).reshape(len(rows), self.num_perm).copy()
+        self._size = len(rows)
+        self._rebuild()
+        self._loaded = True
+
+    # Fold every row into the sorted per-band arrays
+    def _rebuild(self) -> None:
+        keys = self._band_keys(self._signatures[:self._size])
+        self._sorted_keys, self._sorted_positions = [], []
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            self._sorted_keys.append(keys[order, band])
+            self._sorted_positions.append(order.astype(np.int32))
+        self._pending = [{} for _ in range(self.bands)]
+        self._pending_count = 0
+
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        found = []
+        for band, key in enumerate(keys):
+            sorted_keys = self._sorted_keys[band]
+            lo = np.searchsorted(sorted_keys, key, side="left")
+            hi = np.searchsorted(sorted_keys, key, side="right")
+            if hi > lo:
+                found.append(self._sorted_positions[band][lo:hi])
+            pending = self._pending[band].get(int(key))
+            if pending:
+                found.append(np.array(pending, dtype=np.int32))
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    # Closest stored page at or above the threshold, or None
+    def match(self, signature: Optional[np.ndarray]) -> Optional[Match]:
+        if signature is None:
+            return None
+        with self._lock:
+            self._load()
+            self.counts["queries"] += 1
+            if not self._size:
+                return None
+            positions = self._candidates(self._band_keys(signature[None, :])[0])
+            if not len(positions):
+                return None
+            similarity = (self._signatures[positions] == signature).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.threshold:
+                return None
+            row = self._db().execute(
+                "SELECT url, extraction FROM pages WHERE id = ?", (int(self._ids[positions[best]]),)
+            ).fetchone()
+            self.counts["matches"] += 1
+        return Match(row[0], round(float(similarity[best]), 3), row[1])
+
+    def add(self, url: str, signature: Optional[np.ndarray], extraction: Optional[str] = None) -> None:
+        self.add_many([(url, signature, extraction)])
+
+    # Store many pages in one transaction
+    def add_many(self, pages: Iterable[Tuple[str, Optional[np.ndarray], Optional[str]]]) -> None:
+        with self._lock:
+            self._load()
+            db = self._db()
+            now = time.time()
+            for url, signature, extraction in pages:
+                if signature is None:
+                    continue
+                cursor = db.execute(
+                    "INSERT INTO pages (url, signature, extraction, added) VALUES (?, ?, ?, ?)",
+                    (url, signature.astype(np.uint32).tobytes(), extraction, now),
+                )
+                self._append(cursor.lastrowid, signature)
+                self.counts["added"] += 1
+            db.commit()
+
+    def _append(self, row_id: int, signature: np.ndarray) -> None:
+        if self._size == len(self._signatures):
+            capacity = max(1024, 2 * len(self._signatures))
+            self._signatures = np.resize(self._signatures, (capacity, self.num_perm))
+            self._ids = np.resize(self._ids, capacity)
+        position = self._size
+        self._signatures[position] = signature
+        self._ids[position] = row_id
+        self._size += 1
+        for band, key in enumerate(self._band_keys(signature[None, :])[0]):
+            self._pending[band].setdefault(int(key), []).append(position)
+        self._pending_count += 1
+        if self._pending_count >= MERGE_EVERY:
+            self._rebuild()
+
+    # Bytes held by the in-memory arrays (signatures, row ids, sorted band keys and positions)
+    def memory_bytes(self) -> int:
+        with self._lock:
+            arrays = [self._signatures, self._ids] + self._sorted_keys + self._sorted_positions
+            return sum(array.nbytes for array in arrays)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return self._size
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,205 @@
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Element that clean_html keeps as the job description
+DEFAULT_SELECTOR = '[class*="description"]'
+
+# Per-site readiness selectors, matched on the domain suffix
+SITE_SELECTORS: Dict[str, str] = {
+    "aijobs.ai": DEFAULT_SELECTOR,
+}
+
+# Sites whose listings keep loading as the user scrolls
+INFINITE_SCROLL_SITES = set()
+
+# Installs a MutationObserver on first use and reports the page's current state
+_PROBE_SCRIPT = """
+var selector = arguments[0];
+var w = window.__scraperWait;
+if (!w) {
+    w = window.__scraperWait = {lastMutation: performance.now(), resources: -1, lastResource: 0};
+    try { performance.setResourceTimingBufferSize(10000); } catch (e) {}
+    try {
+        new MutationObserver(function () { w.lastMutation = performance.now(); })
+            .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    } catch (e) {}
+}
+var now = performance.now();
+var count = performance.getEntriesByType('resource').length;
+if (count !== w.resources) { w.resources = count; w.lastResource = now; }
+return {
+    ready: document.readyState,
+    mutation_idle: now - w.lastMutation,
+    network_idle: now - w.lastResource,
+    found: selector ? document.querySelector(selector) !== null : true,
+    height: document.body ? document.body.scrollHeight : 0
+};
+"""
+
+
+def domain_of(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+# The entry of a per-site table (a dict, or a set of sites) for the URL's domain or a parent domain;
+# True for a set member, None when no site matches
+def site_config_for(table, url: str):
+    domain = domain_of(url)
+    for site in table:
+        if domain == site or domain.endswith("." + site):
+            return table[site] if isinstance(table, dict) else True
+    return None
+
+
+# Per-domain record of how long pages took to become ready, saved at most every `save_interval` seconds.
+# A timeout in the last `recent` loads of a domain puts it back on the default timeout until it has passed
+class WaitStats:
+    def __init__(self, path: Optional[str] = None, window: int = 50, save_interval: float = 30.0,
+                 recent: int = 10):
+        self.path = path
+        self.window = window
+        self.save_interval = save_interval
+        self.recent = recent
+        self._samples: Dict[str, List[float]] = {}
+        self._timeouts: Dict[str, List[bool]] = {}  # whether each sample timed out
+        self._lock = threading.Lock()
+        self._last_saved = 0.0
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self._samples = saved.get("samples", {})
+            # Files from before per-sample outcomes have a bare count, which cannot be aged; drop it
+            self._timeouts = {domain: flags for domain, flags in saved.get("timeouts", {}).items()
+                              if isinstance(flags, list)}
+
+    def record(self, domain: str, elapsed: float, timed_out: bool = False) -> None:
+        with self._lock:
+            samples = self._samples.setdefault(domain, [])
+            samples.append(round(elapsed, 3))
+            del samples[:-self.window]
+            timeouts = self._timeouts.setdefault(domain, [])
+            timeouts.append(timed_out)
+            del timeouts[:-self.window]
+            due = time.monotonic() - self._last_saved >= self.save_interval
+        if due:
+            self.save()
+
+    # Hard timeout for the next fetch: generous headroom over the slowest recent loads
+    def timeout_for(self, domain: str, default: float) -> float:
+        samples = self._samples.get(domain, [])
+        if len(samples) < 3 or any(self._timeouts.get(domain, [])[-self.recent:]):
+            return default
+        p95 = sorted(samples)[int(0.95 * (len(samples) - 1))]
+        return min(default, max(3.0, p95 * 2))
+
+    # Time we can skip polling for, since the page has never been ready sooner
+    def initial_delay(self, domain: str) -> float:
+        samples = self._samples.get(domain, [])
+        if len(samples) < 3:
+            return 0.0
+        return min(samples) * 0.5
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                domain: {
+                    "samples": len(samples),
+                    "median": statistics.median(samples),
+                    "max": max(samples),
+                    "timeouts": sum(self._timeouts.get(domain, [])),
+                }
+                for domain, samples in self._samples.items() if samples
+            }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            self._last_saved = time.monotonic()
+            payload = json.dumps({"samples": self._samples, "timeouts": self._timeouts})
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Written aside and renamed, so an interrupted save never leaves a file that fails to load
+            partial = self.path + ".partial"
+            with open(partial, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(partial, self.path)
+
+
+wait_stats = WaitStats(os.path.join('output', 'page_wait_stats.json'))
+
+
+def _is_settled(state: dict, quiet_ms: float, eager: bool = False) -> bool:
+    return (
+        (state["ready"] == "complete" or (eager and state["ready"] == "interactive"))
+        and state["found"]
+        and state["mutation_idle"] >= quiet_ms
+        and state["network_idle"] >= quiet_ms
+    )
+
+
+def _poll_until_settled(driver, selector: Optional[str], quiet_ms: float,
+                        deadline: float, poll_interval: float, eager: bool = False) -> Optional[dict]:
+    while True:
+        state = driver.execute_script(_PROBE_SCRIPT, selector)
+        if _is_settled(state, quiet_ms, eager):
+            return state
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+
+
+# Wait until the loaded page is ready instead of sleeping for a fixed time
+def wait_for_page(driver, url: str, selector: Optional[str] = None,
+                  infinite_scroll: Optional[bool] = None, timeout: float = 15.0,
+                  quiet_ms: float = 500, poll_interval: float = 0.1,
+                  max_scrolls: int = 20, stats: Optional[WaitStats] = wait_stats,
+                  eager: bool = False) -> float:
+    """
+    Polls document readiness, network and DOM-mutation quiet periods and the
+    optional `selector`, then scrolls to the bottom (repeatedly for infinite-
+    scroll sites, until the page height stops growing). Never waits longer
+    than the hard timeout; returns the time spent waiting in seconds. With
+    `eager` page loads, an interactive document counts as loaded, so late
+    subresources such as images do not hold the page up.
+    """
+    domain = domain_of(url)
+    if selector is None:
+        selector = site_config_for(SITE_SELECTORS, url)
+    if infinite_scroll is None:
+        infinite_scroll = bool(site_config_for(INFINITE_SCROLL_SITES, url))
+
+    start = time.monotonic()
+    if stats is not None:
+        timeout = stats.timeout_for(domain, timeout)
+        time.sleep(stats.initial_delay(domain))
+    deadline = start + timeout
+    state = _poll_until_settled(driver, selector, quiet_ms, deadline, poll_interval, eager)
+    timed_out = state is None
+
+    # Scroll once to trigger lazy content, or keep going while the page grows
+    scrolls = 0
+    while not timed_out and scrolls < (max_scrolls if infinite_scroll else 1):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        scrolls += 1
+        new_state = _poll_until_settled(driver, None, quiet_ms, deadline, poll_interval, eager)
+        if new_state is None:
+            timed_out = True
+        elif new_state["height"] == state["height"]:
+            break
+        else:
+            state = new_state
+
+    elapsed = time.monotonic() - start
+    if stats is not None:
+        stats.record(domain, elapsed, timed_out)
+    if timed_out:
+        print(f"Page wait for {url} hit the {timeout:.1f}s timeout; using the HTML loaded so far")
+    return elapsed
@@ -0,0 +1,341 @@
+import functools
+import queue
+import threading
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from driver_pool import DriverPool
+from http_fetch import HostLimiter
+from instrumentation import Recorder, recorder, stage, tracking
+from html_reducer import ReducedPage, reduce_html
+from job_store import JobStore, job_store
+from recrawl import RecrawlState, content_hash
+from segmenter import segment_texts
+from near_duplicates import NearDuplicateIndex
+from scraper import (
+    JobPostingsContainer, clean_html, extract_job_data, fetch_html, fetch_if_changed, parse_container,
+    setup_selenium,
+)
+from usage import BudgetExceeded, metering
+
+_DONE = object()
+
+# Start of ScrapeResult.error for pages not extracted because the API budget ran out
+BUDGET_EXCEEDED = "Budget exceeded"
+
+
+class ScrapeResult(NamedTuple):
+    url: str
+    formatted_data: Optional[JobPostingsContainer] = None
+    html_tokens: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_cost: float = 0.0
+    error: Optional[str] = None
+    status: Optional[str] = None  # recrawl status: new, changed, unchanged or gone
+    partial: bool = False  # streamed postings so far; the URL's final result follows
+
+
+# The CPU-bound part of the clean stage in one call, so it can run in a worker process
+# The stages are timed here, in the worker, and their records returned for the parent's recorder
+def prepare_page(raw_html: str, model: str, segment: bool) -> Tuple[str, ReducedPage, List[str], List[Dict]]:
+    timings = Recorder(path=None)
+    with timings.stage("clean") as span:
+        span.bytes_in = len(raw_html)
+        cleaned_html = clean_html(raw_html)
+        span.bytes_out = len(cleaned_html)
+    with timings.stage("reduce") as span:
+        span.bytes_in = len(cleaned_html)
+        reduced = reduce_html(cleaned_html, model=model)
+        span.bytes_out = len(reduced.text)
+    segments = []
+    if segment:
+        with timings.stage("segment") as span:
+            span.bytes_in = len(cleaned_html)
+            segments = segment_texts(cleaned_html, model=model)
+            span.bytes_out = sum(len(text) for text in segments)
+    return cleaned_html, reduced, segments, list(timings.records)
+
+
+# A page moving through the stages; `result` is set once it is finished or failed
+class _Job:
+    def __init__(self, index: int, url: str):
+        self.index = index
+        self.url = url
+        self.scraped_at = None
+        self.raw_html = None
+        self.reduced = None
+        self.segments = None
+        self.previous = None
+        self.page = None
+        self.content_hash = None
+        self.result: Optional[ScrapeResult] = None
+
+
+class _Stage:
+    def __init__(self, name: str, workers: int, work: Callable[[_Job], None],
+                 inbox: queue.Queue, outbox: queue.Queue, downstream_workers: int,
+                 stop: threading.Event):
+        self.name = name
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+        self.downstream_workers = downstream_workers
+        self.stop = stop
+        self._remaining = workers
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, name=f"scrape-{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = _get(self.inbox, self.stop)
+            if job is _DONE:
+                break
+            if job.result is None:
+                try:
+                    with tracking(job.url):
+                        self.work(job)
+                except Exception as e:
+                    job.result = ScrapeResult(job.url, error=f"{self.name} failed: {e}")
+            _put(self.outbox, job, self.stop)
+
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                _put(self.outbox, _DONE, self.stop)
+
+
+# Block on an empty queue, but return _DONE once the pipeline is being shut down
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+# Block on a full queue, but give up once the pipeline is being shut down
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+# Fetch, clean and extract many URLs concurrently, yielding each result as it completes
+def scrape_many(urls: Iterable[str], model: str = "gpt-4o-mini", fetch_workers: int = 2,
+                cpu_workers: int = 2, llm_workers: int = 4, queue_size: int = 8,
+                pool: Optional[DriverPool] = None, store: JobStore = job_store,
+                state: Optional[RecrawlState] = None,
+                limiter: Optional[HostLimiter] = None, stream: bool = False,
+                profile: Optional[str] = None, segment: bool = True,
+                duplicates: Optional[NearDuplicateIndex] = None,
+                cpu_executor: Optional[Executor] = None) -> Iterator[ScrapeResult]:
+    """
+    Runs a three-stage pipeline: browser/HTTP fetches, CPU-bound cleaning and
+    reduction, and LLM extraction. Each stage has its own worker count, and
+    bounded queues between them keep a slow stage from piling up pages in
+    memory. Results arrive in completion order, not input order. Cleaned
+    pages and extracted postings are written to `store` in batches. Tokens
+    and cost in each result are what the API reported for that page's calls
+    (see usage.metering), so pages answered from structured data, the cache
+    or a near-duplicate cost nothing.
+
+    With a recrawl `state`, pages that answer 304 or whose cleaned HTML is
+    unchanged skip the remaining stages and return their stored extraction,
+    and every result carries a new/changed/unchanged/gone status. A `limiter`
+    caps concurrent fetches and spaces requests per host. With `stream`, LLM
+    extractions are streamed and a partial result is yielded each time
+    another posting arrives, before the URL's final result. `profile` names
+    the browser fetch profile used when the pipeline launches its own pool.
+    With `segment`, pages listing several postings are split into one block
+    per posting and the blocks are extracted in parallel. With a `duplicates`
+    index, a page whose text nearly matches an earlier extraction reuses it
+    instead of calling the model.
+
+    A `cpu_executor` (usually a ProcessPoolExecutor) takes over cleaning,
+    reduction and segmentation, so they run in parallel outside the GIL while
+    the stage threads only wait on them. The threads still overlap that work
+    with fetching and extraction, as without one.
+
+    If iterating `urls` raises, the URLs read before it still run to the end
+    and the error is then raised to the consumer. Once an extraction is
+    refused for going over the usage ledger's budget, no more URLs are read;
+    pages already queued are not fetched, and every page left unextracted
+    gets an error starting with BUDGET_EXCEEDED.
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(functools.partial(setup_selenium, profile), size=fetch_workers)
+
+    def polite(url: str):
+        return limiter.slot(url) if limiter is not None else nullcontext()
+
+    # The URL is as it was last run: report the stored extraction without redoing any work
+    def unchanged(job: _Job) -> None:
+        status = state.unchanged(job.url, job.page.etag, job.page.last_modified)
+        formatted_data = None
+        if job.previous.extraction:
+            formatted_data = parse_container(job.previous.extraction, job.scraped_at)
+        job.result = ScrapeResult(job.url, formatted_data, status=status)
+        job.raw_html = None
+
+    def fetch(job: _Job) -> None:
+        if budget_spent.is_set():
+            job.result = ScrapeResult(job.url, error=f"{BUDGET_EXCEEDED}; not fetched")
+            return
+        job.scraped_at = datetime.now()
+        if state is None:
+            with polite(job.url), stage("fetch") as span:
+                job.raw_html = fetch_html(job.url, pool=pool)
+                span.bytes_out = len(job.raw_html)
+            return
+
+        job.previous = state.get(job.url)
+        etag, last_modified = (job.previous.etag, job.previous.last_modified) if job.previous else (None, None)
+        with polite(job.url), stage("fetch") as span:
+            job.page = fetch_if_changed(job.url, etag, last_modified, pool=pool)
+            span.bytes_out = len(job.page.html or "")
+        if job.page.status == 304 and job.previous is not None:
+            unchanged(job)
+        elif job.page.status in (404, 410):
+            if job.previous is not None:
+                job.result = ScrapeResult(job.url, status=state.gone(job.url))
+            else:
+                job.result = ScrapeResult(job.url, error=f"HTTP {job.page.status}")
+        elif job.page.html is None:
+            job.result = ScrapeResult(job.url, error=f"HTTP {job.page.status}")
+        else:
+            job.raw_html = job.page.html
+
+    def clean(job: _Job) -> None:
+        reduced = segments = None
+        if cpu_executor is not None:
+            # Reduction and segmentation are done in the same trip to the worker process
+            cleaned_html, reduced, segments, timings = cpu_executor.submit(
+                prepare_page, job.raw_html, model, segment).result()
+            recorder.add(timings, job.url)
+        else:
+            with stage("clean") as span:
+                span.bytes_in = len(job.raw_html)
+                cleaned_html = clean_html(job.raw_html)
+                span.bytes_out = len(cleaned_html)
+        if state is not None:
+            # Servers without validators: compare what cleaning left of the page
+            job.content_hash = content_hash(cleaned_html)
+            if job.previous is not None and job.previous.content_hash == job.content_hash:
+                unchanged(job)
+                return
+        with stage("save_raw") as span:
+            span.bytes_out = len(cleaned_html)
+            store.add_page(job.url, cleaned_html)
+        if reduced is not None:
+            job.reduced, job.segments = reduced, segments
+            return
+        with stage("reduce") as span:
+            span.bytes_in = len(cleaned_html)
+            job.reduced = reduce_html(cleaned_html, model=model)
+            span.bytes_out = len(job.reduced.text)
+        if segment:
+            with stage("segment") as span:
+                span.bytes_in = len(cleaned_html)
+                job.segments = segment_texts(cleaned_html, model=model)
+                span.bytes_out = sum(len(text) for text in job.segments)
+
+    def extract(job: _Job) -> None:
+        on_posting = None
+        if stream:
+            streamed = []
+
+            def on_posting(posting) -> None:
+                streamed.append(posting)
+                so_far = JobPostingsContainer.model_construct(job_postings=list(streamed), metadata={})
+                _put(done_queue, ScrapeResult(job.url, so_far, job.reduced.tokens_before, partial=True), stop)
+
+        # Every API call made for this page is charged to it, with the usage the API reported
+        with metering() as meter:
+            try:
+                formatted_data = extract_job_data(job.raw_html, job.reduced.text, url=job.url, model=model,
+                                                  scraped_at=job.scraped_at, on_posting=on_posting,
+                                                  segments=job.segments, duplicates=duplicates)
+            except BudgetExceeded as e:
+                budget_spent.set()
+                job.result = ScrapeResult(job.url, None, job.reduced.tokens_before, meter.input_tokens,
+                                          meter.output_tokens, meter.cost, error=f"{BUDGET_EXCEEDED}: {e}")
+                return
+        if formatted_data is None:
+            job.result = ScrapeResult(job.url, None, job.reduced.tokens_before, meter.input_tokens,
+                                      meter.output_tokens, meter.cost, error="No data extracted")
+            return
+        with stage("save"):
+            store.add_postings(formatted_data.model_dump(), scraped_from=job.url)
+        status = None
+        if state is not None:
+            status = state.update(job.url, job.content_hash, formatted_data.model_dump_json(),
+                                  job.page.etag, job.page.last_modified)
+        job.result = ScrapeResult(job.url, formatted_data, job.reduced.tokens_before,
+                                  meter.input_tokens, meter.output_tokens, meter.cost, status=status)
+        job.raw_html = job.reduced = job.segments = None
+
+    stop = threading.Event()
+    budget_spent = threading.Event()
+    url_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    clean_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    extract_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    done_queue: queue.Queue = queue.Queue()
+
+    stages = [
+        _Stage("fetch", fetch_workers, fetch, url_queue, clean_queue, cpu_workers, stop),
+        _Stage("clean", cpu_workers, clean, clean_queue, extract_queue, llm_workers, stop),
+        _Stage("extract", llm_workers, extract, extract_queue, done_queue, 1, stop),
+    ]
+    for pipeline_stage in stages:
+        pipeline_stage.start()
+
+    feed_errors: List[Exception] = []
+
+    # `urls` may be a crawl or stdin; if reading it fails, the pages already queued still finish
+    def feed() -> None:
+        try:
+            for index, url in enumerate(urls):
+                if budget_spent.is_set():
+                    break
+                url = url.strip()
+                if url:
+                    _put(url_queue, _Job(index, url), stop)
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            for _ in range(fetch_workers):
+                _put(url_queue, _DONE, stop)
+
+    threading.Thread(target=feed, name="scrape-feed", daemon=True).start()
+
+    try:
+        while True:
+            item = done_queue.get()
+            if item is _DONE:
+                break
+            yield item if isinstance(item, ScrapeResult) else item.result
+        if feed_errors:
+            raise feed_errors[0]
+    finally:
+        stop.set()
+        store.flush()
+        if own_pool:
+            # Drivers still checked out by a fetch are quit when they are returned
+            pool.close()
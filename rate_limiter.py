@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Requests and tokens per minute for each model in usage.pricing
+RATE_LIMITS: Dict[str, Dict[str, int]] = {
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200_000},
+    "gpt-4o-mini-2024-07-18": {"rpm": 500, "tpm": 200_000},
+    "babbage-002": {"rpm": 3_000, "tpm": 250_000},
+    "gpt-3.5-turbo-0125": {"rpm": 3_500, "tpm": 200_000},
+    "gpt-3.5-turbo-1106": {"rpm": 3_500, "tpm": 200_000},
+}
+DEFAULT_RATE_LIMIT = {"rpm": 500, "tpm": 200_000}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = {
+    "Timeout", "APITimeoutError", "APIConnectionError", "ServiceUnavailableError",
+    "TryAgain", "RateLimitError", "ConnectionError", "ReadTimeout",
+}
+
+
+# Continuously refilling bucket; `capacity` units become available per minute
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds to wait before `amount` can be taken, 0 if it is available now
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.available = min(self.capacity, self.available + amount)
+
+    def pause(self, seconds: float, now: float) -> None:
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+def _status_of(error: Exception) -> Optional[int]:
+    for attr in ("http_status", "status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _headers_of(error: Exception) -> Dict[str, str]:
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return {str(k).lower(): str(v) for k, v in dict(headers or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+
+
+# Server hint for how long to back off, in seconds
+def retry_after(error: Exception) -> Optional[float]:
+    headers = _headers_of(error)
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = _status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in _RETRYABLE_ERRORS or isinstance(error, (TimeoutError, ConnectionError))
+
+
+class RetriesExhausted(Exception):
+    pass
+
+
+# Admits API calls through per-model RPM/TPM buckets and retries transient failures
+class CompletionScheduler:
+    """
+    `call(model, estimated_tokens, request)` blocks until both of the model's
+    buckets can cover the request, then runs it. 429s, timeouts and 5xx
+    responses are retried with jittered exponential backoff; a retry-after
+    hint from the server pauses the whole model, not just the one caller.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, int]]] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.limits = limits if limits is not None else RATE_LIMITS
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._cond = threading.Condition()
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.throttle_seconds = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def _buckets_for(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model not in self._buckets:
+            limit = self.limits.get(model, DEFAULT_RATE_LIMIT)
+            self._buckets[model] = (TokenBucket(limit["rpm"]), TokenBucket(limit["tpm"]))
+        return self._buckets[model]
+
+    def _admit(self, model: str, tokens: int) -> None:
+        start = time.monotonic()
+        with self._cond:
+            self.queue_depth += 1
+            try:
+                while True:
+                    requests_bucket, tokens_bucket = self._buckets_for(model)
+                    now = time.monotonic()
+                    wait = max(requests_bucket.wait_time(1, now), tokens_bucket.wait_time(tokens, now))
+                    if wait <= 0:
+                        requests_bucket.take(1)
+                        tokens_bucket.take(tokens)
+                        self.in_flight += 1
+                        return
+                    self._cond.wait(wait)
+            finally:
+                self.queue_depth -= 1
+                self.throttle_seconds += time.monotonic() - start
+
+    def _release(self, model: str, estimated: int, actual: Optional[int]) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if actual is not None and actual < estimated:
+                self._buckets_for(model)[1].give_back(estimated - actual)
+            self._cond.notify_all()
+
+    def _backoff(self, model: str, attempt: int, error: Exception) -> float:
+        hint = retry_after(error)
+        delay = hint if hint is not None else min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay *= random.uniform(1.0, 1.25) if hint is not None else random.uniform(0.5, 1.0)
+        if _status_of(error) == 429 or type(error).__name__ == "RateLimitError":
+            self.rate_limited += 1
+            with self._cond:
+                for bucket in self._buckets_for(model):
+                    bucket.pause(delay, time.monotonic())
+        return delay
+
+    def call(self, model: str, estimated_tokens: int, request: Callable[[], T],
+             usage_tokens: Optional[Callable[[T], Optional[int]]] = None) -> T:
+        attempt = 0
+        while True:
+            self._admit(model, estimated_tokens)
+            actual = None
+            try:
+                response = request()
+                if usage_tokens is not None:
+                    actual = usage_tokens(response)
+                return response
+            except Exception as e:
+                actual = 0  # a rejected request does not count against the token budget
+                if not is_retryable(e):
+                    raise
+                if attempt >= self.max_retries:
+                    raise RetriesExhausted(f"Gave up after {attempt + 1} attempts: {e}") from e
+                delay = self._backoff(model, attempt, e)
+                print(f"{model} request failed ({e}); retrying in {delay:.1f}s")
+                self.retries += 1
+                attempt += 1
+            finally:
+                self._release(model, estimated_tokens, actual)
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
+
+
+completion_scheduler = CompletionScheduler()
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+# What a recrawl found for a URL compared to the previous run
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+GONE = "gone"
+STATUSES = [NEW, CHANGED, UNCHANGED, GONE]
+
+
+def content_hash(cleaned_html: str) -> str:
+    return hashlib.sha256(cleaned_html.encode('utf-8')).hexdigest()
+
+
+class PageState(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    extraction: Optional[str]  # JobPostingsContainer JSON from the last extraction
+    gone: bool
+    last_checked: float
+    last_changed: float
+
+
+# Per-URL validators, content hash and last extraction, kept across runs in SQLite
+class RecrawlState:
+    """
+    A URL is unchanged when the server answers a conditional request with 304
+    or, where it does not support validators, when the cleaned HTML hashes the
+    same as last time. Either way its stored extraction is reused. `counts`
+    tallies the statuses reported since the last `reset_counts()`.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'recrawl_state.sqlite3')):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self.counts: Dict[str, int] = dict.fromkeys(STATUSES, 0)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, "
+                "extraction TEXT, gone INTEGER NOT NULL DEFAULT 0, "
+                "last_checked REAL NOT NULL, last_changed REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, url: str) -> Optional[PageState]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT url, etag, last_modified, content_hash, extraction, gone, last_checked, last_changed "
+                "FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return PageState(*row[:5], bool(row[5]), *row[6:])
+
+    # The page is as it was: refresh its validators and report it unchanged
+    def unchanged(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        with self._lock:
+            self._db().execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "gone = 0, last_checked = ? WHERE url = ?",
+                (etag, last_modified, time.time(), url),
+            )
+            self._db().commit()
+            return self._count(UNCHANGED)
+
+    # Store a fresh extraction and report whether the URL is new or changed
+    def update(self, url: str, cleaned_hash: str, extraction: str,
+               etag: Optional[str] = None, last_modified: Optional[str] = None) -> str:
+        now = time.time()
+        with self._lock:
+            status = CHANGED if self.get(url) is not None else NEW
+            self._db().execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, content_hash, extraction, gone, last_checked, last_changed) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                (url, etag, last_modified, cleaned_hash, extraction, now, now),
+            )
+            self._db().commit()
+            return self._count(status)
+
+    # The posting was taken down (404/410); its last extraction is kept
+    def gone(self, url: str) -> str:
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "UPDATE pages SET gone = 1, last_checked = ?, "
+                "last_changed = CASE WHEN gone = 0 THEN ? ELSE last_changed END WHERE url = ?",
+                (now, now, url),
+            )
+            self._db().commit()
+            return self._count(GONE)
+
+    def _count(self, status: str) -> str:
+        self.counts[status] += 1
+        return status
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(STATUSES, 0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+recrawl_state = RecrawlState()
@@ -1,48 +1,116 @@
 import os
 import time
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Union
-from pydantic import BaseModel, Field, HttpUrl, field_validator
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from collections import Counter
+from typing import Callable, List, Dict, Optional, Tuple, Union
+from pydantic import BaseModel, Field, HttpUrl, TypeAdapter, ValidationError, ValidationInfo, field_validator
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 # from openai import OpenAI
-import tiktoken
 import openai
+from driver_pool import DriverPool
+from browser_profiles import FetchProfile, chrome_options, driver_path, get_profile, navigate
+from page_wait import wait_for_page, domain_of
+from http_fetch import HttpFetcher, HttpPage, http_fetcher, looks_complete, HTTP, BROWSER
+from extraction_cache import ExtractionCache, extraction_cache, cache_key, fingerprint
+from html_cleaner import clean_html_fast
+from html_reducer import reduce_html
+from rate_limiter import CompletionScheduler, completion_scheduler
+from instrumentation import stage
+from job_store import job_store
+from date_normalizer import normalize_date, relative_to_absolute
+from json_stream import ArrayItemStream
+from near_duplicates import NearDuplicateIndex
+# `pricing` moved to usage.py; it is still importable from here
+from usage import BudgetExceeded, UsageLedger, cost_of, pricing, token_counter, usage_ledger
+from structured_data import REQUIRED_FIELDS, extract_structured_postings, missing_fields
 
 # Load environment variables
 load_dotenv()
 
-# Set up the Chrome WebDriver options
-def setup_selenium():
-    options = Options()
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-    service = Service(r"C:\Users\ajoyd\Downloads\chromedriver-win64\chromedriver.exe")  
-    driver = webdriver.Chrome(service=service, options=options)
+# Launch Chrome with a fetch profile (see browser_profiles.PROFILES)
+def setup_selenium(profile: Union[str, FetchProfile, None] = None):
+    profile = get_profile(profile)
+    service = Service(driver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options(profile))
+    driver.fetch_profile = profile
     return driver
 
-# Fetch HTML using Selenium
-def fetch_html_selenium(url: str) -> str:
+# Load a page in an existing driver and return its HTML once it is ready
+def _load_page(driver, url: str, selector: Optional[str] = None, infinite_scroll: Optional[bool] = None) -> str:
+    profile = navigate(driver, url)
+    wait_for_page(driver, url, selector=selector, infinite_scroll=infinite_scroll,
+                  eager=profile.page_load_strategy == "eager")
+    return driver.page_source
+
+# Fetch HTML using Selenium, reusing a browser from `pool` when one is given
+def fetch_html_selenium(url: str, pool: Optional[DriverPool] = None, selector: Optional[str] = None,
+                        infinite_scroll: Optional[bool] = None) -> str:
+    if pool is not None:
+        with pool.driver() as driver:
+            return _load_page(driver, url, selector, infinite_scroll)
+
     driver = setup_selenium()
     try:
-        driver.get(url)
-        time.sleep(5)  # Simulate user interaction delay
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(3)
-        html = driver.page_source
-        return html
+        return _load_page(driver, url, selector, infinite_scroll)
     finally:
         driver.quit()
 
+# Fetch HTML over plain HTTP when the page is server-rendered, otherwise with Selenium
+def fetch_html(url: str, pool: Optional[DriverPool] = None, http: Optional[HttpFetcher] = None) -> str:
+    http = http if http is not None else http_fetcher
+    domain = domain_of(url)
+
+    if http.decisions.mode_for(domain) != BROWSER:
+        html = http.fetch(url)
+        if html is not None:
+            if looks_complete(html):
+                http.decisions.record(domain, HTTP)
+                return html
+            # The server answered but the posting is rendered client-side
+            http.decisions.record(domain, BROWSER)
+
+    return fetch_html_selenium(url, pool=pool)
+
+# Like fetch_html, but sends the validators from the last crawl so an unchanged page costs a 304
+def fetch_if_changed(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                     pool: Optional[DriverPool] = None, http: Optional[HttpFetcher] = None) -> HttpPage:
+    http = http if http is not None else http_fetcher
+    domain = domain_of(url)
+    mode = http.decisions.mode_for(domain)
+
+    if mode != BROWSER:
+        # A 304 only proves the posting is unchanged where plain HTTP serves all of it
+        if mode == HTTP:
+            page = http.get(url, etag, last_modified)
+        else:
+            page = http.get(url)
+        if page is not None:
+            if page.status in (304, 404, 410):
+                return page
+            if page.html is not None:
+                if looks_complete(page.html):
+                    http.decisions.record(domain, HTTP)
+                    return page
+                http.decisions.record(domain, BROWSER)
+    else:
+        # Browser-mode pages are not fetched over HTTP, so a HEAD request tells whether the posting is gone;
+        # a single-page app that answers 200 for a removed posting is still rendered and extracted
+        status = http.status(url)
+        if status in (404, 410):
+            return HttpPage(status, None)
+
+    return HttpPage(200, fetch_html_selenium(url, pool=pool))
+
 # Clean HTML content using BeautifulSoup
 # Clean HTML content using BeautifulSoup and remove "Related Jobs" section
-def clean_html(html_content: str) -> str:
+# Reference implementation: clean_html must produce the same output
+def clean_html_reference(html_content: str) -> str:
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Remove irrelevant sections (style, footer, header, script)
@@ -70,41 +138,12 @@ def clean_html(html_content: str) -> str:
 
     return str(soup)
 
-# Define the pricing for models
-pricing = {
-    "gpt-4o-mini": {
-        "input": 0.15 / 1_000_000,  # $0.150 per 1M input tokens
-        "output": 0.60 / 1_000_000, # $0.600 per 1M output tokens
-    },
-    "gpt-4o-mini-2024-07-18": {
-        "input": 0.15 / 1_000_000,  # $0.150 per 1M input tokens
-        "output": 0.60 / 1_000_000, # $0.600 per 1M output tokens
-    },
-    "babbage-002": {
-        "input": 0.4 / 1_000_000,  # $0.40 per 1M input tokens
-        "output": 0.4 / 1_000_000,  # $0.40 per 1M output tokens
-    },
-    "gpt-3.5-turbo-0125": {
-        "input": 0.5 / 1_000_000,  # $0.50 per 1M input tokens
-        "output": 1.5 / 1_000_000,  # $1.50 per 1M output tokens
-    },
-    "gpt-3.5-turbo-1106": {
-        "input": 1 / 1_000_000,  # $1 per 1M input tokens
-        "output": 2 / 1_000_000,  # $2 per 1M output tokens
-    },
-}
+# Clean HTML content in a single tree walk with the fastest available parser
+def clean_html(html_content: str) -> str:
+    return clean_html_fast(html_content)
 
 model_used = "gpt-4o-mini"
 
-# Save raw HTML data to a file
-def save_raw_data(raw_data: str, timestamp: str, output_folder: str = 'output') -> str:
-    os.makedirs(output_folder, exist_ok=True)
-    raw_output_path = os.path.join(output_folder, f'rawData_{timestamp}.html')
-    with open(raw_output_path, 'w', encoding='utf-8') as f:
-        f.write(raw_data)
-    print(f"Raw HTML data saved to {raw_output_path}")
-    return raw_output_path
-
 # Pydantic models for job postings
 class Salary(BaseModel):
     min: Optional[int] = None
@@ -129,6 +168,7 @@ class Salary(BaseModel):
 
 from dateutil import parser
 
+# Reference implementation: JobPosting now validates dates with the memoised normalize_date
 def parse_date(date_str: str) -> Optional[str]:
     """
     Tries to parse various date formats and returns a date in 'YYYY-MM-DD' format.
@@ -169,47 +209,56 @@ class JobPosting(BaseModel):
     application_link: str 
 
     @field_validator('job_title', 'company_name', mode='before')
-    def validate_mandatory_fields(cls, value, field):
+    def validate_mandatory_fields(cls, value, info: ValidationInfo):
         if not value or value.strip() == "":
-            raise ValueError(f"{field.name} is a required field and cannot be empty")
+            raise ValueError(f"{info.field_name} is a required field and cannot be empty")
         return value
 
+    # Relative dates ("3 days ago") resolve against the scrape time given as validation context
     @field_validator('date_posted', 'application_deadline', mode='before')
-    def validate_dates(cls, value):
-        return parse_date(value) if value else value
+    def validate_dates(cls, value, info: ValidationInfo):
+        if isinstance(value, str) and value:
+            return normalize_date(value, (info.context or {}).get("scraped_at"))
+        return value
 
 class JobPostingsContainer(BaseModel):
     job_postings: List[JobPosting]
     metadata: Dict[str, Union[str, int]]
 
-    @field_validator('job_postings', mode='before')
+    # Runs after the list is validated so JSON input keeps pydantic's native JSON parsing
+    @field_validator('job_postings', mode='after')
     def validate_job_postings(cls, value):
         if not value or len(value) == 0:
             raise ValueError("Job postings list cannot be empty")
         return value
 
+# Compiled validator for lists of postings, reused across responses and batches
+POSTINGS_ADAPTER = TypeAdapter(List[JobPosting])
+
+def _validation_context(scraped_at: Optional[datetime]) -> Dict[str, datetime]:
+    return {"scraped_at": scraped_at or datetime.now()}
+
+# Validate a container straight from the JSON text, without building Python dicts first
+def parse_container(json_data: Union[str, bytes], scraped_at: Optional[datetime] = None) -> JobPostingsContainer:
+    return JobPostingsContainer.model_validate_json(json_data, context=_validation_context(scraped_at))
+
+# Validate a JSON array of postings in a single call
+def parse_postings(json_data: Union[str, bytes], scraped_at: Optional[datetime] = None) -> List[JobPosting]:
+    return POSTINGS_ADAPTER.validate_json(json_data, context=_validation_context(scraped_at))
+
 # Function to convert relative date strings to absolute dates
-def convert_relative_to_absolute(date_str: str) -> str:
-    if "day" in date_str:
-        days_ago = int(date_str.split()[0])
-        return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
-    elif "week" in date_str:
-        weeks_ago = int(date_str.split()[0])
-        return (datetime.now() - timedelta(weeks=weeks_ago)).strftime("%Y-%m-%d")
-    elif "month" in date_str:
-        months_ago = int(date_str.split()[0])
-        return (datetime.now() - timedelta(days=months_ago * 30)).strftime("%Y-%m-%d")
-    
+def convert_relative_to_absolute(date_str: str, anchor: Optional[date] = None) -> str:
+    relative = relative_to_absolute(date_str, anchor or date.today())
+    if relative is not None:
+        return relative
+
     try:
         return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
     except ValueError:
         raise ValueError("Date should be in YYYY-MM-DD format")
 
-# Extract and format data using OpenAI API
-def format_data(data: str, model: str = "gpt-4o-mini") -> Optional[JobPostingsContainer]:
-    openai.api_key=os.getenv('OPENAI_API_KEY')
-    
-    system_message = """
+# System prompt and response schema shared by every extraction call
+SYSTEM_MESSAGE = """
     You are an intelligent data extraction assistant. Your task is to extract structured job posting data from HTML content and convert it into JSON format.
 
     Output must match the following structure:
@@ -276,177 +325,538 @@ def format_data(data: str, model: str = "gpt-4o-mini") -> Optional[JobPostingsCo
     - For "job_tags", extract tags from <a> tags or any section labeled with "tags".
 """
 
-
-
-        
-    user_message = f"Extract the following information from the provided HTML content:\n\n{data}"
-    
-    try:
-        completion = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message},
-            ],
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "job_posting_schema",
-                    "schema": {
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "job_posting_schema",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "job_postings": {
+                    "type": "array",
+                    "items": {
                         "type": "object",
                         "properties": {
-                            "job_postings": {
+                            "job_title": {"type": "string"},
+                            "company_name": {"type": "string"},
+                            "locations": {
                                 "type": "array",
                                 "items": {
                                     "type": "object",
                                     "properties": {
-                                        "job_title": {"type": "string"},
-                                        "company_name": {"type": "string"},
-                                        "locations": {
-                                            "type": "array",
-                                            "items": {
-                                                "type": "object",
-                                                "properties": {
-                                                    "city": {"type": "string"},
-                                                    "state": {"type": "string"},
-                                                    "country": {"type": "string"}
-                                                }
-                                            }
-                                        },
-                                        "job_tags": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "employment_type": {"type": "string"},
-                                        "salary": {
-                                            "type": "object",
-                                            "properties": {
-                                                "min": {"type": "integer"},
-                                                "max": {"type": "integer"},
-                                                "currency": {"type": "string"},
-                                                "period": {"type": "string"}
-                                            }
-                                        },
-                                        "job_description": {"type": "string"},
-                                        "responsibilities": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "requirements": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "skills": {
-                                            "type": "array",
-                                            "items": {"type": "string"}
-                                        },
-                                        "educational_qualifications": {
-                                            "type": "array",
-                                            "items": {
-                                                "type": "object",
-                                                "properties": {
-                                                    "degree": {"type": "string"},
-                                                    "field_of_study": {"type": "string"}
-                                                }
-                                            }
-                                        },
-                                        "date_posted": {"type": "string"},
-                                        "application_deadline": {"type": "string"},
-                                        "application_link": {"type": "string"}
-                                    },
-                                    "required": ["job_title", "company_name", "application_link"]
+                                        "city": {"type": "string"},
+                                        "state": {"type": "string"},
+                                        "country": {"type": "string"}
+                                    }
                                 }
                             },
-                            "metadata": {
+                            "job_tags": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            },
+                            "employment_type": {"type": "string"},
+                            "salary": {
                                 "type": "object",
                                 "properties": {
-                                    "scraping_timestamp": {"type": "string"},
-                                    "scraped_from": {"type": "string"},
-                                    "source_type": {"type": "string"},
-                                    "scraper_version": {"type": "string"},
-                                    "data_format_version": {"type": "string"},
-                                    "total_job_postings": {"type": "integer"}
+                                    "min": {"type": "integer"},
+                                    "max": {"type": "integer"},
+                                    "currency": {"type": "string"},
+                                    "period": {"type": "string"}
+                                }
+                            },
+                            "job_description": {"type": "string"},
+                            "responsibilities": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            },
+                            "requirements": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            },
+                            "skills": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            },
+                            "educational_qualifications": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "degree": {"type": "string"},
+                                        "field_of_study": {"type": "string"}
+                                    }
                                 }
-                            }
+                            },
+                            "date_posted": {"type": "string"},
+                            "application_deadline": {"type": "string"},
+                            "application_link": {"type": "string"}
                         },
-                        "additionalProperties": False
+                        "required": ["job_title", "company_name", "application_link"]
+                    }
+                },
+                "metadata": {
+                    "type": "object",
+                    "properties": {
+                        "scraping_timestamp": {"type": "string"},
+                        "scraped_from": {"type": "string"},
+                        "source_type": {"type": "string"},
+                        "scraper_version": {"type": "string"},
+                        "data_format_version": {"type": "string"},
+                        "total_job_postings": {"type": "integer"}
                     }
                 }
-            }
-        )
+            },
+            "additionalProperties": False
+        }
+    }
+}
+
+# Identifies the prompt and schema version for cache keys
+PROMPT_FINGERPRINT = fingerprint(SYSTEM_MESSAGE, RESPONSE_FORMAT)
+
+# Token usage reported by the API, as a plain dict
+def _usage_from(completion) -> Dict[str, int]:
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return {}
+    counts = {}
+    for name in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, name, None)
+        if value is None and isinstance(usage, dict):
+            value = usage.get(name)
+        counts[name] = value or 0
+    return counts
+
+# Text added by one streamed completion chunk
+def _delta_text(chunk) -> str:
+    choices = chunk.get("choices") if isinstance(chunk, dict) else getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    delta = choices[0].get("delta") if isinstance(choices[0], dict) else getattr(choices[0], "delta", None)
+    if delta is None:
+        return ""
+    content = delta.get("content") if isinstance(delta, dict) else getattr(delta, "content", None)
+    return content or ""
+
+# Output tokens reserved against the TPM budget for each extraction call
+EXPECTED_OUTPUT_TOKENS = 1_500
+
+# One blocking completion through the scheduler; returns its text and the usage the API reported
+def _create_completion(model: str, estimated_tokens: int, messages: List[Dict[str, str]],
+                       scheduler: CompletionScheduler, response_format: Dict = RESPONSE_FORMAT) -> Tuple[str, Dict[str, int]]:
+    completion = scheduler.call(
+        model,
+        estimated_tokens,
+        lambda: openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            response_format=response_format
+        ),
+        usage_tokens=lambda completion: sum(_usage_from(completion).values()) or None,
+    )
+    return completion.choices[0].message.content, _usage_from(completion)
+
+# Stream the completion and hand each posting to `on_posting` as soon as its JSON object closes
+def _stream_completion(model: str, estimated_tokens: int, messages: List[Dict[str, str]],
+                       scheduler: CompletionScheduler, scraped_at: Optional[datetime],
+                       on_posting: Callable[[JobPosting], None]) -> Tuple[str, Dict[str, int]]:
+    # Only opening the stream is retried; a stream that breaks off fails the extraction
+    stream = scheduler.call(
+        model,
+        estimated_tokens,
+        lambda: openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            response_format=RESPONSE_FORMAT,
+            stream=True,
+            stream_options={"include_usage": True},
+        ),
+    )
+    postings = ArrayItemStream("job_postings")
+    context = _validation_context(scraped_at)
+    usage: Dict[str, int] = {}
+    for chunk in stream:
+        usage = _usage_from(chunk) or usage
+        for item in postings.feed(_delta_text(chunk)):
+            try:
+                on_posting(JobPosting.model_validate_json(item, context=context))
+            except ValidationError as e:
+                print(f"Streamed posting did not validate: {e}")
+    return postings.text, usage
+
+# Extract and format data using OpenAI API, reusing cached results for unchanged pages.
+# With `on_posting` the completion is streamed and each posting is passed on as it arrives
+def format_data(data: str, model: str = "gpt-4o-mini", cache: Optional[ExtractionCache] = extraction_cache,
+                scheduler: CompletionScheduler = completion_scheduler,
+                scraped_at: Optional[datetime] = None,
+                on_posting: Optional[Callable[[JobPosting], None]] = None,
+                ledger: UsageLedger = usage_ledger) -> Optional[JobPostingsContainer]:
+    key = cache_key(data, model, PROMPT_FINGERPRINT)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return parse_container(cached["data"], scraped_at)
+
+    openai.api_key=os.getenv('OPENAI_API_KEY')
         
-        response_content = completion.choices[0].message.content.strip()
+    user_message = f"Extract the following information from the provided HTML content:\n\n{data}"
+    
+    try:
+        count = token_counter(model)
+        prompt_tokens = count(SYSTEM_MESSAGE) + count(user_message)
+        estimated_tokens = prompt_tokens + EXPECTED_OUTPUT_TOKENS
+
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message},
+        ]
+
+        # Admitted through the model's RPM/TPM buckets; 429s and timeouts are retried.
+        # The ledger refuses the call up front if its estimated cost would break the budget
+        estimated_cost = ledger.estimate(model, prompt_tokens, EXPECTED_OUTPUT_TOKENS)
+        with ledger.reserve(estimated_cost), stage("extract") as span:
+            span.bytes_in = len(user_message)
+            if on_posting is not None:
+                response_content, usage = _stream_completion(
+                    model, estimated_tokens, messages, scheduler, scraped_at, on_posting)
+            else:
+                response_content, usage = _create_completion(model, estimated_tokens, messages, scheduler)
+            # The API's own counts when it sent them; only the completion is counted locally otherwise
+            ledger.record(model, usage, prompt_tokens, response_content)
+            response_content = response_content.strip()
+            span.bytes_out = len(response_content)
 
         if response_content.startswith('```json'):
             response_content = response_content.replace('```json', '').replace('```', '').strip()
         
         if response_content.startswith('{'):
-            formatted_data = JobPostingsContainer.parse_raw(response_content)
+            with stage("validate") as span:
+                span.bytes_in = len(response_content)
+                formatted_data = parse_container(response_content, scraped_at)
+
+            if cache is not None:
+                cache.put(key, formatted_data.model_dump_json(), usage)
             
             return formatted_data
         else:
             print(f"Unexpected response format: {response_content}")
             return None
-            
+
+    except BudgetExceeded:
+        # Not a failure of this page: the caller decides whether to stop the run
+        raise
     except Exception as e:
         print(f"Error during API call: {e}")
         return None
 
-# Save formatted data to JSON
-def save_formatted_data(formatted_data, timestamp, output_folder='output'):
-    os.makedirs(output_folder, exist_ok=True)
-    formatted_data_dict = formatted_data.dict() if formatted_data else {}
-    json_output_path = os.path.join(output_folder, f'sorted_data_{timestamp}.json')
-    
-    with open(json_output_path, 'w', encoding='utf-8') as f:
-        json.dump(formatted_data_dict, f, indent=4)
-    print(f"Formatted data saved to JSON at {json_output_path}")
-    if formatted_data:
-        print("Formatted data:", json.dumps(formatted_data_dict, indent=4))
-
-# Calculate price based on input and output tokens
-def calculate_price(input_text: str, output_text: str, model: str = "gpt-4o-mini") -> float:
-    encoder = tiktoken.encoding_for_model(model)
-    
-    input_token_count = len(encoder.encode(input_text))
-    output_token_count = len(encoder.encode(output_text))
-    
-    input_cost = input_token_count * pricing[model]["input"]
-    output_cost = output_token_count * pricing[model]["output"]
-    total_cost = input_cost + output_cost
-    
-    return input_token_count, output_token_count, total_cost
+# Parallel extraction calls per segmented page
+SEGMENT_WORKERS = 4
+
+# Extract each posting block of a multi-posting page in its own call and merge the results
+def format_segments(segments: List[str], model: str = "gpt-4o-mini",
+                    cache: Optional[ExtractionCache] = extraction_cache,
+                    scheduler: CompletionScheduler = completion_scheduler,
+                    scraped_at: Optional[datetime] = None,
+                    on_posting: Optional[Callable[[JobPosting], None]] = None,
+                    workers: int = SEGMENT_WORKERS) -> Optional[JobPostingsContainer]:
+    """
+    Runs format_data on every segment concurrently (each call still goes
+    through `scheduler`, and is cached on its own, so an unchanged posting on
+    a changed page costs nothing). A segment that fails or returns invalid
+    JSON drops only its own postings. Returns None when every segment fails.
+    BudgetExceeded from any segment is raised once the others have finished.
+    """
+    def extract_segment(segment: str) -> Optional[JobPostingsContainer]:
+        return format_data(segment, model=model, cache=cache, scheduler=scheduler,
+                           scraped_at=scraped_at, on_posting=on_posting)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(segments))),
+                            thread_name_prefix="segment") as executor:
+        # Each call runs in a copy of this context so its metrics stay attributed to the page's URL
+        futures = [executor.submit(contextvars.copy_context().run, extract_segment, segment)
+                   for segment in segments]
+        containers = [future.result() for future in futures]
+
+    extracted = [container for container in containers if container is not None]
+    if not extracted:
+        return None
+    postings = [posting for container in extracted for posting in container.job_postings]
+    metadata = dict(extracted[0].metadata)
+    metadata.update({
+        "total_job_postings": len(postings),
+        "segments": len(segments),
+        "failed_segments": len(segments) - len(extracted),
+    })
+    return JobPostingsContainer(job_postings=postings, metadata=metadata)
+
+FILL_SYSTEM_MESSAGE = """
+    You are an intelligent data extraction assistant. The job postings listed below were read from the page's
+    structured data, which leaves some fields out. For each listed posting, extract only the requested fields
+    from the page content, and return them as JSON with the posting's "index" as listed.
+
+    - "locations": objects with "city", "state" and "country".
+    - "employment_type": e.g. Full-Time, Part-Time, Contract.
+    - "job_description": all text of the posting's description, without truncation, as clean plain text with
+      paragraphs, lists and headers kept apart by line breaks; strip all HTML tags.
+    - "application_link": the URL to apply.
+    - "job_title" and "company_name": as shown on the page.
+"""
+
+# Output tokens reserved for a fill call that does not ask for the description
+FILL_OUTPUT_TOKENS = 300
+
+_POSTING_PROPERTIES = RESPONSE_FORMAT["json_schema"]["schema"]["properties"]["job_postings"]["items"]["properties"]
+
+def _fill_response_format(fields: List[str]) -> Dict:
+    properties = {"index": {"type": "integer"}, **{field: _POSTING_PROPERTIES[field] for field in fields}}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "missing_fields_schema",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "job_postings": {
+                        "type": "array",
+                        "items": {"type": "object", "properties": properties, "required": ["index"]},
+                    },
+                },
+                "additionalProperties": False,
+            },
+        },
+    }
+
+FILL_FINGERPRINT = fingerprint(FILL_SYSTEM_MESSAGE, _fill_response_format(REQUIRED_FIELDS))
+
+# Ask the model only for the required fields the page's JSON-LD left out
+def fill_missing_fields(structured: List[Dict], page_text: str, model: str = "gpt-4o-mini",
+                        cache: Optional[ExtractionCache] = extraction_cache,
+                        scheduler: CompletionScheduler = completion_scheduler,
+                        ledger: UsageLedger = usage_ledger) -> Optional[List[Dict]]:
+    """
+    The prompt lists the postings by index with what identifies them, names
+    the missing fields, and the response schema holds only those fields, so
+    the answer is a fraction of a full extraction unless the description
+    itself is missing. The page text is sent as for a full extraction.
+    Returns copies of `structured` with the gaps filled (the page's own
+    values are never replaced), or None when the call fails or a posting is
+    still incomplete, so the caller can extract the page in full instead.
+    """
+    fields = [field for field in REQUIRED_FIELDS if any(field in missing_fields(posting) for posting in structured)]
+    listed = [
+        {"index": i, **{name: posting[name] for name in ("job_title", "company_name", "application_link") if name in posting}}
+        for i, posting in enumerate(structured)
+    ]
+    user_message = (f"Fields to extract: {', '.join(fields)}\n\nPostings:\n{json.dumps(listed)}\n\n"
+                    f"Page content:\n\n{page_text}")
+    key = cache_key(user_message, model, FILL_FINGERPRINT)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        response_content, usage = cached["data"], cached.get("usage") or {}
+    else:
+        openai.api_key = os.getenv('OPENAI_API_KEY')
+        messages = [
+            {"role": "system", "content": FILL_SYSTEM_MESSAGE},
+            {"role": "user", "content": user_message},
+        ]
+        expected_output = EXPECTED_OUTPUT_TOKENS if "job_description" in fields else FILL_OUTPUT_TOKENS
+        try:
+            count = token_counter(model)
+            prompt_tokens = count(FILL_SYSTEM_MESSAGE) + count(user_message)
+            with ledger.reserve(ledger.estimate(model, prompt_tokens, expected_output)), stage("extract") as span:
+                span.bytes_in = len(user_message)
+                response_content, usage = _create_completion(model, prompt_tokens + expected_output, messages,
+                                                             scheduler, _fill_response_format(fields))
+                ledger.record(model, usage, prompt_tokens, response_content)
+                span.bytes_out = len(response_content)
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"Error while filling in {', '.join(fields)}: {e}")
+            return None
 
-# Main function to execute the scraper
-if __name__ == "__main__":
-    # url = 'https://aijobs.ai/job/senior-software-engineer-semantic-scholar'  # Example URL
-    # url = 'https://aijobs.ai/job/machine-learning-engineer-voice-cloning-and-speech-synthesis'  # Example URL
-    # url = 'https://aijobs.ai/job/software-engineer-aiadas'
-    # url = 'https://aijobs.ai/job/software-engineer-applied-engineering'
-    # url = 'https://aijobs.ai/job/senior-software-engineer-ai-platform-6'
-    url = 'https://aijobs.ai/job/lead-software-engineer-prog-data-scientist'
-    
     try:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        raw_html = fetch_html_selenium(url)
-        cleaned_html = clean_html(raw_html)  # Cleaned HTML, no markdown conversion
-        # print(cleaned_html)
-        
-        raw_file_path = save_raw_data(cleaned_html, timestamp)
-        
-        formatted_data = format_data(cleaned_html)  # Pass cleaned HTML directly to the LLM
-        save_formatted_data(formatted_data, timestamp)
-        
-        if formatted_data:  # Only calculate price if formatted_data is not None
-            formatted_data_text = json.dumps(formatted_data.dict()) 
-            
-            input_tokens, output_tokens, total_cost = calculate_price(cleaned_html, formatted_data_text, model=model_used)
-            print(f"Input token count: {input_tokens}")
-            print(f"Output token count: {output_tokens}")
-            print(f"Estimated total cost: ${total_cost:.4f}")
+        answer = json.loads(response_content.strip().removeprefix('```json').removesuffix('```'))
+        items = answer.get("job_postings") or []
+    except (ValueError, AttributeError) as e:
+        print(f"Unexpected response while filling in missing fields: {e}")
+        return None
+    completed = [dict(posting) for posting in structured]
+    for item in items:
+        index = item.get("index") if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 0 <= index < len(completed):
+            continue
+        for field in fields:
+            if field not in completed[index] and item.get(field) not in (None, [], ""):
+                completed[index][field] = item[field]
+    incomplete = [posting.get("job_title") for posting in completed if missing_fields(posting)]
+    if incomplete:
+        print(f"The model left fields out of {len(incomplete)} posting(s); extracting the page in full")
+        return None
+    if cache is not None and cached is None:
+        cache.put(key, response_content, usage)
+    return completed
+
+# Extraction paths, counted per page
+STRUCTURED_DATA = "structured_data"
+STRUCTURED_DATA_AND_LLM = "structured_data+llm"
+LLM_ONLY = "llm"
+NEAR_DUPLICATE = "near_duplicate"
+extraction_paths = Counter()
+
+def _link_key(link) -> str:
+    return str(link or "").strip().rstrip("/")
+
+def _title_key(fields: Dict) -> Tuple[str, str]:
+    return tuple(" ".join(str(fields.get(name) or "").lower().split()) for name in ("job_title", "company_name"))
+
+# Structured values win over the model's, except where the page left them out
+def _overlay(fields: Dict, structured: Dict) -> Dict:
+    for name, value in structured.items():
+        if value is None:
+            continue
+        if isinstance(value, dict) and isinstance(fields.get(name), dict):
+            fields[name] = {**fields[name], **{key: item for key, item in value.items() if item is not None}}
         else:
-            print("No formatted data to calculate cost.")
-            
-    except Exception as e:
-        print(f"An error occurred: {e}")
+            fields[name] = value
+    return fields
+
+# Pair each LLM posting with the JSON-LD posting for the same job (same application link,
+# else same title and company); JSON-LD postings the model missed are kept as they are
+def _merge_postings(structured: List[Dict], formatted: JobPostingsContainer,
+                    scraped_at: Optional[datetime] = None) -> JobPostingsContainer:
+    context = _validation_context(scraped_at)
+    by_link, by_title = {}, {}
+    for i, posting in enumerate(structured):
+        if _link_key(posting.get("application_link")):
+            by_link.setdefault(_link_key(posting["application_link"]), []).append(i)
+        by_title.setdefault(_title_key(posting), []).append(i)
+    unmatched = set(range(len(structured)))
+
+    merged = []
+    for posting in formatted.job_postings:
+        fields = posting.model_dump()
+        candidates = by_link.get(_link_key(fields.get("application_link")), []) + by_title.get(_title_key(fields), [])
+        match = next((i for i in candidates if i in unmatched), None)
+        if match is not None:
+            unmatched.discard(match)
+            _overlay(fields, structured[match])
+        merged.append(fields)
+    postings = POSTINGS_ADAPTER.validate_python(merged, context=context)
+
+    for i in sorted(unmatched):
+        try:
+            postings.append(JobPosting.model_validate({"salary": {}, **structured[i]}, context=context))
+        except ValidationError as e:
+            print(f"Skipping structured posting {structured[i].get('job_title')!r}: the model did not return it "
+                  f"and it does not validate on its own ({e.error_count()} error(s))")
+    metadata = dict(formatted.metadata)
+    if "total_job_postings" in metadata:
+        metadata["total_job_postings"] = len(postings)
+    return JobPostingsContainer(job_postings=postings, metadata=metadata)
+
+def _structured_container(postings: List[Dict], url: Optional[str], scraped_at: datetime,
+                          path: str) -> JobPostingsContainer:
+    # Salary is optional in schema.org; an absent one gets the model's defaults
+    return JobPostingsContainer.model_validate({"job_postings": [{"salary": {}, **posting} for posting in postings], "metadata": {
+        "scraping_timestamp": scraped_at.isoformat(timespec='seconds'),
+        "scraped_from": url or "",
+        "source_type": "job board",
+        "total_job_postings": len(postings),
+        "extraction_path": path,
+    }}, context=_validation_context(scraped_at))
+
+# Extract postings from schema.org JSON-LD when possible and ask the LLM only for the fields it is missing;
+# if that fails, the page is extracted in full and the JSON-LD values merged on top. Pass the page's posting `segments` (see segmenter.segment_texts) to extract them in parallel,
+# and a `duplicates` index to reuse the extraction of an earlier page with nearly the same text
+def extract_job_data(raw_html: str, page_text: str, url: Optional[str] = None, model: str = "gpt-4o-mini",
+                     scraped_at: Optional[datetime] = None,
+                     on_posting: Optional[Callable[[JobPosting], None]] = None,
+                     segments: Optional[List[str]] = None,
+                     duplicates: Optional[NearDuplicateIndex] = None) -> Optional[JobPostingsContainer]:
+    scraped_at = scraped_at or datetime.now()
+    with stage("structured_data") as span:
+        span.bytes_in = len(raw_html)
+        try:
+            structured = extract_structured_postings(raw_html, url)
+        except Exception as e:
+            # Malformed or unusual JSON-LD is not worth failing the page over; the LLM reads it instead
+            print(f"Could not read structured data from {url}: {e}")
+            structured = []
+
+    if structured and not any(missing_fields(posting) for posting in structured):
+        try:
+            container = _structured_container(structured, url, scraped_at, STRUCTURED_DATA)
+            extraction_paths[STRUCTURED_DATA] += 1
+            return container
+        except ValidationError as e:
+            print(f"Structured data did not validate, falling back to the LLM: {e}")
+
+    formatted_data = None
+    signature = None
+    path = LLM_ONLY
+    if duplicates is not None:
+        with stage("dedup") as span:
+            span.bytes_in = len(page_text)
+            signature = duplicates.signature(page_text)
+            match = duplicates.match(signature)
+        if match is not None and match.extraction:
+            try:
+                formatted_data = parse_container(match.extraction, scraped_at)
+                # The postings are the earlier page's; what describes the page itself is this one's
+                for posting in formatted_data.job_postings:
+                    if url and posting.application_link == match.url:
+                        posting.application_link = url
+                formatted_data.metadata.update({"scraping_timestamp": scraped_at.isoformat(timespec='seconds'),
+                                                "scraped_from": url or "", "duplicate_of": match.url,
+                                                "similarity": str(match.similarity)})
+                path = NEAR_DUPLICATE
+            except ValidationError as e:
+                print(f"Stored extraction for {match.url} no longer validates; extracting {url} again: {e}")
+
+    # Incomplete JSON-LD: ask only for what it is missing before paying for a full extraction
+    filled = False
+    if formatted_data is None and structured:
+        completed = fill_missing_fields(structured, page_text, model=model)
+        if completed is not None:
+            try:
+                formatted_data = _structured_container(completed, url, scraped_at, STRUCTURED_DATA_AND_LLM)
+                path = STRUCTURED_DATA_AND_LLM
+                filled = True
+            except ValidationError as e:
+                print(f"Filled-in structured data did not validate, extracting {url} in full: {e}")
+
+    if formatted_data is None and segments:
+        formatted_data = format_segments(segments, model=model, scraped_at=scraped_at, on_posting=on_posting)
+        if formatted_data is None:
+            print(f"Every posting segment failed for {url}; extracting the whole page instead")
+    if formatted_data is None:
+        formatted_data = format_data(page_text, model=model, scraped_at=scraped_at, on_posting=on_posting)
+    if formatted_data is None:
+        return None
+
+    if structured and not filled:
+        try:
+            # The page's own structured values also win over a reused extraction
+            formatted_data = _merge_postings(structured, formatted_data, scraped_at)
+            path = path if path == NEAR_DUPLICATE else STRUCTURED_DATA_AND_LLM
+        except ValidationError as e:
+            print(f"Could not merge structured data into the LLM result: {e}")
+    formatted_data.metadata["extraction_path"] = path
+    extraction_paths[path] += 1
+    if duplicates is not None and path != NEAR_DUPLICATE:
+        duplicates.add(url or "", signature, formatted_data.model_dump_json())
+    return formatted_data
+
+# Calculate price based on input and output tokens counted locally; extractions are
+# charged with the API's reported usage instead (see usage.UsageLedger)
+def calculate_price(input_text: str, output_text: str, model: str = "gpt-4o-mini") -> Tuple[int, int, float]:
+    count = token_counter(model)
+    input_token_count = count(input_text)
+    output_token_count = count(output_text)
+    return input_token_count, output_token_count, cost_of(model, input_token_count, output_token_count)
+
+# Command-line batches are run by batch.py; `python scraper.py urls.txt` is the same as `python -m batch urls.txt`
+if __name__ == "__main__":
+    import batch
+    raise SystemExit(batch.main())
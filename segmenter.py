@@ -0,0 +1,115 @@
+import re
+from collections import Counter
+from typing import List, Optional
+
+import lxml.html
+from lxml import etree
+
+from html_reducer import reduce_html
+
+# Fewer postings than this are extracted with one call; splitting buys little
+MIN_SEGMENTS = 3
+# Text a block needs to be a posting rather than a link, tag or teaser
+MIN_BLOCK_CHARS = 200
+# Share of the page's text the blocks must cover together
+MIN_COVERAGE = 0.5
+# Share of blocks whose child elements must match the group's usual layout
+MIN_ALIKE = 0.8
+
+_HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _text_length(el: etree._Element) -> int:
+    return len(_SPACE_RE.sub(" ", el.text_content()).strip())
+
+
+def _child_tags(el: etree._Element) -> frozenset:
+    return frozenset(child.tag for child in el if isinstance(child.tag, str))
+
+
+def _similar(a: frozenset, b: frozenset) -> bool:
+    if not a and not b:
+        return True
+    return len(a & b) / len(a | b) >= 0.5
+
+
+# A posting card names the job (heading) or links to it; description sections usually do neither
+def _looks_like_posting(el: etree._Element) -> bool:
+    return any(True for _ in el.iter(*_HEADINGS)) or any(True for _ in el.iter("a"))
+
+
+# Blocks under `parent` that repeat the same layout and each hold a posting's worth of text
+def _repeated_blocks(parent: etree._Element) -> List[etree._Element]:
+    by_tag = {}
+    for child in parent:
+        if isinstance(child.tag, str):
+            by_tag.setdefault(child.tag, []).append(child)
+
+    best: List[etree._Element] = []
+    for siblings in by_tag.values():
+        blocks = [el for el in siblings if _text_length(el) >= MIN_BLOCK_CHARS and _looks_like_posting(el)]
+        if len(blocks) < MIN_SEGMENTS:
+            continue
+        layouts = [_child_tags(el) for el in blocks]
+        usual = Counter(layouts).most_common(1)[0][0]
+        if sum(_similar(layout, usual) for layout in layouts) < MIN_ALIKE * len(blocks):
+            continue
+        # Postings each link somewhere of their own (detail or apply page); shared tag links don't count
+        links = [{a.get("href") for a in el.iter("a") if a.get("href")} for el in blocks]
+        if all(links):
+            seen = Counter(href for hrefs in links for href in hrefs)
+            if sum(any(seen[href] == 1 for href in hrefs) for hrefs in links) < MIN_ALIKE * len(blocks):
+                continue
+        if len(blocks) > len(best):
+            best = blocks
+    return best
+
+
+# Split a cleaned multi-posting page into one HTML fragment per posting, or [] when it has no such list
+def segment_postings(cleaned_html: str) -> List[str]:
+    """
+    Looks for the sibling group that repeats one layout at least
+    MIN_SEGMENTS times, where every block carries enough text and a heading
+    or link, and the group covers most of the page's text. Single-posting
+    pages, link-only listings and pages whose repeated blocks are small
+    (tags, related-job teasers) return [].
+    """
+    try:
+        root = lxml.html.document_fromstring(cleaned_html)
+    except (etree.ParserError, ValueError):
+        return []
+    body = root.find("body")
+    body = body if body is not None else root
+    page_chars = _text_length(body)
+    if page_chars < MIN_SEGMENTS * MIN_BLOCK_CHARS:
+        return []
+
+    best: List[etree._Element] = []
+    best_chars = 0
+    for parent in body.iter():
+        if not isinstance(parent.tag, str) or len(parent) < MIN_SEGMENTS:
+            continue
+        blocks = _repeated_blocks(parent)
+        chars = sum(_text_length(el) for el in blocks)
+        if chars > best_chars:
+            best, best_chars = blocks, chars
+    if not best or best_chars < MIN_COVERAGE * page_chars:
+        return []
+    return [lxml.html.tostring(el, encoding="unicode") for el in best]
+
+
+def page_title(cleaned_html: str) -> Optional[str]:
+    match = re.search(r"<title[^>]*>(.*?)</title>", cleaned_html, re.IGNORECASE | re.DOTALL)
+    title = _SPACE_RE.sub(" ", match.group(1)).strip() if match else ""
+    return title or None
+
+
+# Reduced text for each posting block, headed by the page title so the company stays in view
+def segment_texts(cleaned_html: str, model: str = "gpt-4o-mini") -> List[str]:
+    segments = segment_postings(cleaned_html)
+    if not segments:
+        return []
+    title = page_title(cleaned_html)
+    prefix = f"# Page: {title}\n\n" if title else ""
+    return [prefix + reduce_html(segment, model=model).text for segment in segments]
@@ -2,10 +2,25 @@ import streamlit as st
 from streamlit_tags import st_tags_sidebar
 import pandas as pd
 import json
+import math
+import os
 from datetime import datetime
 
 # Importing functions from scraper.py
-from scraper import fetch_html_selenium, save_raw_data, format_data, save_formatted_data, calculate_price, clean_html
+from scraper import extraction_paths, STRUCTURED_DATA, STRUCTURED_DATA_AND_LLM, LLM_ONLY, NEAR_DUPLICATE
+from pipeline import BUDGET_EXCEEDED, scrape_many
+from crawler import crawl_and_scrape
+from extraction_cache import extraction_cache
+from rate_limiter import completion_scheduler
+from instrumentation import recorder
+from recrawl import recrawl_state, GONE, STATUSES
+from job_store import job_store
+from browser_profiles import PROFILES, DEFAULT_PROFILE
+from near_duplicates import near_duplicate_index, DEFAULT_THRESHOLD
+from usage import usage_ledger
+from export import FORMATS, export_postings
+
+STORE_PAGE_SIZE = 25
 
 # Initialize Streamlit app
 st.set_page_config(page_title="Universal Web Scraper")
@@ -24,93 +39,213 @@ url_input = st.sidebar.text_area("Enter URLs (separated by newlines)")
 
 st.sidebar.markdown("---")
 
-# Initialize variables to store token and cost information
-input_tokens = output_tokens = total_cost = 0  # Default values
+# Concurrency for each pipeline stage
+with st.sidebar.expander("Concurrency"):
+    fetch_workers = st.number_input("Browser / HTTP workers", min_value=1, max_value=8, value=2)
+    cpu_workers = st.number_input("Cleaning workers", min_value=1, max_value=8, value=2)
+    llm_workers = st.number_input("LLM workers", min_value=1, max_value=16, value=4)
 
-# Function to perform scraping for each URL
-def perform_scrape(url):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    # Fetch raw HTML
-    raw_html = fetch_html_selenium(url)
+# Stop calling the API once this session has spent this much
+budget = st.sidebar.number_input("API budget for this session ($, 0 for no limit)", min_value=0.0,
+                                 value=usage_ledger.budget or 0.0, step=0.5)
 
-    # Clean HTML (removes headers, footers, classes, etc.)
-    cleaned_html = clean_html(raw_html)
-    raw_html_file_path = save_raw_data(cleaned_html, timestamp)
+# How the browser loads pages: lighter profiles skip images, fonts and trackers
+browser_profile = st.sidebar.selectbox("Browser profile", options=list(PROFILES),
+                                       index=list(PROFILES).index(DEFAULT_PROFILE))
 
-    # Extract and format data
-    formatted_data = format_data(cleaned_html)
+# Skip URLs that have not changed since they were last scraped
+recrawl = st.sidebar.checkbox("Recrawl mode (skip unchanged pages)", value=False)
 
-    # Prepare structured job posting JSON data
-    if formatted_data:
-        job_data = json.dumps(formatted_data.dict())
+# Show each posting as soon as the model has written it
+stream_extraction = st.sidebar.checkbox("Stream extraction (show postings as they arrive)", value=True)
 
-        # Calculate token usage and cost
-        input_tokens, output_tokens, total_cost = calculate_price(cleaned_html, json.dumps(job_data, indent=4), model=model_selection)
-        
-        return job_data, input_tokens, output_tokens, total_cost, raw_html_file_path
-    else:
-        return None, 0, 0, 0, raw_html_file_path
+# Extract each posting of a multi-posting page in its own, parallel call
+segment_pages = st.sidebar.checkbox("Split multi-posting pages", value=True)
+
+# Reuse the extraction of an earlier page when this one is a near-copy (reposts, other boards)
+reuse_duplicates = st.sidebar.checkbox("Reuse extractions of near-duplicate pages", value=True)
+duplicate_threshold = st.sidebar.slider("Near-duplicate similarity threshold", min_value=0.5, max_value=1.0,
+                                        value=DEFAULT_THRESHOLD, step=0.05, disabled=not reuse_duplicates)
+
+# Start from listing/search pages and scrape every posting linked from them
+crawl_listings = st.sidebar.checkbox("Crawl listing pages for postings", value=False)
+max_listing_pages = st.sidebar.number_input("Max listing pages", min_value=1, max_value=500, value=20,
+                                            disabled=not crawl_listings)
+
+# Render one URL's formatted data, token usage and download buttons
+def display_result(idx, result):
+    job_data = result.formatted_data.model_dump(mode="json")
+
+    st.write(f"## Scraped Data for URL {idx + 1}")
+    st.write(result.url)
+    if result.status:
+        st.write(f"Recrawl status: **{result.status}**")
+    
+    # Display raw HTML file path
+    # st.write(f"Raw HTML data saved to: **{result.raw_html_file_path}**")
+    
+    # Display formatted job data
+    st.write("### Formatted Data:")
+    st.json(job_data)
+
+    # Display token usage and cost
+    st.sidebar.markdown(f"## Token Usage for URL {idx + 1}")
+    st.sidebar.markdown(f"**Input Tokens:** {result.input_tokens} (cleaned HTML: {result.html_tokens})")
+    st.sidebar.markdown(f"**Output Tokens:** {result.output_tokens}")
+    st.sidebar.markdown(f"**Total Cost:** :green-background[***${result.total_cost:.4f}***]")
+    
+    # JSON download for each URL; tables of the whole batch are under "Export"
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            f"Download JSON for URL {idx + 1}",
+            data=json.dumps(job_data, indent=4),
+            file_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job_data.json"
+        )
+    # with col3:
+    #     st.download_button(
+    #     f"Download Markdown for URL {idx + 1}",
+    #     data=cleaned_html,  # Use cleaned_html which contains the raw HTML content
+    #     file_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job_data.md"
+    # )
+
+# Download buttons for flattened postings; files are reused across reruns until the postings change
+def display_export(title, key, **filters):
+    st.write(f"## {title}")
+    columns = st.columns(len(FORMATS))
+    for column, file_format in zip(columns, FORMATS):
+        try:
+            artifact = export_postings(file_format, **filters)
+        except RuntimeError as e:  # pyarrow missing
+            column.write(str(e))
+            continue
+        with open(artifact.path, 'rb') as f:
+            column.download_button(f"{file_format.upper()} ({artifact.rows} postings)", data=f.read(),
+                                   file_name=os.path.basename(artifact.path), key=f"{key}-{file_format}")
+
+# Session-wide extraction statistics
+def display_stats():
+    # Extraction cache effectiveness across the session
+    cache_stats = extraction_cache.stats()
+    st.sidebar.markdown("## Extraction Cache")
+    st.sidebar.markdown(f"**Hits:** {cache_stats['hits']} (memory {cache_stats['memory_hits']}, disk {cache_stats['disk_hits']})")
+    st.sidebar.markdown(f"**Misses:** {cache_stats['misses']}")
+    st.sidebar.markdown(f"**Tokens Saved:** {cache_stats['tokens_saved']}")
+
+    # API spend as reported by the API, kept across sessions
+    st.sidebar.markdown("## Cost Ledger")
+    st.sidebar.markdown(f"**This Session:** ${usage_ledger.session_cost:.4f}")
+    for model, totals in usage_ledger.totals(by="model").items():
+        st.sidebar.markdown(f"**{model}:** ${totals['cost']:.4f} over {totals['calls']} call(s)")
+    by_domain = usage_ledger.totals(by="domain")
+    if by_domain:
+        st.sidebar.dataframe(pd.DataFrame.from_dict(by_domain, orient='index')[["calls", "cost"]].head(10))
+
+    # Time spent waiting on the API rate limits
+    scheduler_stats = completion_scheduler.stats()
+    st.sidebar.markdown("## API Scheduler")
+    st.sidebar.markdown(f"**Queue Depth:** {scheduler_stats['queue_depth']} (in flight {scheduler_stats['in_flight']})")
+    st.sidebar.markdown(f"**Throttle Time:** {scheduler_stats['throttle_seconds']:.1f}s")
+    st.sidebar.markdown(f"**Retries:** {scheduler_stats['retries']} ({scheduler_stats['rate_limited']} rate limited)")
+
+    # How each page was extracted
+    st.sidebar.markdown("## Extraction Paths")
+    st.sidebar.markdown(f"**Structured data only:** {extraction_paths[STRUCTURED_DATA]}")
+    st.sidebar.markdown(f"**Structured data + LLM:** {extraction_paths[STRUCTURED_DATA_AND_LLM]}")
+    st.sidebar.markdown(f"**LLM only:** {extraction_paths[LLM_ONLY]}")
+    st.sidebar.markdown(f"**Near-duplicate reused:** {extraction_paths[NEAR_DUPLICATE]}")
+
+# Page through the stored postings; only one page is read from the store at a time
+def display_store():
+    st.write("## Stored Postings")
+    company = st.text_input("Filter by company name") or None
+    total = job_store.count(company_name=company)
+    pages = max(1, math.ceil(total / STORE_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages}, {total} postings)", min_value=1, max_value=pages, value=1)
+    rows = job_store.query(company_name=company, limit=STORE_PAGE_SIZE, offset=(page - 1) * STORE_PAGE_SIZE)
+    columns = ["job_title", "company_name", "employment_type", "date_posted", "application_link", "scraped_from"]
+    st.dataframe(pd.DataFrame(rows, columns=columns))
+    # The whole store can be large, so its export is only built when asked for
+    if st.checkbox("Export stored postings"):
+        display_export("Export Stored Postings", "store", company_name=company)
 
 # Button to trigger scraping
+just_scraped = False
 if st.sidebar.button("Scrape URLs"):
     with st.spinner('Please wait... Data is being scraped.'):
 
         urls = url_input.splitlines()
         results = []
-
-        for url in urls:
-            try:
-                st.write(f"Scraping URL: {url}")
-                job_data, input_tokens, output_tokens, total_cost, raw_html_file_path = perform_scrape(url)
-                
-                if job_data:
-                    results.append((job_data, input_tokens, output_tokens, total_cost, raw_html_file_path))
-                else:
-                    st.write(f"Failed to extract data from {url}")
-            except Exception as e:
-                st.write(f"Error scraping {url}: {e}")
+        first_record = recorder.mark()
+        recrawl_state.reset_counts()
+
+        near_duplicate_index.set_threshold(duplicate_threshold)
+        usage_ledger.budget = budget or None
+        options = dict(model=model_selection, fetch_workers=fetch_workers, cpu_workers=cpu_workers,
+                       llm_workers=llm_workers, state=recrawl_state if recrawl else None,
+                       stream=stream_extraction, profile=browser_profile,
+                       segment=segment_pages, duplicates=near_duplicate_index if reuse_duplicates else None)
+        if crawl_listings:
+            batch = crawl_and_scrape([url for url in urls if url.strip()], max_listing_pages=max_listing_pages, **options)
+        else:
+            batch = scrape_many(urls, **options)
+
+        # Each URL is shown as soon as it finishes, in completion order; streamed postings
+        # appear in a placeholder that the final result replaces
+        in_progress = {}
+        over_budget = 0
+        for result in batch:
+            if result.partial:
+                with in_progress.setdefault(result.url, st.empty()).container():
+                    postings = result.formatted_data.job_postings
+                    st.write(f"## Extracting {result.url}")
+                    st.write(f"{len(postings)} posting(s) so far")
+                    st.json([posting.model_dump() for posting in postings])
+                continue
+            if result.url in in_progress:
+                in_progress.pop(result.url).empty()
+            if result.error and result.error.startswith(BUDGET_EXCEEDED):
+                over_budget += 1
+                continue
+            if result.error:
+                st.write(f"Failed to extract data from {result.url}: {result.error}")
+                continue
+            if result.status == GONE:
+                st.write(f"Posting is no longer available: {result.url}")
+                continue
+            results.append(result)
+            display_result(len(results) - 1, result)
+        if over_budget:
+            st.warning(f"The ${usage_ledger.budget:.2f} budget ran out; {over_budget} URL(s) were not scraped "
+                       f"and the rest of the list was skipped.")
         
         # Store results in session state
         st.session_state['results'] = results
+        st.session_state['stage_summary'] = recorder.summary(recorder.since(first_record))
+        st.session_state['recrawl_counts'] = dict(recrawl_state.counts) if recrawl else None
+        st.session_state['batch_urls'] = [result.url for result in results]
         st.session_state['perform_scrape'] = True
+        just_scraped = True
 
-# Display the results
+# Display the results again on reruns (e.g. after a download)
 if st.session_state.get('perform_scrape'):
-    for idx, (job_data, input_tokens, output_tokens, total_cost, raw_html_file_path) in enumerate(st.session_state['results']):
-        st.write(f"## Scraped Data for URL {idx + 1}")
-        
-        # Display raw HTML file path
-        # st.write(f"Raw HTML data saved to: **{raw_html_file_path}**")
-        
-        # Display formatted job data
-        st.write("### Formatted Data:")
-        st.json(job_data)
-
-        # Display token usage and cost
-        st.sidebar.markdown(f"## Token Usage for URL {idx + 1}")
-        st.sidebar.markdown(f"**Input Tokens:** {input_tokens}")
-        st.sidebar.markdown(f"**Output Tokens:** {output_tokens}")
-        st.sidebar.markdown(f"**Total Cost:** :green-background[***${total_cost:.4f}***]")
-        
-        # Download buttons for each URL
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.download_button(
-                f"Download JSON for URL {idx + 1}",
-                data=json.dumps(job_data, indent=4),
-                file_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job_data.json"
-            )
-        with col2:
-            df = pd.DataFrame([job_data])  # Wrap job_data in a list to create a DataFrame
-            st.download_button(
-                f"Download CSV for URL {idx + 1}",
-                data=df.to_csv(index=False),
-                file_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job_data.csv"
-            )
-        # with col3:
-        #     st.download_button(
-        #     f"Download Markdown for URL {idx + 1}",
-        #     data=cleaned_html,  # Use cleaned_html which contains the raw HTML content
-        #     file_name=f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_job_data.md"
-        # )
+    if not just_scraped:
+        for idx, result in enumerate(st.session_state['results']):
+            display_result(idx, result)
+
+    # By page rather than time, so pages a recrawl found unchanged are included and other runs are not
+    display_export("Export This Batch", "batch", scraped_from=st.session_state['batch_urls'])
+    display_stats()
+
+    # What changed since the previous crawl of these URLs
+    if st.session_state.get('recrawl_counts'):
+        st.sidebar.markdown("## Recrawl")
+        for status in STATUSES:
+            st.sidebar.markdown(f"**{status.capitalize()}:** {st.session_state['recrawl_counts'][status]}")
+
+    # Where the batch spent its time, per stage across all URLs
+    if st.session_state.get('stage_summary'):
+        st.write("## Pipeline Timing")
+        st.dataframe(pd.DataFrame.from_dict(st.session_state['stage_summary'], orient='index'))
+
+    display_store()
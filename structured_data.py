@@ -0,0 +1,187 @@
+import html
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from html_reducer import html_to_blocks
+
+_LD_JSON_RE = re.compile(
+    r"""<script\b[^>]*\btype\s*=\s*["']?application/ld\+json["']?[^>]*>(.*?)</script\s*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Fields the LLM has to supply when the structured data does not
+REQUIRED_FIELDS = ["job_title", "company_name", "locations", "employment_type", "job_description", "application_link"]
+
+_SALARY_PERIODS = {
+    "HOUR": "hourly", "DAY": "daily", "WEEK": "weekly", "MONTH": "monthly", "YEAR": "yearly",
+}
+
+
+def _json_blocks(raw_html: str) -> Iterator[Any]:
+    for match in _LD_JSON_RE.finditer(raw_html):
+        text = match.group(1).strip()
+        if text.startswith("<!--"):
+            text = text[4:].rsplit("-->", 1)[0]
+        try:
+            yield json.loads(text, strict=False)
+        except ValueError:
+            continue
+
+
+def _is_job_posting(node: Dict) -> bool:
+    types = node.get("@type")
+    types = types if isinstance(types, list) else [types]
+    return "JobPosting" in types
+
+
+def _walk(node: Any) -> Iterator[Dict]:
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+    elif isinstance(node, dict):
+        if _is_job_posting(node):
+            yield node
+        else:
+            for key in ("@graph", "mainEntity", "itemListElement", "item"):
+                if key in node:
+                    yield from _walk(node[key])
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _name(value) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("name")
+    if isinstance(value, str) and value.strip():
+        return html.unescape(value.strip())
+    return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _description_text(description: str) -> str:
+    if "&lt;" in description:
+        description = html.unescape(description)
+    if "<" not in description:
+        return html.unescape(description).strip()
+    return "\n".join(block.text for block in html_to_blocks(f"<div>{description}</div>"))
+
+
+def _address(address: Dict) -> Dict[str, Optional[str]]:
+    location = {
+        "city": _name(address.get("addressLocality")),
+        "state": _name(address.get("addressRegion")),
+    }
+    country = _name(address.get("addressCountry"))
+    if country:
+        location["country"] = country
+    return location
+
+
+def _locations(node: Dict) -> List[Dict[str, Optional[str]]]:
+    locations = []
+    for place in _as_list(node.get("jobLocation")):
+        # An address may be a PostalAddress, a string, or a list of either
+        for address in _as_list(place.get("address", place)) if isinstance(place, dict) else []:
+            if isinstance(address, str):
+                locations.append({"city": address})
+            elif isinstance(address, dict):
+                locations.append(_address(address))
+    if not locations and node.get("jobLocationType") == "TELECOMMUTE":
+        for requirement in _as_list(node.get("applicantLocationRequirements")) or [None]:
+            locations.append({"city": "Remote", "country": _name(requirement) or "Unknown"})
+    return locations
+
+
+def _salary(node: Dict) -> Optional[Dict[str, Any]]:
+    salary = node.get("baseSalary") or node.get("estimatedSalary")
+    if isinstance(salary, list):
+        salary = salary[0] if salary else None
+    if not isinstance(salary, dict):
+        return None
+    value = salary.get("value", {})
+    if not isinstance(value, dict):
+        value = {"value": value}
+    minimum = _to_int(value.get("minValue", value.get("value")))
+    maximum = _to_int(value.get("maxValue", value.get("value")))
+    return {
+        "min": minimum,
+        "max": maximum,
+        "currency": salary.get("currency") or value.get("currency"),
+        "period": _SALARY_PERIODS.get(str(value.get("unitText") or salary.get("unitText") or "").upper()),
+    }
+
+
+def _education(node: Dict) -> List[Dict[str, str]]:
+    education = []
+    for requirement in _as_list(node.get("educationRequirements")):
+        if isinstance(requirement, dict):
+            degree = requirement.get("credentialCategory") or requirement.get("name")
+        else:
+            degree = requirement
+        if isinstance(degree, str) and degree.strip():
+            education.append({"degree": degree.strip()})
+    return education
+
+
+def _strings(value) -> List[str]:
+    items = []
+    for item in _as_list(value):
+        item = _name(item)
+        if not item:
+            continue
+        if "<" in item or "\n" in item:
+            lines = _description_text(item).splitlines()
+            items.extend(line.strip().lstrip("- ") for line in lines if line.strip())
+        elif len(item) < 200:
+            items.extend(part.strip() for part in item.split(",") if part.strip())
+        else:
+            items.append(item)
+    return items
+
+
+def _employment_type(value) -> Optional[str]:
+    types = [t.replace("_", "-").title() for t in _as_list(value) if isinstance(t, str) and t.strip()]
+    return ", ".join(types) or None
+
+
+# Map one schema.org JobPosting onto the JobPosting model's fields
+def map_job_posting(node: Dict, page_url: Optional[str] = None) -> Dict[str, Any]:
+    fields = {
+        "job_title": _name(node.get("title")),
+        "company_name": _name(node.get("hiringOrganization")),
+        "locations": _locations(node),
+        "employment_type": _employment_type(node.get("employmentType")),
+        "salary": _salary(node),
+        "job_description": _description_text(node["description"]) if isinstance(node.get("description"), str) else None,
+        "skills": _strings(node.get("skills")),
+        "responsibilities": _strings(node.get("responsibilities")),
+        "requirements": _strings(node.get("qualifications") or node.get("experienceRequirements")),
+        "job_tags": _strings(node.get("occupationalCategory") or node.get("industry")),
+        "educational_qualifications": _education(node),
+        "date_posted": node.get("datePosted") if isinstance(node.get("datePosted"), str) else None,
+        "application_deadline": node.get("validThrough") if isinstance(node.get("validThrough"), str) else None,
+        "application_link": _name(node.get("url")) or page_url,
+    }
+    return {key: value for key, value in fields.items() if value not in (None, [], "")}
+
+
+# Every schema.org JobPosting embedded in the raw (uncleaned) page
+def extract_structured_postings(raw_html: str, page_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    if "ld+json" not in raw_html:
+        return []
+    return [map_job_posting(node, page_url) for block in _json_blocks(raw_html) for node in _walk(block)]
+
+
+def missing_fields(posting: Dict[str, Any]) -> List[str]:
+    return [field for field in REQUIRED_FIELDS if field not in posting]
@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, NamedTuple, Optional
+
+import tiktoken
+
+from instrumentation import current_url
+from page_wait import domain_of
+
+# Define the pricing for models
+pricing = {
+    "gpt-4o-mini": {
+        "input": 0.15 / 1_000_000,  # $0.150 per 1M input tokens
+        "output": 0.60 / 1_000_000, # $0.600 per 1M output tokens
+    },
+    "gpt-4o-mini-2024-07-18": {
+        "input": 0.15 / 1_000_000,  # $0.150 per 1M input tokens
+        "output": 0.60 / 1_000_000, # $0.600 per 1M output tokens
+    },
+    "babbage-002": {
+        "input": 0.4 / 1_000_000,  # $0.40 per 1M input tokens
+        "output": 0.4 / 1_000_000,  # $0.40 per 1M output tokens
+    },
+    "gpt-3.5-turbo-0125": {
+        "input": 0.5 / 1_000_000,  # $0.50 per 1M input tokens
+        "output": 1.5 / 1_000_000,  # $1.50 per 1M output tokens
+    },
+    "gpt-3.5-turbo-1106": {
+        "input": 1 / 1_000_000,  # $1 per 1M input tokens
+        "output": 2 / 1_000_000,  # $2 per 1M output tokens
+    },
+}
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Usage(NamedTuple):
+    input_tokens: int
+    output_tokens: int
+    cost: float
+    exact: bool  # counts reported by the API rather than by the local tokenizer
+
+
+# One tokenizer per model for the life of the process; loading one takes far longer than encoding a page
+@lru_cache(maxsize=None)
+def encoder(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    model_encoder = encoder(model)
+    return lambda text: len(model_encoder.encode(text, disallowed_special=()))
+
+
+def cost_of(model: str, input_tokens: int, output_tokens: int) -> float:
+    return input_tokens * pricing[model]["input"] + output_tokens * pricing[model]["output"]
+
+
+# Usage of the calls made for one URL (or any block of work), see metering()
+class UsageMeter:
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.estimated_calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: Usage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.input_tokens
+            self.output_tokens += usage.output_tokens
+            self.cost += usage.cost
+            self.estimated_calls += not usage.exact
+
+
+_meter: ContextVar[Optional[UsageMeter]] = ContextVar("usage_meter", default=None)
+
+
+# Meter every call recorded in this context, including threads started with a copy of it
+@contextmanager
+def metering() -> Iterator[UsageMeter]:
+    meter = UsageMeter()
+    token = _meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _meter.reset(token)
+
+
+# Spend per model and domain, persisted across sessions, with an optional per-session budget
+class UsageLedger:
+    """
+    `record` turns one completed call into a Usage, taking the token counts
+    the API reported and counting locally only what it left out, and adds it
+    to the ledger, the current meter and the session totals. `reserve`
+    wraps a call: it raises BudgetExceeded when the session's spend, plus
+    what calls in flight may still cost, plus this call's estimate would go
+    over `budget` dollars (None for no limit; `SCRAPER_BUDGET_USD` sets the
+    default). The budget covers this session only; the ledger keeps
+    everything.
+    """
+
+    def __init__(self, path: str = os.path.join('output', 'usage_ledger.sqlite3'),
+                 budget: Optional[float] = None):
+        self.path = path
+        self.budget = budget
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self.session_cost = 0.0
+        self._reserved = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS spend ("
+                "model TEXT NOT NULL, domain TEXT NOT NULL, calls INTEGER NOT NULL, "
+                "input_tokens INTEGER NOT NULL, output_tokens INTEGER NOT NULL, cost REAL NOT NULL, "
+                "estimated_calls INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (model, domain))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    # Dollars a call is expected to cost, before it is made
+    def estimate(self, model: str, prompt_tokens: int, expected_output_tokens: int) -> float:
+        return cost_of(model, prompt_tokens, expected_output_tokens)
+
+    @contextmanager
+    def reserve(self, estimate: float) -> Iterator[None]:
+        with self._lock:
+            if self.budget is not None and self.session_cost + self._reserved + estimate > self.budget:
+                raise BudgetExceeded(
+                    f"${self.session_cost:.4f} spent and ${self._reserved:.4f} in flight; "
+                    f"a ${estimate:.4f} call would exceed the ${self.budget:.2f} budget"
+                )
+            self._reserved += estimate
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved -= estimate
+
+    def record(self, model: str, api_usage: Optional[Dict[str, int]], prompt_tokens: int,
+               output_text: str, url: Optional[str] = None) -> Usage:
+        api_usage = api_usage or {}
+        exact = bool(api_usage.get("prompt_tokens") and api_usage.get("completion_tokens"))
+        input_tokens = api_usage.get("prompt_tokens") or prompt_tokens
+        output_tokens = api_usage.get("completion_tokens") or token_counter(model)(output_text)
+        usage = Usage(input_tokens, output_tokens, cost_of(model, input_tokens, output_tokens), exact)
+
+        meter = _meter.get()
+        if meter is not None:
+            meter.add(usage)
+        url = url or current_url()
+        domain = domain_of(url) if url else ""
+        with self._lock:
+            self.session_cost += usage.cost
+            db = self._db()
+            db.execute(
+                "INSERT INTO spend VALUES (?, ?, 1, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (model, domain) DO UPDATE SET calls = calls + 1, "
+                "input_tokens = input_tokens + excluded.input_tokens, "
+                "output_tokens = output_tokens + excluded.output_tokens, cost = cost + excluded.cost, "
+                "estimated_calls = estimated_calls + excluded.estimated_calls, updated = excluded.updated",
+                (model, domain, usage.input_tokens, usage.output_tokens, usage.cost, int(not exact), time.time()),
+            )
+            db.commit()
+        return usage
+
+    # Totals grouped by "model" or "domain", most expensive first
+    def totals(self, by: str = "model") -> Dict[str, Dict[str, float]]:
+        if by not in ("model", "domain"):
+            raise ValueError("by must be 'model' or 'domain'")
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT {by}, SUM(calls), SUM(input_tokens), SUM(output_tokens), SUM(cost), SUM(estimated_calls) "
+                f"FROM spend GROUP BY {by} ORDER BY SUM(cost) DESC"
+            ).fetchall()
+        names = ("calls", "input_tokens", "output_tokens", "cost", "estimated_calls")
+        return {row[0]: dict(zip(names, row[1:])) for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _budget_from_env() -> Optional[float]:
+    value = os.getenv("SCRAPER_BUDGET_USD")
+    return float(value) if value else None
+
+
+usage_ledger = UsageLedger(budget=_budget_from_env())